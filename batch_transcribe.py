@@ -0,0 +1,198 @@
+import os
+import dataclasses
+import torch
+import whisper
+from whisper.audio import N_SAMPLES, SAMPLE_RATE, log_mel_spectrogram, pad_or_trim
+from whisper.tokenizer import get_tokenizer
+
+
+WINDOW_SECONDS = N_SAMPLES / SAMPLE_RATE  # 30s, whisper's encoder input
+TIME_PRECISION = 0.02  # seconds per timestamp token
+
+# whisper.transcribe()'s defaults for retrying and dropping windows
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+# cut one file into 30s windows: (path, offset_sec, duration_sec, samples).
+# with vad only its speech regions are windowed, like transcriber.transcribe_file
+def split_windows(path, vad=False):
+    audio = whisper.load_audio(path)
+    regions = [(0.0, len(audio) / SAMPLE_RATE)]
+    if vad:
+        from vad import detect_speech
+        regions = detect_speech(audio)
+
+    windows = []
+    for start, end in regions:
+        region = audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+        for offset in range(0, len(region), N_SAMPLES):
+            samples = region[offset:offset + N_SAMPLES]
+            windows.append(
+                (path, start + offset / SAMPLE_RATE, len(samples) / SAMPLE_RATE, samples)
+            )
+    return windows
+
+
+# full batches of windows, loading files only as the batches need them, so at most
+# about one batch of PCM is in memory; length-sorted so tail windows batch together.
+# files that fail to load are appended to `failed` instead of ending the run
+def iter_batches(audio_paths, batch_size, vad=False, failed=None):
+    windows = []
+    for path in audio_paths:
+        try:
+            windows.extend(split_windows(path, vad))
+        except Exception as e:
+            if failed is None:
+                raise
+            print(f"Could not load {os.path.basename(path)} for batching: {e}")
+            failed.append(path)
+            continue
+        if len(windows) < batch_size:
+            continue
+        windows.sort(key=lambda w: w[2], reverse=True)
+        full = len(windows) // batch_size * batch_size
+        for i in range(0, full, batch_size):
+            yield windows[i:i + batch_size]
+        windows = windows[full:]
+    if windows:
+        yield windows
+
+
+# turn <|t0|> text <|t1|><|t1|> text <|t2|> into window-relative segments
+def parse_timestamped_tokens(tokens, tokenizer, window_duration):
+    ts_begin = tokenizer.timestamp_begin
+    segments = []
+    text_tokens = []
+    start = None
+    last_time = 0.0
+
+    for token in tokens:
+        if token < ts_begin:
+            text_tokens.append(token)
+            continue
+
+        t = (token - ts_begin) * TIME_PRECISION
+        if text_tokens:
+            segments.append({
+                "start": last_time if start is None else start,
+                "end": t,
+                "text": tokenizer.decode(text_tokens)
+            })
+            text_tokens = []
+            start = None
+        else:
+            start = t
+        last_time = t
+
+    if text_tokens:
+        segments.append({
+            "start": last_time if start is None else start,
+            "end": window_duration,
+            "text": tokenizer.decode(text_tokens)
+        })
+
+    return [
+        {**seg, "end": min(seg["end"], window_duration)}
+        for seg in segments if seg["text"].strip()
+    ]
+
+
+# same rule as whisper.transcribe(): silence is not retried, it is dropped
+def is_silence(result):
+    return result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+
+
+def needs_fallback(result):
+    if is_silence(result):
+        return False
+    return (
+        result.compression_ratio > COMPRESSION_RATIO_THRESHOLD
+        or result.avg_logprob < LOGPROB_THRESHOLD
+    )
+
+
+# decode a batch at temperature 0, then re-decode only the windows that look like
+# repetition loops or low-confidence text at each higher temperature in turn
+def decode_with_fallback(model, mel, options):
+    results = whisper.decode(model, mel, options)
+    for temperature in TEMPERATURES[1:]:
+        retry = [i for i, result in enumerate(results) if needs_fallback(result)]
+        if not retry:
+            break
+        sampled = dataclasses.replace(options, temperature=temperature, beam_size=None)
+        for i, result in zip(retry, whisper.decode(model, mel[retry], sampled)):
+            results[i] = result
+    return results
+
+
+def transcribe_batched(transcriber, audio_paths, batch_size=16, vad=None):
+    """
+    Transcribe many short files together: 30s mel windows from all files
+    are bucketed by length and run through the encoder/decoder in batches,
+    then the segments are put back per file on each file's own timeline.
+    Windows are decoded without each other's context, so this is only for
+    clips of a few minutes (main.py checks TRANSCRIBE_BATCH_MAX_SECONDS).
+
+    Like whisper.transcribe(), windows that look like silence are dropped
+    and suspect ones re-decoded at higher temperatures; TRANSCRIBE_VAD
+    windows only the speech regions. A file that cannot be loaded here is
+    retried through transcribe_file(); if that fails too it is left out
+    of the result.
+    """
+    from transcriber import TRANSCRIBE_VAD, transcribe_file
+
+    vad = TRANSCRIBE_VAD if vad is None else vad
+    model = getattr(transcriber, "model", None)
+    if not isinstance(model, whisper.Whisper):
+        print("Batched mode needs the whisper backend, transcribing one by one")
+        return {path: transcribe_file(transcriber, path, vad=vad) for path in audio_paths}
+
+    options = whisper.DecodingOptions(
+        task="transcribe",
+        language=os.getenv("WHISPER_LANGUAGE") or None,
+        beam_size=transcriber.beam_size or None,
+        without_timestamps=False,
+        fp16=model.device.type == "cuda"
+    )
+
+    results = {path: [] for path in audio_paths}
+    failed = []
+    for n, batch in enumerate(iter_batches(audio_paths, batch_size, vad, failed), start=1):
+        mel = torch.stack([
+            log_mel_spectrogram(pad_or_trim(samples), model.dims.n_mels)
+            for _, _, _, samples in batch
+        ]).to(model.device)
+
+        decoded = decode_with_fallback(model, mel, options)
+
+        for (path, offset, duration, _), result in zip(batch, decoded):
+            if is_silence(result):
+                continue
+            tokenizer = get_tokenizer(
+                model.is_multilingual,
+                num_languages=model.num_languages,
+                language=result.language,
+                task="transcribe"
+            )
+            for seg in parse_timestamped_tokens(result.tokens, tokenizer, duration):
+                results[path].append({
+                    "start": offset + seg["start"],
+                    "end": offset + seg["end"],
+                    "text": seg["text"]
+                })
+
+        print(f"Decoded batch {n}: {len(batch)} windows")
+
+    for path in failed:
+        del results[path]
+        try:
+            results[path] = transcribe_file(transcriber, path, vad=vad)
+        except Exception as e:
+            print(f"Transcription failed, will retry next run: {os.path.basename(path)} ({e})")
+
+    for segments in results.values():
+        segments.sort(key=lambda seg: seg["start"])
+    return results
@@ -0,0 +1,82 @@
+"""
+Throughput of batched transcription vs the per-file loop on a directory
+of short clips.
+
+    python benchmarks/bench_batch.py [CLIPS_DIR] [BATCH_SIZE ...]
+
+Uses the backend/model from the usual TRANSCRIBE_BACKEND / WHISPER_MODEL
+settings; batched mode needs the whisper backend.
+"""
+import os
+import sys
+import json
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from transcriber import load_transcriber
+from batch_transcribe import transcribe_batched
+from bench_transcribe import CLIP_EXTENSIONS, CLIPS_DIR, audio_duration
+
+RESULTS_FILE = os.getenv("BENCH_RESULTS_FILE", "bench_batch.json")
+DEFAULT_BATCH_SIZES = [4, 8, 16]
+
+
+def run(label, fn, paths, total_audio):
+    start = time.perf_counter()
+    results = fn(paths)
+    elapsed = time.perf_counter() - start
+
+    n_segments = sum(len(segments) for segments in results.values())
+    print(
+        f"{label:<16} {elapsed:>8.2f}s  {len(paths) / elapsed:>7.2f} files/s  "
+        f"{total_audio / elapsed:>7.1f} audio-s/s  {n_segments} segments"
+    )
+    return {
+        "mode": label,
+        "seconds": elapsed,
+        "files_per_second": len(paths) / elapsed,
+        "audio_seconds_per_second": total_audio / elapsed,
+        "segments": n_segments
+    }
+
+
+def main(clips_dir, batch_sizes):
+    paths = [
+        os.path.join(clips_dir, file)
+        for file in sorted(os.listdir(clips_dir))
+        if file.lower().endswith(CLIP_EXTENSIONS)
+    ]
+    if not paths:
+        print(f"No clips found in {clips_dir}")
+        return
+
+    total_audio = sum(audio_duration(path) for path in paths)
+    print(f"{len(paths)} clips, {total_audio / 60:.1f} min of audio")
+
+    transcriber = load_transcriber()
+
+    results = [run(
+        "per-file",
+        lambda ps: {p: transcriber.transcribe(p) for p in ps},
+        paths,
+        total_audio
+    )]
+    for batch_size in batch_sizes:
+        results.append(run(
+            f"batch={batch_size}",
+            lambda ps: transcribe_batched(transcriber, ps, batch_size),
+            paths,
+            total_audio
+        ))
+
+    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    clips_dir = sys.argv[1] if len(sys.argv) > 1 else CLIPS_DIR
+    batch_sizes = [int(b) for b in sys.argv[2:]] or DEFAULT_BATCH_SIZES
+    main(clips_dir, batch_sizes)
@@ -0,0 +1,158 @@
+"""
+Fixed 1000-character splits vs segment-aware chunks (chunker.py).
+
+    python benchmarks/bench_chunking.py [CORPUS_DIR]
+
+CORPUS_DIR holds [MM:SS - MM:SS] transcripts (*.txt) and optionally a
+queries.tsv with "file<TAB>start_s<TAB>end_s<TAB>query" lines marking
+where in which transcript each query is answered. For every strategy
+this reports vectors per hour of audio, tokens per vector and, with
+queries, recall@k / MRR: a hit is a retrieved chunk of the right file
+whose time span overlaps the answer.
+"""
+import os
+import re
+import sys
+import json
+import time
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import chunker
+from embedding_backend import load_embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+CORPUS_DIR = os.getenv(
+    "BENCH_CORPUS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+)
+RESULTS_FILE = os.getenv("BENCH_RESULTS_FILE", "bench_chunking.json")
+TOP_K = 5
+STAMP_RE = re.compile(r"\[(\d{2,}):(\d{2})\s*-\s*(\d{2,}):(\d{2})\]")
+
+
+def load_corpus(corpus_dir):
+    transcripts = {}
+    for file in sorted(os.listdir(corpus_dir)):
+        if file.endswith(".txt") and not file.endswith(".ref.txt"):
+            with open(os.path.join(corpus_dir, file), "r", encoding="utf-8") as f:
+                transcripts[file] = f.read()
+
+    queries = []
+    queries_path = os.path.join(corpus_dir, "queries.tsv")
+    if os.path.exists(queries_path):
+        with open(queries_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) == 4:
+                    queries.append((parts[0], float(parts[1]), float(parts[2]), parts[3]))
+    return transcripts, queries
+
+
+def span_of(text):
+    stamps = STAMP_RE.findall(text)
+    if not stamps:
+        return None, None
+    return (
+        int(stamps[0][0]) * 60 + int(stamps[0][1]),
+        int(stamps[-1][2]) * 60 + int(stamps[-1][3])
+    )
+
+
+# ---------------- strategies ----------------
+def fixed_chunks(text, _embeddings):
+    # what second.py did before: 1000 chars with 200 overlap
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    return [{"text": t, **dict(zip(("start", "end"), span_of(t)))} for t in splitter.split_text(text)]
+
+
+def budget_chunks(text, _embeddings):
+    return chunker.chunk_text(text)
+
+
+def segment_chunks(text, embeddings):
+    return chunker.chunk_text(text, embeddings)
+
+
+STRATEGIES = [
+    ("fixed-1000", fixed_chunks),
+    ("segments-budget", budget_chunks),
+    ("segments-topic", segment_chunks),
+]
+
+
+def retrieval(chunks, embeddings, queries):
+    texts = [STAMP_RE.sub("", c["text"]).strip() for _, c in chunks]
+    docs = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    docs /= np.clip(np.linalg.norm(docs, axis=1, keepdims=True), 1e-12, None)
+
+    hits = 0
+    reciprocal = 0.0
+    for file, start, end, query in queries:
+        q = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+        ranked = np.argsort(-(docs @ q))[:TOP_K]
+        for rank, idx in enumerate(ranked, start=1):
+            chunk_file, chunk = chunks[idx]
+            if (
+                chunk_file == file and chunk["start"] is not None
+                and chunk["start"] <= end and chunk["end"] >= start
+            ):
+                hits += 1
+                reciprocal += 1 / rank
+                break
+
+    return hits / len(queries), reciprocal / len(queries)
+
+
+def main(corpus_dir):
+    transcripts, queries = load_corpus(corpus_dir)
+    if not transcripts:
+        print(f"No transcripts found in {corpus_dir}")
+        return
+
+    audio_hours = sum(
+        max((seg["end"] or 0 for seg in chunker.parse_transcript(text)), default=0) / 3600
+        for text in transcripts.values()
+    ) or 1e-9
+    print(f"{len(transcripts)} transcripts, {audio_hours:.2f} h of audio, {len(queries)} queries")
+
+    embeddings = load_embeddings()
+    results = []
+    for name, strategy in STRATEGIES:
+        start = time.perf_counter()
+        chunks = [
+            (file, chunk)
+            for file, text in transcripts.items()
+            for chunk in strategy(text, embeddings)
+        ]
+        elapsed = time.perf_counter() - start
+
+        result = {
+            "strategy": name,
+            "vectors": len(chunks),
+            "vectors_per_audio_hour": len(chunks) / audio_hours,
+            "tokens_per_vector": float(np.mean([chunker.count_tokens(c["text"]) for _, c in chunks])),
+            "chunking_seconds": elapsed
+        }
+        if queries:
+            recall, mrr = retrieval(chunks, embeddings, queries)
+            result[f"recall@{TOP_K}"] = recall
+            result["mrr"] = mrr
+        results.append(result)
+
+    print()
+    for r in results:
+        print(", ".join(
+            f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}"
+            for k, v in r.items()
+        ))
+
+    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else CORPUS_DIR)
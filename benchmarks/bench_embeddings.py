@@ -0,0 +1,118 @@
+"""
+Accuracy and throughput of embedding backends against the fp32
+sentence-transformers model (EMBEDDING_BACKEND=hf).
+
+    python benchmarks/bench_embeddings.py [CORPUS_DIR] [BACKEND ...]
+
+CORPUS_DIR holds chunk JSON files as written by second.py plus a
+queries.txt with one query per line. For every candidate backend this
+reports cosine agreement with the fp32 vectors, top-k overlap of the
+query results and texts/s throughput.
+"""
+import os
+import sys
+import json
+import time
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from embedding_backend import load_embeddings
+
+CORPUS_DIR = os.getenv(
+    "BENCH_CORPUS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+)
+RESULTS_FILE = os.getenv("BENCH_RESULTS_FILE", "bench_embeddings.json")
+REFERENCE_BACKEND = "hf"
+DEFAULT_BACKENDS = ["onnx", "onnx-fp32"]
+TOP_K = 10
+
+
+def load_corpus(corpus_dir):
+    texts = []
+    for file in sorted(os.listdir(corpus_dir)):
+        if not file.endswith(".json"):
+            continue
+        with open(os.path.join(corpus_dir, file), "r", encoding="utf-8") as f:
+            texts.extend(
+                item["text"] for item in json.load(f) if item.get("text", "").strip()
+            )
+
+    queries_path = os.path.join(corpus_dir, "queries.txt")
+    queries = []
+    if os.path.exists(queries_path):
+        with open(queries_path, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    return texts, queries
+
+
+def embed(backend, texts, queries):
+    embeddings = load_embeddings(backend)
+    embeddings.embed_documents(texts[:8])  # warm-up
+
+    start = time.perf_counter()
+    docs = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    elapsed = time.perf_counter() - start
+
+    query_vecs = np.asarray(
+        [embeddings.embed_query(q) for q in queries], dtype=np.float32
+    ).reshape(len(queries), docs.shape[1])
+    return docs, query_vecs, len(texts) / elapsed
+
+
+def normalize(m):
+    return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+
+
+def top_k(doc_vecs, query_vecs, k):
+    scores = normalize(query_vecs) @ normalize(doc_vecs).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main(corpus_dir, backends):
+    texts, queries = load_corpus(corpus_dir)
+    if not texts:
+        print(f"No chunk JSON found in {corpus_dir}")
+        return
+    print(f"{len(texts)} chunks, {len(queries)} queries")
+
+    ref_docs, ref_queries, ref_tps = embed(REFERENCE_BACKEND, texts, queries)
+    ref_top = top_k(ref_docs, ref_queries, TOP_K) if queries else None
+
+    results = [{"backend": REFERENCE_BACKEND, "texts_per_second": ref_tps}]
+    for backend in backends:
+        docs, query_vecs, tps = embed(backend, texts, queries)
+        cosine = np.sum(normalize(docs) * normalize(ref_docs), axis=1)
+
+        result = {
+            "backend": backend,
+            "texts_per_second": tps,
+            "speedup": tps / ref_tps,
+            "cosine_mean": float(cosine.mean()),
+            "cosine_min": float(cosine.min())
+        }
+        if queries:
+            overlap = [
+                len(set(a) & set(b)) / TOP_K
+                for a, b in zip(top_k(docs, query_vecs, TOP_K), ref_top)
+            ]
+            result[f"top{TOP_K}_overlap"] = float(np.mean(overlap))
+        results.append(result)
+
+    print()
+    for r in results:
+        print(", ".join(
+            f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}"
+            for k, v in r.items()
+        ))
+
+    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    corpus_dir = sys.argv[1] if len(sys.argv) > 1 else CORPUS_DIR
+    main(corpus_dir, sys.argv[2:] or DEFAULT_BACKENDS)
@@ -0,0 +1,87 @@
+"""
+Blocked top-k neighbours (neighbours.py) at corpus scale.
+
+    python benchmarks/bench_neighbours.py [N_CHUNKS ...]
+
+Uses random unit vectors of the MiniLM width (384) so any corpus size
+can be tried. For every size it times the blocked search over a grid of
+block sizes and thread counts, checks it against the full similarity
+matrix when that fits, and estimates the per-query loop it replaces
+(one similarity_search-style argsort per chunk) from a sample.
+"""
+import os
+import sys
+import json
+import time
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from neighbours import blocked_topk, limit_threads, normalize
+
+RESULTS_FILE = os.getenv("BENCH_RESULTS_FILE", "bench_neighbours.json")
+DEFAULT_SIZES = [10_000, 50_000]
+BLOCK_SIZES = [256, 1024, 4096]
+THREADS = [1, os.cpu_count() or 1]
+DIM = 384
+TOP_K = 10
+EXACT_CHECK_MAX = 20_000  # full n x n matrix is only built below this
+LOOP_SAMPLE = 200
+
+
+def per_query_seconds(vectors, k):
+    # what per-chunk similarity_search costs, without Chroma's own overhead
+    sample = vectors[:LOOP_SAMPLE]
+    start = time.perf_counter()
+    for q in sample:
+        np.argsort(-(vectors @ q))[:k + 1]
+    return (time.perf_counter() - start) / len(sample) * len(vectors)
+
+
+def main(sizes):
+    rng = np.random.default_rng(0)
+    results = []
+
+    for n in sizes:
+        vectors = normalize(rng.standard_normal((n, DIM), dtype=np.float32))
+        loop_seconds = per_query_seconds(vectors, TOP_K)
+
+        exact = None
+        if n <= EXACT_CHECK_MAX:
+            full = vectors @ vectors.T
+            np.fill_diagonal(full, -np.inf)
+            exact = np.argsort(-full, axis=1)[:, :TOP_K]
+            del full
+
+        for block_size in BLOCK_SIZES:
+            for threads in THREADS:
+                with limit_threads(threads):
+                    start = time.perf_counter()
+                    top_idx, _ = blocked_topk(vectors, TOP_K, block_size)
+                    elapsed = time.perf_counter() - start
+
+                result = {
+                    "chunks": n,
+                    "block_size": block_size,
+                    "threads": threads,
+                    "seconds": elapsed,
+                    "chunks_per_second": n / elapsed,
+                    "speedup_vs_loop": loop_seconds / elapsed,
+                    "block_mb": block_size * (block_size + TOP_K) * 4 * 2 / 1e6
+                }
+                if exact is not None:
+                    result["exact_match"] = float((top_idx == exact).mean())
+                results.append(result)
+                print(", ".join(
+                    f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}"
+                    for k, v in result.items()
+                ))
+
+    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or DEFAULT_SIZES)
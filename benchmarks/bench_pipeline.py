@@ -0,0 +1,194 @@
+"""
+End-to-end pipeline benchmark on a deterministic synthetic corpus.
+
+    python benchmarks/bench_pipeline.py --scale 2 --output bench_pipeline.json
+    python benchmarks/bench_pipeline.py --compare old.json
+
+Runs main.py (media + YouTube + PDFs), second.py (annotation) and third.py
+(embedding) against local fakes for MySQL, Groq and YouTube, times every
+stage and writes the results as JSON. With --compare the run is checked
+against an earlier results file and exits non-zero on regressions.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+import corpus
+import fakes
+
+timings = defaultdict(list)
+
+
+def timed(stage, fn):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[stage].append(time.perf_counter() - start)
+    return wrapper
+
+
+# patch module-level functions so calls from inside the scripts are timed too
+def instrument(module, *names):
+    for name in names:
+        setattr(module, name, timed(name, getattr(module, name)))
+
+
+class TimedEmbeddings:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts):
+        return timed("embed_documents", self.embeddings.embed_documents)(texts)
+
+    def embed_query(self, text):
+        return timed("embed_query", self.embeddings.embed_query)(text)
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "calls": len(values),
+        "total_s": sum(values),
+        "mean_s": sum(values) / len(values),
+        "p50_s": values[len(values) // 2],
+        "p95_s": values[min(int(len(values) * 0.95), len(values) - 1)],
+        "max_s": values[-1]
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_pipeline(work_dir, scale, llm_latency, llm_error_rate=0.0):
+    corpus_dir = os.path.join(work_dir, "corpus")
+    start = time.perf_counter()
+    summary = corpus.generate(corpus_dir, scale)
+    corpus_seconds = time.perf_counter() - start
+
+    fakes.install(os.path.join(work_dir, "registry.sqlite3"), llm_latency, llm_error_rate)
+    os.environ["CHROMA_DIR"] = os.path.join(work_dir, "chroma_db")
+
+    wall = time.perf_counter()
+
+    import main
+    main.BASE_FOLDER = corpus_dir
+    instrument(
+        main,
+        "generate_file_hash", "convert_video_to_audio", "transcribe_audio",
+        "transcribe_youtube", "clean_pdf_text", "process_pdfs"
+    )
+    main.process_local_files()
+    for video_id in summary["youtube"]:
+        main.transcribe_youtube(video_id)
+    main.process_pdfs()
+
+    import second
+    instrument(second, "annotate_chunks", "process_txt")
+    for file in sorted(os.listdir(corpus_dir)):
+        if file.endswith("_time.txt"):
+            second.process_txt(os.path.join(corpus_dir, file))
+    second.report_annotation()
+
+    import third
+    third.JSON_FOLDER = corpus_dir
+    third.vectorstore._embedding_function = TimedEmbeddings(
+        third.vectorstore._embedding_function
+    )
+    third.vectorstore.add_documents = timed(
+        "add_documents", third.vectorstore.add_documents
+    )
+    instrument(third, "process_json_file")
+    third.process_json_folder()
+
+    wall = time.perf_counter() - wall
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": scale,
+            "llm_latency_s": llm_latency,
+            "llm_error_rate": llm_error_rate,
+            "annotation": dict(second.annotation_stats),
+            "corpus": {k: len(v) for k, v in summary.items()},
+            "corpus_generation_s": corpus_seconds,
+            "wall_s": wall
+        },
+        "stages": {stage: summarize(v) for stage, v in sorted(timings.items())}
+    }
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"\n{'stage':<24} {'baseline s':>11} {'current s':>11} {'ratio':>7}")
+    for stage, current in results["stages"].items():
+        old = baseline["stages"].get(stage)
+        if not old:
+            continue
+        ratio = current["total_s"] / old["total_s"] if old["total_s"] else 1.0
+        flag = " REGRESSION" if ratio > 1 + threshold else ""
+        if flag:
+            regressions.append(stage)
+        print(f"{stage:<24} {old['total_s']:>11.3f} {current['total_s']:>11.3f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--work-dir", help="keep the corpus and outputs here")
+    parser.add_argument("--output", default="bench_pipeline.json")
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="simulated seconds per Groq call")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0,
+                        help="share of fake Groq replies that come back truncated")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown per stage before flagging")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="coachtk-bench-")
+    try:
+        results = run_pipeline(work_dir, args.scale, args.llm_latency, args.llm_error_rate)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'stage':<24} {'calls':>6} {'total s':>9} {'p50 s':>8} {'p95 s':>8}")
+    for stage, s in results["stages"].items():
+        print(f"{stage:<24} {s['calls']:>6} {s['total_s']:>9.3f} {s['p50_s']:>8.3f} {s['p95_s']:>8.3f}")
+    print(f"Results written to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
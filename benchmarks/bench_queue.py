@@ -0,0 +1,123 @@
+"""
+Job queue (worker.py) throughput and crash recovery on one machine.
+
+    python benchmarks/bench_queue.py [--jobs 200] [--processes 1 2 4] [--crash 5]
+
+Runs N worker processes against a fresh SQLite stand-in (or the MySQL
+database with REGISTRY_BACKEND=mysql) on synthetic "sleep" jobs. A few
+jobs kill their worker on the first attempt, so their lease has to
+expire before another worker takes them over. Checks that every job ends
+up done and ran to completion exactly once, and reports jobs/s per
+worker count.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+os.environ.setdefault("REGISTRY_BACKEND", "sqlite")
+os.environ.setdefault("JOB_POLL", "0.2")
+
+RESULTS_FILE = os.getenv("BENCH_RESULTS_FILE", "bench_queue.json")
+JOB_SECONDS = 0.05
+LEASE = 2.0
+
+
+def sleep_job(target):
+    # target is "<log path>|<job name>|<crash marker or empty>"
+    log_path, name, crash_marker = target.split("|")
+    if crash_marker and not os.path.exists(crash_marker):
+        open(crash_marker, "w").close()
+        os._exit(1)  # worker dies mid-job, lease left behind
+
+    time.sleep(JOB_SECONDS)
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(name + "\n")
+
+
+def bench_worker(lease):
+    import worker
+
+    worker.HANDLERS["sleep"] = sleep_job
+    worker.run_worker(["sleep"], lease, drain=True)
+
+
+def run(jobs, processes, crashes, workdir):
+    import registry
+
+    log_path = os.path.join(workdir, "completed.log")
+    for i in range(jobs):
+        crash_marker = os.path.join(workdir, f"crash-{i}") if i < crashes else ""
+        registry.enqueue_job("sleep", f"{log_path}|job-{i}|{crash_marker}")
+
+    start = time.perf_counter()
+    # crashed workers are replaced until the queue drains, as a supervisor would
+    workers = [multiprocessing.Process(target=bench_worker, args=(LEASE,)) for _ in range(processes)]
+    for p in workers:
+        p.start()
+    while workers:
+        time.sleep(0.1)
+        for p in [p for p in workers if not p.is_alive()]:
+            workers.remove(p)
+            if p.exitcode != 0 and registry.job_counts().get(("sleep", "done"), 0) < jobs:
+                replacement = multiprocessing.Process(target=bench_worker, args=(LEASE,))
+                replacement.start()
+                workers.append(replacement)
+    elapsed = time.perf_counter() - start
+
+    with open(log_path, "r", encoding="utf-8") as f:
+        completed = f.read().split()
+    counts = registry.job_counts()
+    attempts = registry.execute("SELECT SUM(attempts) FROM jobs WHERE kind = 'sleep'", fetch="one")[0]
+
+    return {
+        "jobs": jobs,
+        "processes": processes,
+        "crashes": crashes,
+        "seconds": elapsed,
+        "jobs_per_second": jobs / elapsed,
+        "done": counts.get(("sleep", "done"), 0),
+        "failed": counts.get(("sleep", "failed"), 0),
+        "reclaimed": attempts - jobs,
+        "completed_once": len(completed) == len(set(completed)) == jobs
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--crash", type=int, default=5, help="jobs that kill their first worker")
+    args = parser.parse_args()
+
+    results = []
+    for processes in args.processes:
+        with tempfile.TemporaryDirectory() as workdir:
+            import registry
+
+            registry.REGISTRY_SQLITE_PATH = os.path.join(workdir, "registry.sqlite3")
+            registry._local.__dict__.clear()
+            if not registry.is_sqlite():
+                registry.execute("DELETE FROM jobs WHERE kind = 'sleep'")
+
+            result = run(args.jobs, processes, args.crash, workdir)
+            registry._local.__dict__.clear()
+
+        results.append(result)
+        print(", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in result.items()))
+        if not result["completed_once"] or result["done"] != args.jobs:
+            print("  queue lost or repeated work")
+
+    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
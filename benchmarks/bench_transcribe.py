@@ -0,0 +1,160 @@
+"""
+Compare transcription backends on a fixed local clip set.
+
+Every clip in CLIPS_DIR (any of the audio extensions below) needs a
+reference transcript next to it named <clip>.ref.txt (plain text).
+
+    python benchmarks/bench_transcribe.py whisper:base faster-whisper:base
+
+Append "+vad" to a config (e.g. whisper:base+vad) to cut silences first.
+
+Reports real-time factor (processing time / audio duration, lower is
+better) and word error rate against the reference for each backend.
+"""
+import os
+import re
+import sys
+import json
+import time
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from transcriber import load_transcriber, transcribe_file
+
+CLIPS_DIR = os.getenv(
+    "BENCH_CLIPS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "clips")
+)
+RESULTS_FILE = os.getenv("BENCH_RESULTS_FILE", "bench_transcribe.json")
+CLIP_EXTENSIONS = (".mp3", ".wav", ".m4a")
+DEFAULT_CONFIGS = ["whisper:base", "faster-whisper:base"]
+
+
+def audio_duration(path):
+    out = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            path
+        ],
+        check=True,
+        capture_output=True,
+        text=True
+    )
+    return float(out.stdout.strip())
+
+
+def normalize_words(text):
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+# word-level levenshtein distance / reference length
+def word_error_rate(reference, hypothesis):
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, start=1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, start=1):
+            cur[j] = min(
+                prev[j] + 1,
+                cur[j - 1] + 1,
+                prev[j - 1] + (r != h)
+            )
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def load_clips():
+    clips = []
+    if not os.path.isdir(CLIPS_DIR):
+        return clips
+
+    for file in sorted(os.listdir(CLIPS_DIR)):
+        if not file.lower().endswith(CLIP_EXTENSIONS):
+            continue
+
+        path = os.path.join(CLIPS_DIR, file)
+        ref_path = os.path.splitext(path)[0] + ".ref.txt"
+        if not os.path.exists(ref_path):
+            print(f"Skipped (no reference): {file}")
+            continue
+
+        with open(ref_path, "r", encoding="utf-8") as f:
+            reference = f.read()
+        clips.append((path, reference, audio_duration(path)))
+    return clips
+
+
+def run_config(config, clips):
+    config_name, vad = config, config.endswith("+vad")
+    config = config.removesuffix("+vad")
+    backend, _, model_size = config.partition(":")
+
+    start = time.perf_counter()
+    transcriber = load_transcriber(backend, model_size or None)
+    load_time = time.perf_counter() - start
+
+    total_audio = total_time = total_errors = total_words = 0
+    per_clip = []
+    for path, reference, duration in clips:
+        start = time.perf_counter()
+        segments = transcribe_file(transcriber, path, vad=vad)
+        elapsed = time.perf_counter() - start
+
+        hypothesis = " ".join(seg["text"].strip() for seg in segments)
+        wer = word_error_rate(reference, hypothesis)
+        ref_words = len(normalize_words(reference))
+
+        total_audio += duration
+        total_time += elapsed
+        total_errors += wer * ref_words
+        total_words += ref_words
+        per_clip.append({
+            "clip": os.path.basename(path),
+            "duration": duration,
+            "seconds": elapsed,
+            "rtf": elapsed / duration if duration else 0.0,
+            "wer": wer
+        })
+        print(f"  {os.path.basename(path)}: rtf={per_clip[-1]['rtf']:.3f} wer={wer:.3f}")
+
+    return {
+        "config": config_name,
+        "load_seconds": load_time,
+        "audio_seconds": total_audio,
+        "rtf": total_time / total_audio if total_audio else None,
+        "wer": total_errors / total_words if total_words else None,
+        "clips": per_clip
+    }
+
+
+def main(configs):
+    clips = load_clips()
+    if not clips:
+        print(f"No clips with references found in {CLIPS_DIR}")
+        return
+
+    results = []
+    for config in configs:
+        print(f"Benchmarking {config} on {len(clips)} clips")
+        results.append(run_config(config, clips))
+
+    print()
+    print(f"{'config':<28} {'load s':>8} {'RTF':>8} {'WER':>8}")
+    for r in results:
+        print(f"{r['config']:<28} {r['load_seconds']:>8.2f} {r['rtf']:>8.3f} {r['wer']:>8.3f}")
+
+    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or DEFAULT_CONFIGS)
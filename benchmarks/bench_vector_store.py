@@ -0,0 +1,186 @@
+"""
+Chroma vs the memory-mapped vector store (vector_store.py) on the same chunks.
+
+    python benchmarks/bench_vector_store.py [CORPUS_DIR]
+
+CORPUS_DIR holds chunk JSON files as written by second.py and a
+queries.txt (one query per line). Texts and queries are embedded once;
+every backend then runs in its own process so build time, load time,
+query latency and RSS are not mixed up. recall@10 is measured against
+exact cosine search.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from bench_embeddings import load_corpus
+
+CORPUS_DIR = os.getenv("BENCH_CORPUS_DIR", os.path.join(BENCH_DIR, "data"))
+RESULTS_FILE = os.getenv("BENCH_RESULTS_FILE", "bench_vector_store.json")
+BACKENDS = ["chroma", "memmap:hnswlib", "memmap:faiss", "memmap:numpy"]
+TOP_K = 10
+
+
+def rss_mb():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3  # peak, KB on Linux
+
+
+# ---------------- child: one backend ----------------
+def build_chroma(work_dir, texts, vectors):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=work_dir)
+    collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+    for i in range(0, len(texts), 512):
+        collection.add(
+            ids=[str(j) for j in range(i, min(i + 512, len(texts)))],
+            embeddings=vectors[i:i + 512].tolist(),
+            documents=texts[i:i + 512]
+        )
+
+
+def open_chroma(work_dir):
+    import chromadb
+
+    collection = chromadb.PersistentClient(path=work_dir).get_collection("bench")
+
+    def search(q):
+        ids = collection.query(query_embeddings=[q.tolist()], n_results=TOP_K)["ids"][0]
+        return [int(i) for i in ids]
+    return search
+
+
+def build_memmap(work_dir, texts, vectors, index):
+    from vector_store import MemmapVectorStore
+
+    store = MemmapVectorStore(None, directory=work_dir, index=index)
+    # the row number is the position in texts, so results compare directly
+    store.add_embeddings(texts, vectors, [{"chunk_hash": str(i)} for i in range(len(texts))])
+    store.persist()
+
+
+def open_memmap(work_dir, index):
+    from vector_store import MemmapVectorStore
+
+    store = MemmapVectorStore(None, directory=work_dir, index=index)
+
+    def search(q):
+        return [int(r) for r in store.search_rows(q, TOP_K)[0]]
+    return search
+
+
+def child(backend, data_path, work_dir):
+    data = np.load(data_path, allow_pickle=True)
+    texts, vectors, queries = list(data["texts"]), data["vectors"], data["queries"]
+    kind, _, index = backend.partition(":")
+
+    if kind == "memmap" and index != "numpy":
+        try:
+            __import__(index)
+        except ImportError:
+            print(json.dumps({"backend": backend, "skipped": f"{index} not installed"}))
+            return
+
+    start = time.perf_counter()
+    if kind == "chroma":
+        build_chroma(work_dir, texts, vectors)
+    else:
+        build_memmap(work_dir, texts, vectors, index)
+    build_seconds = time.perf_counter() - start
+
+    # reopening is what a query process pays
+    start = time.perf_counter()
+    search = open_chroma(work_dir) if kind == "chroma" else open_memmap(work_dir, index)
+    load_seconds = time.perf_counter() - start
+
+    search(queries[0])  # warm-up (memmap indexes load lazily)
+    latencies = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(search(q))
+        latencies.append(time.perf_counter() - start)
+
+    print(json.dumps({
+        "backend": backend,
+        "build_seconds": build_seconds,
+        "load_seconds": load_seconds,
+        "query_p50_ms": 1000 * float(np.percentile(latencies, 50)),
+        "rss_mb": rss_mb(),
+        "results": results
+    }))
+
+
+# ---------------- parent ----------------
+def main(corpus_dir):
+    texts, queries = load_corpus(corpus_dir)
+    if not texts or not queries:
+        print(f"Need chunk JSON and queries.txt in {corpus_dir}")
+        return
+
+    from embedding_backend import load_embeddings
+
+    embeddings = load_embeddings()
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    query_vecs = np.asarray([embeddings.embed_query(q) for q in queries], dtype=np.float32)
+    query_vecs /= np.clip(np.linalg.norm(query_vecs, axis=1, keepdims=True), 1e-12, None)
+    print(f"{len(texts)} chunks, {len(queries)} queries")
+
+    exact = np.argsort(-(query_vecs @ vectors.T), axis=1)[:, :TOP_K]
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_vectors_")
+    data_path = os.path.join(tmp_dir, "data.npz")
+    np.savez(data_path, texts=np.array(texts, dtype=object), vectors=vectors, queries=query_vecs)
+
+    results = []
+    try:
+        for backend in BACKENDS:
+            work_dir = os.path.join(tmp_dir, backend.replace(":", "_"))
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", backend, data_path, work_dir],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+
+            if "results" in result:
+                found = result.pop("results")
+                result[f"recall@{TOP_K}"] = float(np.mean([
+                    len(set(got) & set(want.tolist())) / TOP_K
+                    for got, want in zip(found, exact)
+                ]))
+            results.append(result)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print()
+    for r in results:
+        print(", ".join(
+            f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}"
+            for k, v in r.items()
+        ))
+
+    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:5])
+    else:
+        main(sys.argv[1] if len(sys.argv) > 1 else CORPUS_DIR)
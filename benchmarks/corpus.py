@@ -0,0 +1,188 @@
+"""
+Deterministic synthetic corpus for the pipeline benchmarks.
+
+    python benchmarks/corpus.py OUTPUT_DIR [SCALE]
+
+Produces tone-burst audio/video clips (ffmpeg lavfi sources), generated
+PDFs with the headers/page numbers/URLs clean_pdf_text strips, and canned
+[MM:SS - MM:SS] transcripts. The same SCALE always gives the same files.
+"""
+import os
+import sys
+import random
+import subprocess
+
+SEED = 2024
+
+WORDS = (
+    "leadership team vision strategy mindset habit growth feedback coach "
+    "goal client value trust focus market product decision execution "
+    "culture hiring promotion career learning practice system process "
+    "framework example story advice energy discipline priority outcome "
+    "customer revenue delivery quality change conversation manager"
+).split()
+
+
+def sentence(rng, n_min=8, n_max=18):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(n_min, n_max))]
+    return " ".join(words).capitalize() + "."
+
+
+def fmt(seconds):
+    m, s = divmod(int(seconds), 60)
+    return f"{m:02d}:{s:02d}"
+
+
+# (start, end, text) lines of a fake talk, seeded by name
+def transcript_lines(name, n_lines):
+    rng = random.Random(f"{SEED}-{name}")
+    t = 0.0
+    lines = []
+    for _ in range(n_lines):
+        duration = rng.uniform(2.0, 8.0)
+        lines.append((t, t + duration, sentence(rng)))
+        t += duration + rng.uniform(0.0, 1.5)
+    return lines
+
+
+def write_transcript(path, name, n_lines):
+    with open(path, "w", encoding="utf-8") as f:
+        for start, end, text in transcript_lines(name, n_lines):
+            f.write(f"[{fmt(start)} - {fmt(end)}] {text}\n")
+
+
+# 6s tone every 10s, so there is something for VAD to skip
+def tone_source(duration, frequency):
+    return (
+        f"aevalsrc='0.3*sin(2*PI*{frequency}*t)*lt(mod(t,10),6)'"
+        f":s=16000:d={duration}"
+    )
+
+
+def make_audio(path, duration, frequency):
+    subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-v", "error", "-y",
+            "-f", "lavfi", "-i", tone_source(duration, frequency),
+            path
+        ],
+        check=True
+    )
+
+
+def make_video(path, duration, frequency):
+    subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-v", "error", "-y",
+            "-f", "lavfi", "-i", f"testsrc=size=160x120:rate=5:duration={duration}",
+            "-f", "lavfi", "-i", tone_source(duration, frequency),
+            "-c:v", "mpeg4", "-c:a", "aac", "-shortest",
+            path
+        ],
+        check=True
+    )
+
+
+def pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+# minimal single-font PDF writer, enough for pypdf to extract text
+def make_pdf(path, pages):
+    n = len(pages)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        (
+            "<< /Type /Pages /Kids ["
+            + " ".join(f"{4 + 2 * i} 0 R" for i in range(n))
+            + f"] /Count {n} >>"
+        ).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, lines in enumerate(pages):
+        objects.append(
+            (
+                "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                "/Resources << /Font << /F1 3 0 R >> >> "
+                f"/Contents {5 + 2 * i} 0 R >>"
+            ).encode()
+        )
+        stream = (
+            "BT /F1 9 Tf 11 TL 40 770 Td "
+            + " ".join(f"({pdf_escape(line)}) '" for line in lines)
+            + " ET"
+        ).encode("latin-1")
+        objects.append(
+            f"<< /Length {len(stream)} >>\nstream\n".encode()
+            + stream + b"\nendstream"
+        )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{num} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def pdf_pages(name, n_pages):
+    rng = random.Random(f"{SEED}-{name}")
+    pages = []
+    for page in range(1, n_pages + 1):
+        lines = [f"c01.indd Page {page} 01/02/20 10:15 AM"]
+        lines += [sentence(rng, 6, 12) for _ in range(rng.randint(30, 55))]
+        if rng.random() < 0.3:
+            lines.append("https://example.com/resources")
+        lines.append(str(page))
+        pages.append(lines)
+    return pages
+
+
+def generate(output_dir, scale=1):
+    """
+    Write the corpus into output_dir and return a summary dict.
+    scale multiplies the number of files, not their size.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    summary = {"audio": [], "video": [], "pdf": [], "transcripts": [], "youtube": []}
+
+    for i in range(2 * scale):
+        path = os.path.join(output_dir, f"clip{i:03d}.wav")
+        make_audio(path, 60 + 30 * (i % 3), 200 + 40 * i)
+        summary["audio"].append(path)
+
+    for i in range(scale):
+        path = os.path.join(output_dir, f"talk{i:03d}.mp4")
+        make_video(path, 90, 300 + 50 * i)
+        summary["video"].append(path)
+
+    for i in range(scale):
+        path = os.path.join(output_dir, f"book{i:03d}.pdf")
+        make_pdf(path, pdf_pages(path, 20))
+        summary["pdf"].append(path)
+
+    for i in range(3 * scale):
+        path = os.path.join(output_dir, f"session{i:03d}_time.txt")
+        write_transcript(path, f"session{i}", 150)
+        summary["transcripts"].append(path)
+
+    summary["youtube"] = [f"fakeYT{i:05d}" for i in range(scale)]
+    return summary
+
+
+if __name__ == "__main__":
+    output_dir = sys.argv[1]
+    scale = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    summary = generate(output_dir, scale)
+    print({k: len(v) for k, v in summary.items()})
@@ -0,0 +1,116 @@
+"""
+Local stand-ins for the external services the pipeline talks to, so the
+benchmarks run offline and deterministically:
+
+- MySQL -> SQLite file (registry.py's REGISTRY_BACKEND=sqlite)
+- Groq (langchain_groq.ChatGroq) -> canned JSON built from the chunk text,
+  optionally malformed for a share of calls (llm_error_rate) to exercise
+  second.py's repair and retry path; topic-only calls get one topic per excerpt
+- YouTube (youtube_transcript_api) -> canned transcripts
+
+install() must run before the pipeline scripts are imported.
+"""
+import os
+import re
+import sys
+import json
+import time
+import types
+import random
+import hashlib
+
+from corpus import transcript_lines
+
+DOMAINS = ["Leadership", "Mindset", "IT", "Strategy"]
+CONTENT_TYPES = ["Framework", "Example", "Story", "Advice"]
+TIMESTAMP_RE = re.compile(r"\[\d{2,}:\d{2}\s*-\s*\d{2,}:\d{2}\]")
+
+
+# ---------------- Groq ----------------
+def fake_llm_reply(text, latency, error_rate=0.0, attempt=0):
+    if latency:
+        time.sleep(latency)
+
+    stamps = TIMESTAMP_RE.findall(text)
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).hexdigest())
+    reply = json.dumps({
+        "domain": rng.choice(DOMAINS),
+        "topic": " ".join(rng.sample(text.split() or ["topic"], 1)),
+        "content_type": rng.choice(CONTENT_TYPES),
+        "first_timestamp": stamps[0] if stamps else None,
+        "last_timestamp": stamps[-1] if stamps else None,
+        "cleaned_text": TIMESTAMP_RE.sub("", text).strip()
+    })
+
+    # retries are seeded differently, so a failed chunk usually succeeds next time
+    if random.Random(f"{text}-{attempt}").random() < error_rate:
+        return reply[:len(reply) // 2]
+    return reply
+
+
+def fake_topics_reply(excerpts, latency):
+    if latency:
+        time.sleep(latency)
+    return json.dumps({
+        "topics": [
+            " ".join(random.Random(text).sample(text.split() or ["topic"], 1))
+            for text in excerpts
+        ]
+    })
+
+
+def fake_groq_module(latency, error_rate=0.0):
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+
+    # bound kwargs such as response_format arrive here and are ignored
+    def invoke(prompt_value, **kwargs):
+        prompt = prompt_value.to_string()
+        if "EXCERPTS:" in prompt:
+            # second.py's batched topic-only call
+            excerpts = re.split(r"^### \d+\n", prompt.split("EXCERPTS:", 1)[1], flags=re.M)[1:]
+            reply = fake_topics_reply(excerpts, latency)
+        else:
+            attempt = 1 if "previous reply" in prompt else 0
+            reply = fake_llm_reply(prompt.rsplit("TEXT:", 1)[-1].strip(), latency, error_rate, attempt)
+        return AIMessage(
+            content=reply,
+            usage_metadata={
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(reply) // 4,
+                "total_tokens": (len(prompt) + len(reply)) // 4
+            }
+        )
+
+    groq = types.ModuleType("langchain_groq")
+    groq.ChatGroq = lambda **kwargs: RunnableLambda(invoke)
+    return groq
+
+
+# ---------------- YouTube ----------------
+class FakeSnippet:
+    def __init__(self, start, duration, text):
+        self.start = start
+        self.duration = duration
+        self.text = text
+
+
+class FakeYouTubeTranscriptApi:
+    def fetch(self, video_id):
+        return [
+            FakeSnippet(start, end - start, text)
+            for start, end, text in transcript_lines(video_id, 120)
+        ]
+
+
+def fake_youtube_module():
+    youtube = types.ModuleType("youtube_transcript_api")
+    youtube.YouTubeTranscriptApi = FakeYouTubeTranscriptApi
+    return youtube
+
+
+def install(db_path, llm_latency=0.0, llm_error_rate=0.0):
+    os.environ["REGISTRY_BACKEND"] = "sqlite"
+    os.environ["REGISTRY_SQLITE_PATH"] = db_path
+    sys.modules["langchain_groq"] = fake_groq_module(llm_latency, llm_error_rate)
+    sys.modules["youtube_transcript_api"] = fake_youtube_module()
@@ -0,0 +1,331 @@
+"""
+Sharding, fan-out queries and compaction for the Chroma chunk store.
+
+    python chroma_tools.py stats
+    python chroma_tools.py shard --by source_type|domain [--keep-source]
+    python chroma_tools.py compact
+    python chroma_tools.py query "how do I give feedback" [-k 5]
+
+With CHROMA_SHARD_BY=source_type (or domain) third.py writes each chunk
+into podcast_chunks__<value> instead of the single podcast_chunks
+collection, so every HNSW index stays small. query() embeds the question
+once, searches every shard and merges the hits by distance.
+
+compact drops chunks whose JSON file is gone (orphaned) or has changed
+since they were embedded (superseded by a regenerated transcript), plus
+repeated copies of the same text, then recreates each collection from
+the surviving vectors. Chroma only tombstones deletes, so recreating is
+what actually rebuilds the HNSW index; the new copy is built beside the
+old one and swapped in only when complete. shard and compact print index
+size and query latency before and after.
+"""
+import os
+import re
+import time
+import hashlib
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHROMA_DIR = os.getenv("CHROMA_DIR", os.path.join(BASE_DIR, "chroma_db"))
+COLLECTION_NAME = "podcast_chunks"
+CHROMA_SHARD_BY = os.getenv("CHROMA_SHARD_BY", "")  # "", "source_type" or "domain"
+SHARD_KEYS = ("source_type", "domain")
+BATCH_SIZE = 512
+REBUILD_SUFFIX = "-rebuild"  # never produced by shard_name's slugs
+LATENCY_RUNS = 5
+
+PROBE_QUERIES = [
+    "how to give feedback to a team member",
+    "building a long term vision",
+    "habits for a growth mindset",
+    "deciding between two strategies",
+    "hiring and promotion decisions",
+]
+
+_stores = {}
+
+
+# ---------------- shards ----------------
+def shard_name(metadata, by=CHROMA_SHARD_BY):
+    """Collection a chunk with this metadata belongs to."""
+    if not by:
+        return COLLECTION_NAME
+    value = str(metadata.get(by) or "unknown")
+    slug = re.sub(r"[^a-z0-9]+", "_", value.lower()).strip("_") or "unknown"
+    return f"{COLLECTION_NAME}__{slug}"
+
+
+def open_store(name, embeddings):
+    """LangChain Chroma store for one collection, opened once per process."""
+    if name not in _stores:
+        from langchain_community.vectorstores import Chroma
+
+        _stores[name] = Chroma(
+            collection_name=name,
+            persist_directory=CHROMA_DIR,
+            embedding_function=embeddings
+        )
+    return _stores[name]
+
+
+def get_client():
+    import chromadb
+    return chromadb.PersistentClient(path=CHROMA_DIR)
+
+
+def collection_names(client):
+    # older chromadb returns Collection objects, newer ones plain names
+    names = [getattr(c, "name", c) for c in client.list_collections()]
+    return sorted(
+        n for n in names
+        if (n == COLLECTION_NAME or n.startswith(COLLECTION_NAME + "__")) and not n.endswith(REBUILD_SUFFIX)
+    )
+
+
+def query(client, query_embedding, k=5):
+    """Top-k (distance, document, metadata) over every shard."""
+    hits = []
+    for name in collection_names(client):
+        collection = client.get_collection(name)
+        if not collection.count():
+            continue
+        result = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=min(k, collection.count()),
+            include=["documents", "metadatas", "distances"]
+        )
+        hits.extend(zip(
+            result["distances"][0], result["documents"][0], result["metadatas"][0]
+        ))
+    return sorted(hits, key=lambda hit: hit[0])[:k]
+
+
+# ---------------- measurements ----------------
+def index_size():
+    total = 0
+    for root, _, files in os.walk(CHROMA_DIR):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def measure(client, query_embeddings, label):
+    latencies = []
+    for _ in range(LATENCY_RUNS):
+        for vec in query_embeddings:
+            start = time.perf_counter()
+            query(client, vec)
+            latencies.append(time.perf_counter() - start)
+
+    names = collection_names(client)
+    chunks = sum(client.get_collection(n).count() for n in names)
+    result = {
+        "collections": len(names),
+        "chunks": chunks,
+        "size_mb": index_size() / 1e6,
+        "p50_ms": 1000 * float(np.percentile(latencies, 50)) if latencies else 0.0,
+        "p95_ms": 1000 * float(np.percentile(latencies, 95)) if latencies else 0.0
+    }
+    print(
+        f"{label}: {result['collections']} collections, {chunks} chunks, "
+        f"{result['size_mb']:.1f} MB, query p50 {result['p50_ms']:.1f} ms "
+        f"p95 {result['p95_ms']:.1f} ms"
+    )
+    return result
+
+
+def probe_embeddings():
+    from embedding_backend import load_embeddings
+    return load_embeddings().embed_documents(PROBE_QUERIES)
+
+
+# ---------------- export / rebuild ----------------
+def export_rows(collection):
+    """All (id, embedding, document, metadata) rows of a collection."""
+    rows = []
+    total = collection.count()
+    for offset in range(0, total, BATCH_SIZE):
+        batch = collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=BATCH_SIZE,
+            offset=offset
+        )
+        rows.extend(zip(
+            batch["ids"],
+            np.asarray(batch["embeddings"], dtype=np.float32),  # float32 rows, not lists of floats
+            batch["documents"],
+            [m or {} for m in batch["metadatas"]]
+        ))
+    return rows
+
+
+def add_rows(collection, rows):
+    for i in range(0, len(rows), BATCH_SIZE):
+        ids, vectors, documents, metadatas = zip(*rows[i:i + BATCH_SIZE])
+        collection.add(
+            ids=list(ids),
+            embeddings=np.asarray(vectors, dtype=np.float32).tolist(),
+            documents=list(documents),
+            metadatas=[m or None for m in metadatas]
+        )
+
+
+def recreate(client, name, rows):
+    """
+    Rebuild a collection from rows; a fresh collection gets a fresh HNSW
+    graph with no tombstones. The rows go into <name>-rebuild first and
+    it replaces the original only once its count checks out, so a failure
+    while adding leaves the original untouched.
+    """
+    old = client.get_collection(name)
+    rebuild_name = name + REBUILD_SUFFIX
+    if rebuild_name in [getattr(c, "name", c) for c in client.list_collections()]:
+        client.delete_collection(rebuild_name)  # an earlier rebuild that never finished
+
+    collection = client.create_collection(rebuild_name, metadata=old.metadata)
+    try:
+        add_rows(collection, rows)
+        if collection.count() != len(rows):
+            raise RuntimeError(f"{rebuild_name} holds {collection.count()} of {len(rows)} rows")
+    except BaseException:
+        client.delete_collection(rebuild_name)
+        raise
+
+    client.delete_collection(name)
+    collection.modify(name=name)
+    return collection
+
+
+def recover_rebuilds(client):
+    """Finish a swap interrupted after the original was deleted."""
+    names = [getattr(c, "name", c) for c in client.list_collections()]
+    for rebuild_name in names:
+        if not rebuild_name.endswith(REBUILD_SUFFIX):
+            continue
+        name = rebuild_name[:-len(REBUILD_SUFFIX)]
+        if name in names:
+            continue  # the original is intact; recreate() discards the leftover
+        client.get_collection(rebuild_name).modify(name=name)
+        print(f"Restored {name} from an interrupted rebuild")
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(8192), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ---------------- commands ----------------
+def stats(client):
+    for name in collection_names(client):
+        print(f"{name}: {client.get_collection(name).count()} chunks")
+    print(f"Index size: {index_size() / 1e6:.1f} MB at {CHROMA_DIR}")
+
+
+def shard(client, by, keep_source=False):
+    if COLLECTION_NAME not in collection_names(client):
+        print(f"No {COLLECTION_NAME} collection to shard")
+        return
+
+    probes = probe_embeddings()
+    measure(client, probes, "Before")
+
+    source = client.get_collection(COLLECTION_NAME)
+    shards = {}
+    for row in export_rows(source):
+        shards.setdefault(shard_name(row[3], by), []).append(row)
+
+    for name, rows in sorted(shards.items()):
+        collection = client.get_or_create_collection(name, metadata=source.metadata)
+        add_rows(collection, rows)
+        print(f"{name}: {len(rows)} chunks")
+
+    if not keep_source:
+        client.delete_collection(COLLECTION_NAME)
+
+    measure(client, probes, "After")
+    print(f"Set CHROMA_SHARD_BY={by} so third.py writes into the shards")
+
+
+def compact(client):
+    probes = probe_embeddings()
+    measure(client, probes, "Before")
+
+    current_hash = {}
+    for name in collection_names(client):
+        rows = export_rows(client.get_collection(name))
+        live = []
+        seen = set()
+        orphaned = superseded = repeated = 0
+
+        for row in rows:
+            _, _, document, metadata = row
+            path = metadata.get("source_path")
+
+            if path:
+                if path not in current_hash:
+                    current_hash[path] = file_hash(path) if os.path.exists(path) else None
+                if current_hash[path] is None:
+                    orphaned += 1
+                    continue
+                if metadata.get("source_hash") not in (None, current_hash[path]):
+                    superseded += 1
+                    continue
+
+            text_key = metadata.get("chunk_hash") or document
+            if text_key in seen:
+                repeated += 1
+                continue
+            seen.add(text_key)
+            live.append(row)
+
+        recreate(client, name, live)
+        print(
+            f"{name}: kept {len(live)}/{len(rows)} "
+            f"(orphaned {orphaned}, superseded {superseded}, repeated {repeated})"
+        )
+
+    measure(client, probes, "After")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chroma sharding and compaction")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("stats", help="chunks per collection and index size")
+
+    shard_parser = sub.add_parser("shard", help="split podcast_chunks into shards")
+    shard_parser.add_argument("--by", choices=SHARD_KEYS, required=True)
+    shard_parser.add_argument("--keep-source", action="store_true")
+
+    sub.add_parser("compact", help="drop orphaned/superseded chunks and rebuild HNSW")
+
+    query_parser = sub.add_parser("query", help="fan-out query over every shard")
+    query_parser.add_argument("text")
+    query_parser.add_argument("-k", type=int, default=5)
+
+    args = parser.parse_args()
+    client = get_client()
+    recover_rebuilds(client)  # before anything reads the collection list
+
+    if args.command == "stats":
+        stats(client)
+    elif args.command == "shard":
+        shard(client, args.by, args.keep_source)
+    elif args.command == "compact":
+        compact(client)
+    elif args.command == "query":
+        from embedding_backend import load_embeddings
+
+        vec = load_embeddings().embed_query(args.text)
+        for distance, document, metadata in query(client, vec, args.k):
+            print(f"{distance:.4f}  [{metadata.get('source', '?')} {metadata.get('timestamp') or ''}] {document[:120]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Segment-aware chunking for transcripts.
+
+Whisper/YouTube transcripts are lists of "[MM:SS - MM:SS] text" lines.
+Instead of cutting them every 1000 characters with overlap, whole lines
+are grouped into chunks that stay under a token budget and also break
+where the topic shifts: every line is embedded once, neighbouring
+windows of lines are compared by cosine similarity, and unusually low
+similarity marks a boundary. Text without timestamps (cleaned PDFs) is
+handled the same way with sentences as segments.
+
+Chunks are made once, in second.py; third.py embeds them as they are.
+"""
+import os
+import re
+import numpy as np
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))  # MiniLM's max sequence length
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "64"))  # never split a topic smaller than this
+CHUNK_TOPIC_SHIFT = os.getenv("CHUNK_TOPIC_SHIFT", "1") == "1"
+CHUNK_WINDOW = 3  # lines on each side of a candidate boundary
+TOKENS_PER_WORD = 1.3  # rough word-piece count for English
+
+LINE_RE = re.compile(r"^\[(\d{2,}):(\d{2})\s*-\s*(\d{2,}):(\d{2})\]\s*(.*)$")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def count_tokens(text):
+    return int(len(text.split()) * TOKENS_PER_WORD) + 1
+
+
+def parse_transcript(text):
+    """[{"start", "end", "stamp", "text", "line"}, ...]; times are None for untimed text."""
+    segments = []
+    for line in text.splitlines():
+        line = line.strip()
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        sm, ss, em, es, body = match.groups()
+        if not body.strip():
+            continue
+        segments.append({
+            "start": int(sm) * 60 + int(ss),
+            "end": int(em) * 60 + int(es),
+            "stamp": f"{sm}:{ss} - {em}:{es}",
+            "text": body.strip(),
+            "line": line
+        })
+
+    if segments:
+        return segments
+
+    # no timestamps (e.g. a cleaned PDF): sentences are the segments
+    return [
+        {"start": None, "end": None, "stamp": None, "text": s, "line": s}
+        for s in SENTENCE_RE.split(text.replace("\n", " "))
+        if s.strip()
+    ]
+
+
+def topic_shifts(segments, embeddings, window=CHUNK_WINDOW):
+    """Indexes i where a new topic starts at segments[i]."""
+    if len(segments) < 2 * window:
+        return set()
+
+    vectors = np.asarray(
+        embeddings.embed_documents([seg["text"] for seg in segments]),
+        dtype=np.float32
+    )
+    vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+    # running sums give every window mean in O(n)
+    cumsum = np.vstack([np.zeros((1, vectors.shape[1]), np.float32), np.cumsum(vectors, axis=0)])
+    n = len(segments)
+    idx = np.arange(1, n)
+    left = cumsum[idx] - cumsum[np.maximum(idx - window, 0)]
+    right = cumsum[np.minimum(idx + window, n)] - cumsum[idx]
+    sims = np.sum(left * right, axis=1) / np.clip(
+        np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1), 1e-12, None
+    )
+
+    # adaptive threshold: a boundary is a dip well below this transcript's usual coherence
+    threshold = sims.mean() - sims.std()
+    return {int(i) for i in idx[sims < threshold]}
+
+
+def _make_chunk(segments):
+    first, last = segments[0], segments[-1]
+    timestamp = None
+    if first["stamp"] and last["stamp"]:
+        timestamp = f"{first['stamp'].split(' - ')[0]} - {last['stamp'].split(' - ')[1]}"
+
+    return {
+        "text": "\n".join(seg["line"] for seg in segments),
+        "timestamp": timestamp,
+        "start": first["start"],
+        "end": last["end"],
+        "tokens": sum(count_tokens(seg["text"]) for seg in segments)
+    }
+
+
+def chunk_segments(segments, embeddings=None, max_tokens=CHUNK_MAX_TOKENS,
+                   min_tokens=CHUNK_MIN_TOKENS):
+    shifts = topic_shifts(segments, embeddings) if embeddings is not None else set()
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for i, seg in enumerate(segments):
+        tokens = count_tokens(seg["text"])
+        over_budget = current_tokens + tokens > max_tokens
+        new_topic = i in shifts and current_tokens >= min_tokens
+
+        if current and (over_budget or new_topic):
+            chunks.append(_make_chunk(current))
+            current = []
+            current_tokens = 0
+
+        current.append(seg)
+        current_tokens += tokens
+
+    if current:
+        chunks.append(_make_chunk(current))
+    return chunks
+
+
+def chunk_text(text, embeddings=None):
+    return chunk_segments(parse_transcript(text), embeddings)
@@ -0,0 +1,231 @@
+"""
+Local chunk classifiers for domain / content_type (CLASSIFIER_BACKEND).
+
+    llm        every chunk goes to ChatGroq (default, as before)
+    embedding  logistic regression over the MiniLM embeddings; thousands
+               of chunks/s on CPU, trained from chunks the LLM labelled
+    llamacpp   a small local GGUF model via llama-cpp-python, constrained
+               to the allowed labels by a grammar; no network, but tens
+               of chunks/s rather than thousands
+
+second.py only sends a chunk to the LLM for full annotation when a
+label's confidence is below CLASSIFIER_CONFIDENCE, or for every chunk
+with CLASSIFIER_LLM_TOPIC=1. Confidently labelled chunks still get their
+free-text topic from the LLM, TOPIC_BATCH chunks per short topic-only
+call.
+
+    python classifier.py train LABELLED_DIR
+    python classifier.py evaluate LABELLED_DIR [--backend embedding|llamacpp]
+
+LABELLED_DIR holds chunk JSON written by second.py with the LLM backend;
+its labels are the reference. Files are split deterministically by name
+into train (80%) and evaluation (20%) sets.
+"""
+import os
+import json
+import time
+import zlib
+import argparse
+import numpy as np
+
+DOMAINS = ["Leadership", "Mindset", "IT", "Strategy"]
+CONTENT_TYPES = ["Framework", "Example", "Story", "Advice"]
+FIELDS = {"domain": DOMAINS, "content_type": CONTENT_TYPES}
+
+CLASSIFIER_BACKEND = os.getenv("CLASSIFIER_BACKEND", "llm")
+CLASSIFIER_MODEL_PATH = os.getenv("CLASSIFIER_MODEL_PATH", "chunk_classifier.joblib")
+CLASSIFIER_CONFIDENCE = float(os.getenv("CLASSIFIER_CONFIDENCE", "0.6"))
+CLASSIFIER_LLM_TOPIC = os.getenv("CLASSIFIER_LLM_TOPIC", "0") == "1"
+LLAMA_MODEL_PATH = os.getenv("LLAMA_MODEL_PATH", "models/qwen2.5-0.5b-instruct-q4_k_m.gguf")
+LLAMA_THREADS = int(os.getenv("LLAMA_THREADS", "0"))
+EVAL_FRACTION = 0.2
+
+
+class EmbeddingClassifier:
+    """One logistic regression per field over the chunk embeddings."""
+
+    name = "embedding"
+
+    def __init__(self, embeddings=None, model_path=CLASSIFIER_MODEL_PATH):
+        import joblib
+
+        if embeddings is None:
+            from embedding_backend import load_embeddings
+            embeddings = load_embeddings()
+        self.embeddings = embeddings
+        self.models = joblib.load(model_path)
+
+    def predict(self, texts):
+        if not texts:
+            return []
+
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        predictions = [{} for _ in texts]
+        for field in FIELDS:
+            model = self.models[field]
+            proba = model.predict_proba(vectors)
+            best = proba.argmax(axis=1)
+            for pred, label, confidence in zip(predictions, model.classes_[best], proba.max(axis=1)):
+                pred[field] = str(label)
+                pred[f"{field}_confidence"] = float(confidence)
+        return predictions
+
+
+LLAMA_GRAMMAR = (
+    'root ::= domain " | " ctype\n'
+    "domain ::= " + " | ".join(f'"{d}"' for d in DOMAINS) + "\n"
+    "ctype ::= " + " | ".join(f'"{c}"' for c in CONTENT_TYPES) + "\n"
+)
+
+LLAMA_PROMPT = """Classify the coaching transcript excerpt.
+domain is one of: {domains}
+content_type is one of: {content_types}
+Answer as: domain | content_type
+
+Excerpt:
+{text}
+
+Answer: """
+
+
+class LlamaCppClassifier:
+    """Small local model; the grammar only lets it answer with valid labels."""
+
+    name = "llamacpp"
+
+    def __init__(self, model_path=LLAMA_MODEL_PATH, threads=LLAMA_THREADS):
+        from llama_cpp import Llama, LlamaGrammar
+
+        self.llm = Llama(
+            model_path=model_path,
+            n_ctx=1024,
+            n_threads=threads or None,
+            logits_all=True,  # needed for logprobs
+            verbose=False
+        )
+        self.grammar = LlamaGrammar.from_string(LLAMA_GRAMMAR, verbose=False)
+
+    def _classify(self, text):
+        out = self.llm.create_completion(
+            LLAMA_PROMPT.format(
+                domains=", ".join(DOMAINS),
+                content_types=", ".join(CONTENT_TYPES),
+                text=text[:2000]
+            ),
+            max_tokens=12,
+            temperature=0,
+            grammar=self.grammar,
+            logprobs=1
+        )["choices"][0]
+
+        domain, _, content_type = out["text"].partition(" | ")
+        # the answer's probability under the model; both labels share it
+        logprobs = [lp for lp in out["logprobs"]["token_logprobs"] if lp is not None]
+        confidence = float(np.exp(sum(logprobs))) if logprobs else 0.0
+        return {
+            "domain": domain.strip(),
+            "domain_confidence": confidence,
+            "content_type": content_type.strip(),
+            "content_type_confidence": confidence
+        }
+
+    def predict(self, texts):
+        return [self._classify(text) for text in texts]
+
+
+def load_classifier(backend=None, embeddings=None):
+    """None for the llm backend, otherwise an object with predict(texts)."""
+    backend = backend or CLASSIFIER_BACKEND
+    if backend == "llm":
+        return None
+    if backend == "embedding":
+        return EmbeddingClassifier(embeddings)
+    if backend == "llamacpp":
+        return LlamaCppClassifier()
+    raise ValueError(f"Unknown CLASSIFIER_BACKEND: {backend}")
+
+
+# ---------------- training / evaluation ----------------
+def is_eval_file(file):
+    return zlib.crc32(file.encode("utf-8")) % 100 < EVAL_FRACTION * 100
+
+
+def load_labelled(labelled_dir, split):
+    """(texts, {field: labels}) of one split of the labelled chunk JSON."""
+    texts = []
+    labels = {field: [] for field in FIELDS}
+    for file in sorted(os.listdir(labelled_dir)):
+        if not file.endswith(".json") or is_eval_file(file) != (split == "eval"):
+            continue
+        with open(os.path.join(labelled_dir, file), "r", encoding="utf-8") as f:
+            items = json.load(f)
+        for item in items:
+            metadata = item.get("metadata") or {}
+            if not item.get("text") or any(metadata.get(f) not in allowed for f, allowed in FIELDS.items()):
+                continue
+            texts.append(item["text"])
+            for field in FIELDS:
+                labels[field].append(metadata[field])
+    return texts, labels
+
+
+def train(labelled_dir, model_path=CLASSIFIER_MODEL_PATH):
+    import joblib
+    from sklearn.linear_model import LogisticRegression
+    from embedding_backend import EMBEDDING_MODEL, load_embeddings
+
+    texts, labels = load_labelled(labelled_dir, "train")
+    if not texts:
+        print(f"No labelled chunks in {labelled_dir}")
+        return
+
+    vectors = np.asarray(load_embeddings().embed_documents(texts), dtype=np.float32)
+    models = {"embedding_model": EMBEDDING_MODEL}
+    for field in FIELDS:
+        models[field] = LogisticRegression(max_iter=1000, class_weight="balanced").fit(vectors, labels[field])
+
+    joblib.dump(models, model_path)
+    print(f"Trained on {len(texts)} chunks -> {model_path}")
+
+
+def evaluate(labelled_dir, backend):
+    from sklearn.metrics import accuracy_score, cohen_kappa_score, f1_score
+
+    texts, labels = load_labelled(labelled_dir, "eval")
+    if not texts:
+        print(f"No evaluation chunks in {labelled_dir}")
+        return
+
+    classifier = load_classifier(backend)
+    start = time.perf_counter()
+    predictions = classifier.predict(texts)
+    elapsed = time.perf_counter() - start
+    print(f"{backend}: {len(texts)} chunks in {elapsed:.2f}s ({len(texts) / elapsed:.0f} chunks/s)")
+
+    for field in FIELDS:
+        predicted = [p[field] for p in predictions]
+        confident = np.array([p[f"{field}_confidence"] >= CLASSIFIER_CONFIDENCE for p in predictions])
+        agree = np.array(predicted) == np.array(labels[field])
+        print(
+            f"  {field}: accuracy {accuracy_score(labels[field], predicted):.3f}, "
+            f"kappa {cohen_kappa_score(labels[field], predicted):.3f}, "
+            f"macro-F1 {f1_score(labels[field], predicted, average='macro'):.3f}; "
+            f"confident {confident.mean():.1%} of chunks at {agree[confident].mean() if confident.any() else 0:.3f} agreement"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train/evaluate the local chunk classifier")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("labelled_dir")
+    parser.add_argument("--backend", choices=["embedding", "llamacpp"], default="embedding")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        train(args.labelled_dir)
+    else:
+        evaluate(args.labelled_dir, args.backend)
+
+
+if __name__ == "__main__":
+    main()
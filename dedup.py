@@ -0,0 +1,168 @@
+"""
+Near-duplicate transcript detection with MinHash + LSH.
+
+The same talk often arrives as a local video, a YouTube id and an .m4a
+export; their file hashes differ, so each copy used to be annotated and
+embedded separately. After a transcript is written, find_duplicate()
+compares its word 3-gram MinHash signature against every transcript
+seen before (LSH buckets, so only likely matches are compared). A match
+above DEDUP_THRESHOLD estimated Jaccard similarity is linked to the
+canonical source in the registry and skips second.py/third.py.
+
+Signatures and band keys are kept in the registry (dedup_signatures,
+dedup_bands), one per canonical source, so worker processes on any host
+match against the same index. A DEDUP_INDEX_PATH JSON index from earlier
+runs is imported once.
+"""
+import os
+import re
+import json
+import zlib
+from collections import defaultdict
+import numpy as np
+import chunker
+import metrics
+import registry
+
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", "dedup_index.json")  # pre-registry index, imported once
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.5"))
+NUM_PERM = 128
+BANDS = 32  # 32 bands x 4 rows: pairs above ~0.42 Jaccard usually share a bucket
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+PRIME = (1 << 31) - 1
+SIG_DTYPE = np.uint32  # every MinHash value is below PRIME
+
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, PRIME, NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, PRIME, NUM_PERM).astype(np.uint64)
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+_index = None
+saved = defaultdict(float)  # totals for report()
+
+
+def transcript_words(text):
+    # timestamps and casing differ between Whisper and YouTube captions; only the words count
+    body = " ".join(seg["text"] for seg in chunker.parse_transcript(text))
+    return WORD_RE.findall(body.lower())
+
+
+def signature(words):
+    shingles = {
+        " ".join(words[i:i + SHINGLE_WORDS])
+        for i in range(max(len(words) - SHINGLE_WORDS + 1, 1))
+    }
+    x = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    # a * x stays below 2**63 for 31-bit a and 32-bit x
+    return ((_A[:, None] * x[None, :] + _B[:, None]) % PRIME).min(axis=1)
+
+
+def _band_keys(sig):
+    return [f"{band}:" + ",".join(map(str, sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+
+class DedupIndex:
+    """MinHash signatures and LSH buckets in the shared registry (dedup_signatures / dedup_bands)."""
+
+    def query(self, sig, exclude=None, before=None):
+        """
+        (source_id, estimated Jaccard, path) of the best match sharing an
+        LSH bucket; with `before`, only entries indexed ahead of that one.
+        """
+        best = (None, 0.0, None)
+        for entry_id, source_id, signature, path in registry.dedup_candidates(_band_keys(sig.tolist()), exclude):
+            if before is not None and entry_id >= before:
+                continue
+            similarity = float(np.mean(np.frombuffer(signature, dtype=SIG_DTYPE) == sig))
+            if similarity > best[1]:
+                best = (source_id, similarity, path)
+        return best
+
+    def add(self, source_id, sig, path):
+        return registry.dedup_add(source_id, _band_keys(sig.tolist()), sig.astype(SIG_DTYPE).tobytes(), path)
+
+    def remove(self, source_id):
+        registry.dedup_remove(source_id)
+
+    def import_json(self, path=DEDUP_INDEX_PATH):
+        """Move a dedup_index.json from before the registry tables into them, once."""
+        if not os.path.exists(path) or registry.dedup_count():
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        for source_id, entry in entries.items():
+            self.add(int(source_id), np.asarray(entry["signature"], dtype=np.uint64), entry["path"])
+        os.replace(path, path + ".imported")
+        print(f"Imported {len(entries)} signatures from {path} into the registry")
+        return len(entries)
+
+
+def get_index():
+    global _index
+    if _index is None:
+        _index = DedupIndex()
+        _index.import_json()
+    return _index
+
+
+def find_duplicate(source_id, txt_path):
+    """
+    Canonical source id when txt_path nearly repeats an indexed transcript;
+    otherwise index it as canonical and return None.
+    """
+    with open(txt_path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    words = transcript_words(text)
+    if len(words) < SHINGLE_WORDS:
+        return None
+
+    index = get_index()
+    with metrics.span("dedup", file=os.path.basename(txt_path)):
+        sig = signature(words)
+        # index first, then match only against entries indexed ahead of ours: of two
+        # copies transcribed at once on different workers, the later entry always
+        # sees the earlier one, so exactly one of them stays canonical
+        entry_id = index.add(source_id, sig, txt_path)
+        canonical, similarity, canonical_path = index.query(sig, exclude=source_id, before=entry_id)
+
+    if canonical is None or similarity < DEDUP_THRESHOLD:
+        return None
+    index.remove(source_id)
+
+    # what second.py/third.py would have spent on this copy
+    chunks = chunker.chunk_text(text)
+    tokens = sum(chunk["tokens"] for chunk in chunks)
+    segments = chunker.parse_transcript(text)
+    audio_seconds = max((seg["end"] or 0 for seg in segments), default=0)
+
+    saved["duplicates"] += 1
+    saved["llm_calls"] += len(chunks)
+    saved["embedded_tokens"] += tokens
+    saved["audio_seconds"] += audio_seconds
+    metrics.incr("dedup_hits")
+    metrics.incr("dedup_llm_calls_saved", len(chunks))
+    metrics.incr("dedup_tokens_saved", tokens)
+
+    print(
+        f"Near-duplicate of {canonical_path} "
+        f"(similarity {similarity:.2f}): skipping {len(chunks)} LLM calls, {tokens} tokens"
+    )
+    return canonical
+
+
+def report():
+    if not saved["duplicates"]:
+        return
+    print(
+        f"Deduplicated {int(saved['duplicates'])} transcripts "
+        f"({saved['audio_seconds'] / 60:.1f} min of audio): "
+        f"saved {int(saved['llm_calls'])} LLM calls and "
+        f"{int(saved['embedded_tokens'])} embedding tokens"
+    )
@@ -0,0 +1,86 @@
+import os
+import requests
+from langchain_core.embeddings import Embeddings
+import metrics
+
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# hf = load the model in this process, server = use embedding_server.py,
+# onnx / onnx-fp32 = ONNX Runtime on CPU (see onnx_embeddings.py).
+# All of them produce the same vector space, so switching needs no re-embedding.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hf")
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+EMBEDDING_SERVER_URL = os.getenv("EMBEDDING_SERVER_URL", "http://127.0.0.1:8765")
+
+
+class EmbeddingServerClient(Embeddings):
+    """LangChain Embeddings that call the shared local embedding server."""
+
+    def __init__(self, url=EMBEDDING_SERVER_URL, timeout=60):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+
+        resp = self.session.post(
+            f"{self.url}/embed",
+            json={"texts": list(texts)},
+            timeout=self.timeout
+        )
+        resp.raise_for_status()
+        return resp.json()["embeddings"]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def stats(self):
+        resp = self.session.get(f"{self.url}/stats", timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+
+class TracedEmbeddings(Embeddings):
+    """Wraps any Embeddings with an "embedding" metrics span per call."""
+
+    def __init__(self, embeddings, backend):
+        self.embeddings = embeddings
+        self.backend = backend
+
+    def embed_documents(self, texts):
+        with metrics.span("embedding", backend=self.backend, texts=len(texts)):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        with metrics.span("embedding", backend=self.backend, texts=1):
+            return self.embeddings.embed_query(text)
+
+
+def load_embeddings(backend=None):
+    backend = backend or EMBEDDING_BACKEND
+    embeddings = _load_embeddings(backend)
+    if metrics.METRICS_ENABLED:
+        return TracedEmbeddings(embeddings, backend)
+    return embeddings
+
+
+def _load_embeddings(backend):
+
+    if backend == "hf":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+    if backend == "server":
+        return EmbeddingServerClient()
+
+    if backend in ("onnx", "onnx-fp32"):
+        from onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(
+            quantized=backend == "onnx",
+            threads=EMBEDDING_THREADS
+        )
+
+    raise ValueError(f"Unknown embedding backend: {backend}")
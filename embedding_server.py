@@ -0,0 +1,162 @@
+"""
+Local embedding server shared by ingestion and query processes.
+
+    python embedding_server.py
+
+Loads the MiniLM model once and serves POST /embed {"texts": [...]}.
+Requests that arrive within BATCH_WINDOW_MS of each other are coalesced
+into a single forward pass (dynamic micro-batching). GET /stats returns
+the batch-size histogram and request latency percentiles.
+
+Clients use embedding_backend.EmbeddingServerClient (EMBEDDING_BACKEND=server).
+"""
+import os
+import json
+import time
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from embedding_backend import load_embeddings
+
+HOST = os.getenv("EMBEDDING_SERVER_HOST", "127.0.0.1")
+PORT = int(os.getenv("EMBEDDING_SERVER_PORT", "8765"))
+BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+MAX_BATCH_TEXTS = int(os.getenv("EMBEDDING_MAX_BATCH", "256"))
+STATS_INTERVAL = 60  # seconds between stats lines on stdout
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+class MicroBatcher:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.batch_sizes = Counter()  # power-of-two buckets of texts per forward pass
+        self.latencies = deque(maxlen=10000)  # seconds, per request
+        self.n_requests = 0
+        self.n_batches = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def embed(self, texts):
+        future = Future()
+        self.requests.put((texts, future, time.perf_counter()))
+        return future.result()
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        n_texts = len(batch[0][0])
+        deadline = time.perf_counter() + BATCH_WINDOW_MS / 1000
+
+        while n_texts < MAX_BATCH_TEXTS:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_texts += len(item[0])
+        return batch, n_texts
+
+    def _run(self):
+        while True:
+            batch, n_texts = self._collect()
+            texts = [text for item in batch for text in item[0]]
+
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            pos = 0
+            for item_texts, future, queued in batch:
+                future.set_result(vectors[pos:pos + len(item_texts)])
+                pos += len(item_texts)
+                self.latencies.append(done - queued)
+
+            with self.lock:
+                self.batch_sizes[1 << max(n_texts - 1, 0).bit_length()] += 1
+                self.n_requests += len(batch)
+                self.n_batches += 1
+
+    def stats(self):
+        with self.lock:
+            latencies = list(self.latencies)
+            return {
+                "requests": self.n_requests,
+                "batches": self.n_batches,
+                "batch_size_histogram": {
+                    f"<={size}": count
+                    for size, count in sorted(self.batch_sizes.items())
+                },
+                "latency_ms": {
+                    f"p{p}": round(percentile(latencies, p) * 1000, 2)
+                    for p in (50, 90, 95, 99) if latencies
+                }
+            }
+
+
+class Handler(BaseHTTPRequestHandler):
+    batcher = None
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path != "/embed":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            texts = json.loads(self.rfile.read(length))["texts"]
+            self._send_json(200, {"embeddings": self.batcher.embed(texts)})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.batcher.stats())
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def print_stats(batcher):
+    while True:
+        time.sleep(STATS_INTERVAL)
+        print(json.dumps(batcher.stats()), flush=True)
+
+
+if __name__ == "__main__":
+    Handler.batcher = MicroBatcher(load_embeddings("hf"))
+    threading.Thread(target=print_stats, args=(Handler.batcher,), daemon=True).start()
+
+    server = ThreadingHTTPServer((HOST, PORT), Handler)
+    print(f"Embedding server on http://{HOST}:{PORT} (batch window {BATCH_WINDOW_MS}ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(Handler.batcher.stats(), indent=2))
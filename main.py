@@ -1,12 +1,23 @@
 import os
 import re
-import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from youtube_transcript_api import YouTubeTranscriptApi
-from langchain_community.document_loaders import PyPDFLoader
-import whisper
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
 import hashlib
-import mysql.connector
+import dedup
+import metrics
+import profiler
+import transcode
+from registry import (
+    is_hash_exists, link_duplicate, mark_stage, pdf_page_hashes,
+    register_source, save_hash, save_pdf_pages
+)
 from urllib.parse import urlparse, parse_qs
+from transcriber import (
+    TRANSCRIBE_BATCH_MAX_SECONDS, TRANSCRIBE_BATCH_SIZE, load_transcriber,
+    transcribe_file, write_transcript
+)
 
 
 BASE_FOLDER = r"C:\Users\Administrator\Desktop\Coach TK\Documents"
@@ -18,23 +29,15 @@ YOUTUBE_LINKS = [
     "3OBREA0u_W4",
 ]
 
-DB_CONFIG = {
-    "host": "localhost",
-    "user": "root",
-    "password": "newpassword",
-    "database": "coachtk"
-}
+profiler.start_if_requested(BASE_FOLDER)
 
-db = mysql.connector.connect(**DB_CONFIG)
-cursor = db.cursor()
-
-model = whisper.load_model("base")
+transcriber = load_transcriber()
 
 
 # it is generate hash for file path.
 def generate_file_hash(file_path):
     sha = hashlib.sha256()
-    with open(file_path, "rb") as f:
+    with metrics.span("hash"), open(file_path, "rb") as f:
         for chunk in iter(lambda: f.read(8192), b""):
             sha.update(chunk)
     return sha.hexdigest()
@@ -43,40 +46,16 @@ def generate_file_hash(file_path):
 def generate_text_hash(text):
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-# it is check hash is exists in DB or not if yes then give Ture else false
-def is_hash_exists(hash_id):
-    cursor.execute(
-        "SELECT id FROM file_registry WHERE hash_id=%s",
-        (hash_id,)
-    )
-    return cursor.fetchone() is not None
-
-# save hash id in db
-def save_hash(hash_id, file_name, file_path, file_type):
-    cursor.execute(
-        """
-        INSERT INTO file_registry (hash_id, file_name, file_path, file_type)
-        VALUES (%s, %s, %s, %s)
-        """,
-        (hash_id, file_name, file_path, file_type)
-    )
-    db.commit()
-
 #it is create video to audio using ffmpeg
 def convert_video_to_audio(video_path):
     audio_path = os.path.splitext(video_path)[0] + ".m4a"
 
     if os.path.exists(audio_path):
+        metrics.incr("cache_hits", stage="audio")
         return audio_path
 
-    subprocess.run(
-        [
-            "ffmpeg", "-i", video_path,
-            "-vn", "-c:a", "aac", "-b:a", "128k",
-            audio_path
-        ],
-        check=True
-    )
+    with metrics.span("ffmpeg", file=os.path.basename(video_path)):
+        transcode.transcode_to_m4a(video_path, audio_path)
 
     print(f"Converted {os.path.basename(video_path)}")
     return audio_path
@@ -87,60 +66,137 @@ def transcribe_audio(audio_path):
 
     if os.path.exists(txt_path):
         print(f"Already transcribed: {os.path.basename(audio_path)}")
-        return
+        metrics.incr("cache_hits", stage="transcribe")
+        return txt_path
 
     print(f"Transcribing: {os.path.basename(audio_path)}")
-    result = model.transcribe(audio_path)
+    with metrics.span("whisper", file=os.path.basename(audio_path)):
+        segments = transcribe_file(transcriber, audio_path)
+    save_transcript(segments, txt_path)
+    return txt_path
 
-    with open(txt_path, "w", encoding="utf-8") as f:
-        for seg in result["segments"]:
-            start = int(seg["start"])
-            end = int(seg["end"])
-            sm, ss = divmod(start, 60)
-            em, es = divmod(end, 60)
-
-            f.write(
-                f"[{sm:02d}:{ss:02d} - {em:02d}:{es:02d}] "
-                f"{seg['text'].strip()}\n"
-            )
+# it is write transcript txt and save its hash in DB.
+def save_transcript(segments, txt_path):
+    write_transcript(segments, txt_path)
 
     txt_hash = generate_file_hash(txt_path)
-    if not is_hash_exists(txt_hash):
-        save_hash(
-            txt_hash,
-            os.path.basename(txt_path),
-            txt_path,
-            "txt"
-        )
+    save_hash(
+        txt_hash,
+        os.path.basename(txt_path),
+        txt_path,
+        "txt"
+    )
+
+# it is record the source and its transcript so later stages can find what is left to do.
+# a near-duplicate of an earlier transcript is linked to it and never annotated or embedded.
+def record_transcribed(source_hash, source_type, file_name, file_path, txt_path):
+    source_id = register_source(source_hash, source_type, file_name, file_path)
+    mark_stage(source_id, "transcribed", txt_path)
+
+    canonical_id = dedup.find_duplicate(source_id, txt_path)
+    if canonical_id is not None:
+        link_duplicate(source_id, canonical_id)
+
+# it is tell whether an audio file is short enough for batched transcription.
+def is_short_clip(path):
+    duration = transcode.probe_duration(path)
+    return duration is not None and duration <= TRANSCRIBE_BATCH_MAX_SECONDS
+
+# it is transcribe many short audio files together (TRANSCRIBE_BATCH_SIZE > 0).
+def transcribe_audio_batch(audio_paths):
+    from batch_transcribe import transcribe_batched
+
+    pending = []
+    for audio_path in audio_paths:
+        txt_path = os.path.splitext(audio_path)[0] + "_time.txt"
+        if os.path.exists(txt_path):
+            print(f"Already transcribed: {os.path.basename(audio_path)}")
+            metrics.incr("cache_hits", stage="transcribe")
+            continue
+        pending.append(audio_path)
+
+    if not pending:
+        return
+
+    print(f"Transcribing {len(pending)} files in batches of {TRANSCRIBE_BATCH_SIZE}")
+    with metrics.span("whisper", stage="batch", files=len(pending)):
+        results = transcribe_batched(transcriber, pending, TRANSCRIBE_BATCH_SIZE)
+
+    for audio_path, segments in results.items():
+        save_transcript(segments, os.path.splitext(audio_path)[0] + "_time.txt")
 
 # it is work on video and audio and save hash id in DB.
+# videos convert in a pool while earlier ones transcribe (producer/consumer).
 def process_local_files():
-    for file in os.listdir(BASE_FOLDER):
-        path = os.path.join(BASE_FOLDER, file)
+    batch = []
+    conversions = {}
+    pool = ThreadPoolExecutor(max_workers=transcode.TRANSCODE_WORKERS)
 
-        if not os.path.isfile(path):
-            continue
-
-        if file.lower().endswith(VIDEO_EXTENSIONS):
-            video_hash = generate_file_hash(path)
+    # an error below cancels conversions not yet started; running ones finish and clean up
+    try:
+        for file in os.listdir(BASE_FOLDER):
+            path = os.path.join(BASE_FOLDER, file)
 
-            if is_hash_exists(video_hash):
-                print(f"Skipped (video already processed): {file}")
+            if not os.path.isfile(path):
                 continue
 
-            audio_path = convert_video_to_audio(path)
-            transcribe_audio(audio_path)
+            profiler.attribute(file)
 
-            save_hash(video_hash, file, path, "video")
+            if file.lower().endswith(VIDEO_EXTENSIONS):
+                video_hash = generate_file_hash(path)
+
+                if is_hash_exists(video_hash):
+                    print(f"Skipped (video already processed): {file}")
+                    metrics.incr("skips", stage="video")
+                    continue
 
-        elif file.lower().endswith(AUDIO_EXTENSIONS):
-            audio_hash = generate_file_hash(path)
+                future = pool.submit(convert_video_to_audio, path)
+                conversions[future] = (video_hash, file, path)
 
-            if is_hash_exists(audio_hash):
-                print(f"Skipped (audio already processed): {file}")
+            elif file.lower().endswith(AUDIO_EXTENSIONS):
+                audio_hash = generate_file_hash(path)
+
+                if is_hash_exists(audio_hash):
+                    print(f"Skipped (audio already processed): {file}")
+                    metrics.incr("skips", stage="audio")
+                    continue
+
+                if TRANSCRIBE_BATCH_SIZE and is_short_clip(path):
+                    batch.append((audio_hash, file, path))
+                    continue
+
+                txt_path = transcribe_audio(path)
+                record_transcribed(audio_hash, "audio", file, path, txt_path)
+                save_hash(audio_hash, file, path, "audio")
+
+        # whichever conversion finishes first is transcribed first
+        for future in as_completed(conversions):
+            video_hash, file, path = conversions[future]
+            profiler.attribute(file)
+
+            try:
+                audio_path = future.result()
+            except Exception as e:
+                print(f"Conversion failed, will retry next run: {e}")
+                metrics.incr("ffmpeg_failures")
                 continue
 
-            transcribe_audio(path)
+            txt_path = transcribe_audio(audio_path)
+            record_transcribed(video_hash, "video", file, path, txt_path)
+            save_hash(video_hash, file, path, "video")
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    if batch:
+        profiler.attribute(f"batch of {len(batch)} audio files")
+        transcribe_audio_batch([path for _, _, path in batch])
+
+        for audio_hash, file, path in batch:
+            txt_path = os.path.splitext(path)[0] + "_time.txt"
+            if not os.path.exists(txt_path):
+                metrics.incr("transcribe_failures")
+                continue  # transcribe_batched reported it; next run tries again
+            record_transcribed(audio_hash, "audio", file, path, txt_path)
             save_hash(audio_hash, file, path, "audio")
 
 
@@ -160,11 +216,6 @@ def extract_video_id(input_value):
     return parse_qs(parsed.query).get("v", [None])[0]
 
 
-def format_time(seconds):
-    m = int(seconds // 60)
-    s = int(seconds % 60)
-    return f"{m:02d}:{s:02d}"
-
 # it is work for transcribe youtube video and also save hash in DB.
 def transcribe_youtube(input_value):
     video_id = extract_video_id(input_value)
@@ -176,28 +227,33 @@ def transcribe_youtube(input_value):
 
     if is_hash_exists(yt_hash):
         print(f"YouTube already processed: {video_id}")
+        metrics.incr("skips", stage="youtube")
         return
 
     print(f"Fetching YouTube transcript: {video_id}")
 
     try:
-        transcript = YouTubeTranscriptApi().fetch(video_id)
+        with metrics.span("youtube_fetch", video_id=video_id):
+            transcript = YouTubeTranscriptApi().fetch(video_id)
     except Exception as e:
         print(f"Failed to fetch transcript: {e}")
+        metrics.incr("youtube_failures")
         return
 
     output_file = os.path.join(BASE_FOLDER, f"{video_id}_YT_time.txt")
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        for item in transcript:
-            start = item.start
-            end = start + item.duration
-            text = item.text.replace("\n", " ")
-
-            f.write(
-                f"[{format_time(start)} - {format_time(end)}] {text}\n"
-            )
-
+    write_transcript([
+        {
+            "start": item.start,
+            "end": item.start + item.duration,
+            "text": item.text.replace("\n", " ")
+        }
+        for item in transcript
+    ], output_file)
+
+    record_transcribed(
+        yt_hash, "youtube", f"YouTube-{video_id}", input_value, output_file
+    )
     save_hash(
         yt_hash,
         f"YouTube-{video_id}",
@@ -233,37 +289,109 @@ def clean_pdf_text(text):
     text = re.sub(r"\s{2,}", " ", text)
     return text.strip()
 
+# it is fold a PDF object into sha: indirect objects resolved (each hashed once per
+# document via cache), dict keys sorted, streams by their decoded data.
+def _digest_pdf_object(obj, sha, cache, seen=()):
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        if ref not in cache:
+            if ref in seen:
+                sha.update(b"<cycle>")
+                return
+            sub = hashlib.sha256()
+            _digest_pdf_object(obj.get_object(), sub, cache, (*seen, ref))
+            cache[ref] = sub.digest()
+        sha.update(cache[ref])
+        return
+
+    if isinstance(obj, StreamObject):
+        sha.update(b"<stream>")
+        sha.update(obj.get_data())
+    if isinstance(obj, DictionaryObject):
+        sha.update(b"<dict>")
+        for key in sorted(obj):
+            if key in ("/Parent", "/Length"):
+                continue
+            sha.update(key.encode("utf-8"))
+            _digest_pdf_object(obj.raw_get(key), sha, cache, seen)
+    elif isinstance(obj, ArrayObject):
+        sha.update(b"<array>")
+        for item in obj:
+            _digest_pdf_object(item, sha, cache, seen)
+    elif not isinstance(obj, StreamObject):
+        sha.update(repr(obj).encode("utf-8"))
+
+# it is hash what a page draws: its content streams plus its resources (Form XObjects
+# it calls with Do, fonts and their ToUnicode maps), so unchanged pages are found
+# without extracting text. cache is shared by the pages of one document.
+def page_content_hash(page, cache=None):
+    cache = {} if cache is None else cache
+    sha = hashlib.sha256()
+    for key in ("/Contents", "/Resources"):
+        sha.update(key.encode("utf-8"))
+        if key in page:
+            _digest_pdf_object(page.raw_get(key), sha, cache)
+    return sha.hexdigest()
+
 # It is work for pdf and save hash
+# only pages whose content changed since the last edition are extracted and sent downstream.
 def process_pdfs():
     for file in os.listdir(BASE_FOLDER):
         if not file.lower().endswith(".pdf"):
             continue
 
+        profiler.attribute(file)
+
         pdf_path = os.path.join(BASE_FOLDER, file)
         pdf_hash = generate_file_hash(pdf_path)
 
         if is_hash_exists(pdf_hash):
             print(f"PDF already processed: {file}")
+            metrics.incr("skips", stage="pdf")
             continue
 
-        loader = PyPDFLoader(pdf_path)
-        docs = loader.load()
+        reader = PdfReader(pdf_path)
+        shared = {}
+        page_hashes = [page_content_hash(page, shared) for page in reader.pages]
+        known = pdf_page_hashes(file)
+        changed = [i for i, h in enumerate(page_hashes) if h not in known]
+
+        # first edition keeps the old name; later editions get a file holding just the new pages
+        if known:
+            output_txt = os.path.splitext(pdf_path)[0] + f"_{pdf_hash[:8]}_clean.txt"
+        else:
+            output_txt = os.path.splitext(pdf_path)[0] + "_clean.txt"
+
+        print(f"{file}: {len(page_hashes) - len(changed)} pages reused, {len(changed)} reprocessed")
+        metrics.incr("pdf_pages", len(page_hashes) - len(changed), stage="reused")
+        metrics.incr("pdf_pages", len(changed), stage="reprocessed")
+
+        if changed:
+            with metrics.span("pdf_load", file=file, pages=len(changed)):
+                texts = [reader.pages[i].extract_text() for i in changed]
+
+            cleaned_pages = [clean_pdf_text(text) for text in texts if text]
 
-        cleaned_pages = [
-            clean_pdf_text(doc.page_content)
-            for doc in docs if doc.page_content
-        ]
+            with open(output_txt, "w", encoding="utf-8") as f:
+                f.write("\n\n".join(cleaned_pages))
 
-        output_txt = os.path.splitext(pdf_path)[0] + "_clean.txt"
-        with open(output_txt, "w", encoding="utf-8") as f:
-            f.write("\n\n".join(cleaned_pages))
+            record_transcribed(pdf_hash, "pdf", file, pdf_path, output_txt)
 
+        changed = set(changed)
+        save_pdf_pages(file, [
+            (i + 1, h, output_txt if i in changed else known[h][1])
+            for i, h in enumerate(page_hashes)
+        ])
         save_hash(pdf_hash, file, pdf_path, "pdf")
         print(f"PDF cleaned & saved")
 
-process_local_files()
+if __name__ == "__main__":
+    process_local_files()
 
-for link in YOUTUBE_LINKS:
-    transcribe_youtube(link)
+    for link in YOUTUBE_LINKS:
+        profiler.attribute(link)
+        transcribe_youtube(link)
 
-process_pdfs()
+    process_pdfs()
+    profiler.attribute(None)
+    dedup.report()
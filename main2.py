@@ -1,10 +1,13 @@
 import os
 import re
-import subprocess
-import whisper
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import hashlib
-import mysql.connector
+import metrics
+import profiler
+import transcode
+from registry import is_hash_exists, save_hash
 from urllib.parse import urlparse, parse_qs
+from transcriber import load_transcriber, transcribe_file, write_transcript
 from youtube_transcript_api import YouTubeTranscriptApi
 from langchain_community.document_loaders import PyPDFLoader
 
@@ -17,21 +20,13 @@ YOUTUBE_LINKS = [
     "3OBREA0u_W4",
 ]
 
-DB_CONFIG = {
-    "host": "localhost",
-    "user": "root",
-    "password": "newpassword",
-    "database": "coachtk"
-}
+profiler.start_if_requested(BASE_FOLDER)
 
-db = mysql.connector.connect(**DB_CONFIG)
-cursor = db.cursor()
-
-model = whisper.load_model("base")
+transcriber = load_transcriber()
 
 def generate_file_hash(file_path):
     sha = hashlib.sha256()
-    with open(file_path, "rb") as f:
+    with metrics.span("hash"), open(file_path, "rb") as f:
         for chunk in iter(lambda: f.read(8192), b""):
             sha.update(chunk)
     return sha.hexdigest()
@@ -41,25 +36,6 @@ def generate_text_hash(text):
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
-def is_hash_exists(hash_id):
-    cursor.execute(
-        "SELECT id FROM file_registry WHERE hash_id=%s",
-        (hash_id,)
-    )
-    return cursor.fetchone() is not None
-
-
-def save_hash(hash_id, file_name, file_path, file_type):
-    cursor.execute(
-        """
-        INSERT INTO file_registry (hash_id, file_name, file_path, file_type)
-        VALUES (%s, %s, %s, %s)
-        """,
-        (hash_id, file_name, file_path, file_type)
-    )
-    db.commit()
-
-
 def should_skip_file(file_path):
     """
     Skip ONLY if file exists AND its content hash exists in DB
@@ -75,19 +51,14 @@ def convert_video_to_audio(video_path):
 
     if should_skip_file(audio_path):
         print(f"Audio already exists & valid: {os.path.basename(audio_path)}")
+        metrics.incr("cache_hits", stage="audio")
         return audio_path
 
     if os.path.exists(audio_path):
         os.remove(audio_path)
 
-    subprocess.run(
-        [
-            "ffmpeg", "-i", video_path,
-            "-vn", "-c:a", "aac", "-b:a", "128k",
-            audio_path
-        ],
-        check=True
-    )
+    with metrics.span("ffmpeg", file=os.path.basename(video_path)):
+        transcode.transcode_to_m4a(video_path, audio_path)
 
     print(f"Converted video → audio: {os.path.basename(video_path)}")
     return audio_path
@@ -97,58 +68,74 @@ def transcribe_audio(audio_path):
 
     if should_skip_file(txt_path):
         print(f"TXT already exists & valid: {os.path.basename(txt_path)}")
+        metrics.incr("cache_hits", stage="transcribe")
         return
 
     if os.path.exists(txt_path):
         os.remove(txt_path)
 
     print(f"Transcribing audio: {os.path.basename(audio_path)}")
-    result = model.transcribe(audio_path)
-
-    with open(txt_path, "w", encoding="utf-8") as f:
-        for seg in result["segments"]:
-            start, end = int(seg["start"]), int(seg["end"])
-            sm, ss = divmod(start, 60)
-            em, es = divmod(end, 60)
-            f.write(
-                f"[{sm:02d}:{ss:02d} - {em:02d}:{es:02d}] "
-                f"{seg['text'].strip()}\n"
-            )
+    with metrics.span("whisper", file=os.path.basename(audio_path)):
+        segments = transcribe_file(transcriber, audio_path)
+    write_transcript(segments, txt_path)
 
     txt_hash = generate_file_hash(txt_path)
     save_hash(txt_hash, os.path.basename(txt_path), txt_path, "txt")
 
 
+# videos convert in a pool (transcode.py) while earlier ones transcribe
 def process_local_files():
-    for file in os.listdir(BASE_FOLDER):
-        path = os.path.join(BASE_FOLDER, file)
+    conversions = {}
+    pool = ThreadPoolExecutor(max_workers=transcode.TRANSCODE_WORKERS)
 
-        if not os.path.isfile(path):
-            continue
-
-        # VIDEO
-        if file.lower().endswith(VIDEO_EXTENSIONS):
-            video_hash = generate_file_hash(path)
+    try:
+        for file in os.listdir(BASE_FOLDER):
+            path = os.path.join(BASE_FOLDER, file)
 
-            if is_hash_exists(video_hash):
-                print(f"Video already processed: {file}")
+            if not os.path.isfile(path):
                 continue
 
-            audio_path = convert_video_to_audio(path)
-            transcribe_audio(audio_path)
+            profiler.attribute(file)
 
-            save_hash(video_hash, file, path, "video")
+            # VIDEO
+            if file.lower().endswith(VIDEO_EXTENSIONS):
+                video_hash = generate_file_hash(path)
+
+                if is_hash_exists(video_hash):
+                    print(f"Video already processed: {file}")
+                    metrics.incr("skips", stage="video")
+                    continue
+
+                future = pool.submit(convert_video_to_audio, path)
+                conversions[future] = (video_hash, file, path)
 
-        # AUDIO
-        elif file.lower().endswith(AUDIO_EXTENSIONS):
-            audio_hash = generate_file_hash(path)
+            # AUDIO
+            elif file.lower().endswith(AUDIO_EXTENSIONS):
+                audio_hash = generate_file_hash(path)
 
-            if is_hash_exists(audio_hash):
-                print(f"Audio already processed: {file}")
+                if is_hash_exists(audio_hash):
+                    print(f"Audio already processed: {file}")
+                    metrics.incr("skips", stage="audio")
+                    continue
+
+                transcribe_audio(path)
+                save_hash(audio_hash, file, path, "audio")
+
+        for future in as_completed(conversions):
+            video_hash, file, path = conversions[future]
+            profiler.attribute(file)
+
+            try:
+                audio_path = future.result()
+            except Exception as e:
+                print(f"Conversion failed, will retry next run: {e}")
+                metrics.incr("ffmpeg_failures")
                 continue
 
-            transcribe_audio(path)
-            save_hash(audio_hash, file, path, "audio")
+            transcribe_audio(audio_path)
+            save_hash(video_hash, file, path, "video")
+    finally:
+        pool.shutdown(cancel_futures=True)
 
 def extract_video_id(input_value):
     if len(input_value) == 11 and "http" not in input_value:
@@ -174,14 +161,17 @@ def transcribe_youtube(input_value):
 
     if is_hash_exists(yt_hash):
         print(f"YouTube already processed: {video_id}")
+        metrics.incr("skips", stage="youtube")
         return
 
     print(f"Fetching YouTube transcript: {video_id}")
 
     try:
-        transcript = YouTubeTranscriptApi().fetch(video_id)
+        with metrics.span("youtube_fetch", video_id=video_id):
+            transcript = YouTubeTranscriptApi().fetch(video_id)
     except Exception as e:
         print(f"Failed to fetch transcript: {e}")
+        metrics.incr("youtube_failures")
         return
 
     output_file = os.path.join(BASE_FOLDER, f"{video_id}_YT_time.txt")
@@ -229,15 +219,19 @@ def process_pdfs():
         if not file.lower().endswith(".pdf"):
             continue
 
+        profiler.attribute(file)
+
         pdf_path = os.path.join(BASE_FOLDER, file)
         pdf_hash = generate_file_hash(pdf_path)
 
         if is_hash_exists(pdf_hash):
             print(f"PDF already processed: {file}")
+            metrics.incr("skips", stage="pdf")
             continue
 
         loader = PyPDFLoader(pdf_path)
-        docs = loader.load()
+        with metrics.span("pdf_load", file=file):
+            docs = loader.load()
 
         cleaned_pages = [
             clean_pdf_text(doc.page_content)
@@ -251,9 +245,12 @@ def process_pdfs():
         save_hash(pdf_hash, file, pdf_path, "pdf")
         print(f"PDF cleaned & saved: {file}")
 
-process_local_files()
+if __name__ == "__main__":
+    process_local_files()
 
-for link in YOUTUBE_LINKS:
-    transcribe_youtube(link)
+    for link in YOUTUBE_LINKS:
+        profiler.attribute(link)
+        transcribe_youtube(link)
 
-process_pdfs()
+    process_pdfs()
+    profiler.attribute(None)
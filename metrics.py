@@ -0,0 +1,239 @@
+"""
+Timing spans and counters for the pipeline scripts.
+
+    with metrics.span("whisper", file=name):
+        ...
+    metrics.incr("skips", stage="video")
+
+Off unless METRICS_EXPORT is set (a file path or an http(s) URL). When off,
+span() hands back one shared no-op object and incr() returns immediately,
+so instrumented code pays a function call and nothing else.
+
+METRICS_FORMAT=prometheus (default) writes the Prometheus text exposition
+format, e.g. for node_exporter's textfile collector or a Pushgateway.
+METRICS_FORMAT=otel writes OTLP/JSON (resourceSpans + resourceMetrics).
+Everything is exported once, when the process exits.
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import secrets
+import threading
+import urllib.request
+from collections import defaultdict
+
+METRICS_EXPORT = os.getenv("METRICS_EXPORT", "")
+METRICS_FORMAT = os.getenv("METRICS_FORMAT", "prometheus")
+METRICS_ENABLED = bool(METRICS_EXPORT)
+SERVICE_NAME = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+
+HISTOGRAM_BUCKETS = (0.005, 0.05, 0.25, 1, 5, 30, 120, 600, 1800)
+
+_lock = threading.Lock()
+_local = threading.local()
+_counters = defaultdict(float)  # (name, labels) -> value
+_span_stats = {}  # (name, labels) -> [count, sum, bucket counts...]
+_finished_spans = []  # OTLP span dicts, only kept for the otel format
+_trace_id = secrets.token_hex(16)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent_id = stack[-1].span_id if stack else None
+        self.span_id = secrets.token_hex(8)
+        stack.append(self)
+        self.start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        _local.stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _record_span(self, elapsed)
+        return False
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _record_span(span, elapsed):
+    # only low-cardinality attributes become labels; file names stay on the span
+    labels = _label_key({k: v for k, v in span.attrs.items() if k in ("stage", "error")})
+    with _lock:
+        stats = _span_stats.get((span.name, labels))
+        if stats is None:
+            stats = _span_stats[(span.name, labels)] = [0, 0.0] + [0] * len(HISTOGRAM_BUCKETS)
+        stats[0] += 1
+        stats[1] += elapsed
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if elapsed <= bound:
+                stats[2 + i] += 1
+
+        if METRICS_FORMAT == "otel":
+            _finished_spans.append({
+                "traceId": _trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.start_ns + int(elapsed * 1e9)),
+                "attributes": _otel_attributes(span.attrs)
+            })
+
+
+def span(name, **attrs):
+    if not METRICS_ENABLED:
+        return _NOOP_SPAN
+    return _Span(name, attrs)
+
+
+def incr(name, value=1, **labels):
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        _counters[(name, _label_key(labels))] += value
+
+
+# ---------------- export ----------------
+def _prom_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def render_prometheus():
+    lines = []
+    service = (("service", SERVICE_NAME),)
+
+    counter_names = sorted({name for name, _ in _counters})
+    for name in counter_names:
+        lines.append(f"# TYPE coachtk_{name}_total counter")
+        for (n, labels), value in sorted(_counters.items()):
+            if n == name:
+                lines.append(f"coachtk_{name}_total{_prom_labels(service + labels)} {value:g}")
+
+    span_names = sorted({name for name, _ in _span_stats})
+    for name in span_names:
+        metric = f"coachtk_{name}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for (n, labels), stats in sorted(_span_stats.items()):
+            if n != name:
+                continue
+            base = service + labels
+            for bound, count in zip(HISTOGRAM_BUCKETS, stats[2:]):
+                lines.append(f"{metric}_bucket{_prom_labels(base, (('le', f'{bound:g}'),))} {count}")
+            lines.append(f"{metric}_bucket{_prom_labels(base, (('le', '+Inf'),))} {stats[0]}")
+            lines.append(f"{metric}_sum{_prom_labels(base)} {stats[1]:.6f}")
+            lines.append(f"{metric}_count{_prom_labels(base)} {stats[0]}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _otel_attributes(attrs):
+    out = []
+    for k, v in attrs.items():
+        if isinstance(v, bool):
+            value = {"boolValue": v}
+        elif isinstance(v, int):
+            value = {"intValue": str(v)}
+        elif isinstance(v, float):
+            value = {"doubleValue": v}
+        else:
+            value = {"stringValue": str(v)}
+        out.append({"key": k, "value": value})
+    return out
+
+
+def render_otel():
+    now = str(time.time_ns())
+    resource = {"attributes": _otel_attributes({"service.name": SERVICE_NAME})}
+    scope = {"name": "coachtk"}
+
+    metrics = [
+        {
+            "name": f"coachtk.{name}",
+            "sum": {
+                "aggregationTemporality": 2,
+                "isMonotonic": True,
+                "dataPoints": [{
+                    "attributes": _otel_attributes(dict(labels)),
+                    "timeUnixNano": now,
+                    "asDouble": value
+                }]
+            }
+        }
+        for (name, labels), value in sorted(_counters.items())
+    ]
+    return json.dumps({
+        "resourceSpans": [{
+            "resource": resource,
+            "scopeSpans": [{"scope": scope, "spans": _finished_spans}]
+        }],
+        "resourceMetrics": [{
+            "resource": resource,
+            "scopeMetrics": [{"scope": scope, "metrics": metrics}]
+        }]
+    })
+
+
+def export(target=None):
+    target = target or METRICS_EXPORT
+    if not target:
+        return
+
+    with _lock:
+        if METRICS_FORMAT == "otel":
+            body, content_type = render_otel(), "application/json"
+        else:
+            body, content_type = render_prometheus(), "text/plain; version=0.0.4"
+
+    if target.startswith(("http://", "https://")):
+        request = urllib.request.Request(
+            target,
+            data=body.encode("utf-8"),
+            headers={"Content-Type": content_type},
+            method="POST"
+        )
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+        except Exception as e:
+            print(f"Metrics export failed: {e}")
+        return
+
+    with open(target, "w", encoding="utf-8") as f:
+        f.write(body)
+
+
+if METRICS_ENABLED:
+    atexit.register(export)
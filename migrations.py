@@ -0,0 +1,304 @@
+"""
+Schema migrations for the coachtk registry database.
+
+    python migrations.py        # apply pending migrations now
+
+Each migration has MySQL and SQLite statements and is recorded in
+schema_migrations once applied. registry.py applies pending migrations
+itself when a process creates its MySQL pool or opens the SQLite
+stand-in, so running this by hand is optional.
+"""
+import time
+
+MIGRATIONS = [
+    (
+        1, "file_registry baseline",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS file_registry (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                hash_id CHAR(64) NOT NULL,
+                file_name VARCHAR(512),
+                file_path VARCHAR(1024),
+                file_type VARCHAR(32)
+            )
+            """,
+        ],
+        [
+            """
+            CREATE TABLE IF NOT EXISTS file_registry (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                hash_id TEXT NOT NULL,
+                file_name TEXT,
+                file_path TEXT,
+                file_type TEXT
+            )
+            """,
+        ],
+    ),
+    (
+        2, "unique hash_id, index file_type",
+        [
+            # keep the first row of any hash registered twice by the old check-then-insert race
+            """
+            DELETE r1 FROM file_registry r1
+            JOIN file_registry r2 ON r1.hash_id = r2.hash_id AND r1.id > r2.id
+            """,
+            "ALTER TABLE file_registry ADD UNIQUE INDEX uq_file_registry_hash_id (hash_id)",
+            "ALTER TABLE file_registry ADD INDEX ix_file_registry_file_type (file_type)",
+        ],
+        [
+            """
+            DELETE FROM file_registry
+            WHERE id NOT IN (SELECT MIN(id) FROM file_registry GROUP BY hash_id)
+            """,
+            "CREATE UNIQUE INDEX uq_file_registry_hash_id ON file_registry (hash_id)",
+            "CREATE INDEX ix_file_registry_file_type ON file_registry (file_type)",
+        ],
+    ),
+    (
+        3, "sources and per-stage status",
+        [
+            """
+            CREATE TABLE sources (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                source_key CHAR(64) NOT NULL,
+                source_type VARCHAR(16) NOT NULL,
+                file_name VARCHAR(512),
+                file_path VARCHAR(1024),
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE KEY uq_sources_source_key (source_key)
+            )
+            """,
+            """
+            CREATE TABLE source_stages (
+                source_id INT NOT NULL,
+                stage VARCHAR(16) NOT NULL,
+                status VARCHAR(16) NOT NULL,
+                output_path VARCHAR(1024),
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (source_id, stage),
+                KEY ix_source_stages_stage_status (stage, status),
+                KEY ix_source_stages_output (stage, output_path(255)),
+                CONSTRAINT fk_source_stages_source
+                    FOREIGN KEY (source_id) REFERENCES sources (id) ON DELETE CASCADE
+            )
+            """,
+        ],
+        [
+            """
+            CREATE TABLE sources (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source_key TEXT NOT NULL UNIQUE,
+                source_type TEXT NOT NULL,
+                file_name TEXT,
+                file_path TEXT,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE source_stages (
+                source_id INTEGER NOT NULL REFERENCES sources (id) ON DELETE CASCADE,
+                stage TEXT NOT NULL,
+                status TEXT NOT NULL,
+                output_path TEXT,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (source_id, stage)
+            )
+            """,
+            "CREATE INDEX ix_source_stages_stage_status ON source_stages (stage, status)",
+            "CREATE INDEX ix_source_stages_output ON source_stages (stage, output_path)",
+        ],
+    ),
+    (
+        4, "near-duplicate sources",
+        [
+            """
+            ALTER TABLE sources
+                ADD COLUMN duplicate_of INT NULL,
+                ADD CONSTRAINT fk_sources_duplicate_of
+                    FOREIGN KEY (duplicate_of) REFERENCES sources (id) ON DELETE SET NULL
+            """,
+        ],
+        [
+            "ALTER TABLE sources ADD COLUMN duplicate_of INTEGER REFERENCES sources (id) ON DELETE SET NULL",
+        ],
+    ),
+    (
+        5, "per-page PDF content hashes",
+        [
+            """
+            CREATE TABLE pdf_pages (
+                pdf_name VARCHAR(512) NOT NULL,
+                content_hash CHAR(64) NOT NULL,
+                page_no INT NOT NULL,
+                output_path VARCHAR(1024),
+                PRIMARY KEY (pdf_name(255), content_hash)
+            )
+            """,
+        ],
+        [
+            """
+            CREATE TABLE pdf_pages (
+                pdf_name TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                page_no INTEGER NOT NULL,
+                output_path TEXT,
+                PRIMARY KEY (pdf_name, content_hash)
+            )
+            """,
+        ],
+    ),
+    (
+        6, "distributed job queue",
+        [
+            """
+            CREATE TABLE jobs (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                kind VARCHAR(16) NOT NULL,
+                target VARCHAR(1024) NOT NULL,
+                target_key CHAR(64) NOT NULL,
+                status VARCHAR(16) NOT NULL DEFAULT 'queued',
+                worker VARCHAR(128),
+                lease_until DOUBLE,
+                attempts INT NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    ON UPDATE CURRENT_TIMESTAMP,
+                UNIQUE KEY uq_jobs_kind_target (kind, target_key),
+                KEY ix_jobs_claim (kind, status, lease_until)
+            )
+            """,
+        ],
+        [
+            """
+            CREATE TABLE jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                target TEXT NOT NULL,
+                target_key TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (kind, target_key)
+            )
+            """,
+            "CREATE INDEX ix_jobs_claim ON jobs (kind, status, lease_until)",
+        ],
+    ),
+    (
+        7, "near-duplicate signatures and LSH bands",
+        [
+            """
+            CREATE TABLE dedup_signatures (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                source_id INT NOT NULL,
+                signature VARBINARY(1024) NOT NULL,
+                output_path VARCHAR(1024),
+                UNIQUE KEY uq_dedup_signatures_source (source_id),
+                CONSTRAINT fk_dedup_signatures_source
+                    FOREIGN KEY (source_id) REFERENCES sources (id) ON DELETE CASCADE
+            )
+            """,
+            """
+            CREATE TABLE dedup_bands (
+                band_key VARCHAR(64) NOT NULL,
+                source_id INT NOT NULL,
+                PRIMARY KEY (band_key, source_id),
+                KEY ix_dedup_bands_source (source_id),
+                CONSTRAINT fk_dedup_bands_source
+                    FOREIGN KEY (source_id) REFERENCES sources (id) ON DELETE CASCADE
+            )
+            """,
+        ],
+        [
+            """
+            CREATE TABLE dedup_signatures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source_id INTEGER NOT NULL UNIQUE REFERENCES sources (id) ON DELETE CASCADE,
+                signature BLOB NOT NULL,
+                output_path TEXT
+            )
+            """,
+            """
+            CREATE TABLE dedup_bands (
+                band_key TEXT NOT NULL,
+                source_id INTEGER NOT NULL REFERENCES sources (id) ON DELETE CASCADE,
+                PRIMARY KEY (band_key, source_id)
+            )
+            """,
+            "CREATE INDEX ix_dedup_bands_source ON dedup_bands (source_id)",
+        ],
+    ),
+]
+
+SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at VARCHAR(32) NOT NULL
+)
+"""
+
+
+def apply(conn, dialect):
+    """Apply every migration newer than the recorded version; returns the count."""
+    placeholder = "?" if dialect == "sqlite" else "%s"
+    cursor = conn.cursor()
+
+    # many threads/processes may open a fresh database at once; one migrates,
+    # the others wait and then find the versions already recorded
+    if dialect != "sqlite":
+        cursor.execute("SELECT GET_LOCK('coachtk_migrations', 300)")
+        cursor.fetchall()
+
+    count = 0
+    try:
+        while True:
+            if dialect == "sqlite":
+                conn.commit()
+                cursor.execute("BEGIN IMMEDIATE")  # held until the commit below
+            cursor.execute(SCHEMA_MIGRATIONS_SQL)
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+
+            todo = [m for m in MIGRATIONS if m[0] not in applied]
+            if not todo:
+                conn.commit()
+                break
+
+            version, name, mysql_statements, sqlite_statements = todo[0]
+            statements = sqlite_statements if dialect == "sqlite" else mysql_statements
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(
+                f"INSERT INTO schema_migrations (version, name, applied_at) "
+                f"VALUES ({placeholder}, {placeholder}, {placeholder})",
+                (version, name, time.strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            conn.commit()
+            print(f"Applied migration {version}: {name}")
+            count += 1
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if dialect != "sqlite":
+            cursor.execute("SELECT RELEASE_LOCK('coachtk_migrations')")
+            cursor.fetchall()
+        cursor.close()
+    return count
+
+
+if __name__ == "__main__":
+    import registry
+
+    with registry.connection() as conn:
+        n = apply(conn, "sqlite" if registry.is_sqlite() else "mysql")
+    print(f"{n} migrations applied" if n else "Schema up to date")
@@ -0,0 +1,197 @@
+"""
+Offline nearest-neighbour table for content audits.
+
+    python neighbours.py -k 10 --other-sources --output neighbours.csv
+    python neighbours.py --backend memmap --block-size 2048 --threads 8
+
+Exports every chunk embedding from the store (all Chroma shards, or the
+memory-mapped store with --backend memmap) into one normalized float32
+matrix and finds each chunk's top-k cosine neighbours with blocked
+matmuls: a block of rows is compared against one block of columns at a
+time and merged into a running top-k, so memory stays at
+block_size^2 floats whatever the corpus size. --other-sources skips
+neighbours from the same JSON file, which is what spotting the same
+advice repeated across podcasts needs.
+"""
+import os
+import csv
+import time
+import argparse
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = int(os.getenv("NEIGHBOURS_BLOCK_SIZE", "1024"))
+DEFAULT_THREADS = int(os.getenv("NEIGHBOURS_THREADS", "0"))  # 0 = BLAS default
+
+
+def export_chroma(page_size=None):
+    """
+    (ids, vectors, metadatas) of every Chroma shard. Vectors are written
+    page by page into one preallocated float32 matrix, so the export
+    never holds more than a page of Chroma's Python lists.
+    """
+    from chroma_tools import BATCH_SIZE, collection_names, get_client
+
+    page_size = page_size or BATCH_SIZE
+    client = get_client()
+    collections = [client.get_collection(name) for name in collection_names(client)]
+    total = sum(c.count() for c in collections)
+    ids, metadatas = [], []
+    vectors = None
+
+    for collection in collections:
+        count = collection.count()
+        for offset in range(0, count, page_size):
+            page = collection.get(
+                include=["embeddings", "metadatas"],
+                limit=page_size,
+                offset=offset
+            )
+            block = np.asarray(page["embeddings"], dtype=np.float32)
+            if vectors is None:
+                vectors = np.empty((total, block.shape[1]), dtype=np.float32)
+            vectors[len(ids):len(ids) + len(block)] = block
+            ids.extend(page["ids"])
+            metadatas.extend(m or {} for m in page["metadatas"])
+
+    if vectors is None:
+        return [], np.zeros((0, 0), np.float32), []
+    # a shard written to meanwhile may return fewer rows than counted
+    return ids, vectors[:len(ids)], metadatas
+
+
+def export_memmap():
+    import json
+    from vector_store import MemmapVectorStore
+
+    store = MemmapVectorStore(None)
+    ids, metadatas = [], []
+    for chunk_hash, metadata in store.db.execute(
+        "SELECT chunk_hash, metadata FROM chunks ORDER BY row"
+    ):
+        ids.append(chunk_hash)
+        metadatas.append(json.loads(metadata or "{}"))
+    return ids, np.asarray(store.vectors(), dtype=np.float32), metadatas
+
+
+def normalize(m):
+    return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+
+
+def blocked_topk(vectors, k=10, block_size=DEFAULT_BLOCK_SIZE, groups=None):
+    """
+    Top-k neighbours of every row of a normalized matrix, excluding the row
+    itself (and rows of the same group when groups is given).
+    Returns (indices, scores), both shaped (n, k); missing slots are -1 / -inf.
+    """
+    n = len(vectors)
+    k = min(k, max(n - 1, 0))
+    top_idx = np.full((n, k), -1, dtype=np.int64)
+    top_score = np.full((n, k), -np.inf, dtype=np.float32)
+    if not k:
+        return top_idx, top_score
+
+    for r0 in range(0, n, block_size):
+        r1 = min(r0 + block_size, n)
+        rows = vectors[r0:r1]
+        best_idx = np.full((r1 - r0, k), -1, dtype=np.int64)
+        best_score = np.full((r1 - r0, k), -np.inf, dtype=np.float32)
+
+        for c0 in range(0, n, block_size):
+            c1 = min(c0 + block_size, n)
+            sims = rows @ vectors[c0:c1].T
+
+            if c0 < r1 and r0 < c1:
+                overlap = np.arange(max(r0, c0), min(r1, c1))
+                sims[overlap - r0, overlap - c0] = -np.inf
+            if groups is not None:
+                sims[groups[r0:r1, None] == groups[None, c0:c1]] = -np.inf
+
+            # merge this column block into the running top-k
+            cand_score = np.concatenate([best_score, sims], axis=1)
+            cand_idx = np.concatenate(
+                [best_idx, np.broadcast_to(np.arange(c0, c1), sims.shape)], axis=1
+            )
+            keep = np.argpartition(-cand_score, k - 1, axis=1)[:, :k]
+            best_score = np.take_along_axis(cand_score, keep, axis=1)
+            best_idx = np.take_along_axis(cand_idx, keep, axis=1)
+
+        order = np.argsort(-best_score, axis=1)
+        top_score[r0:r1] = np.take_along_axis(best_score, order, axis=1)
+        top_idx[r0:r1] = np.take_along_axis(best_idx, order, axis=1)
+        top_idx[r0:r1][np.isneginf(top_score[r0:r1])] = -1
+
+    return top_idx, top_score
+
+
+def limit_threads(threads):
+    """Cap BLAS threads for the matmuls; returns a context manager."""
+    from contextlib import nullcontext
+
+    if not threads:
+        return nullcontext()
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        print("threadpoolctl not installed; set OMP_NUM_THREADS instead of --threads")
+        return nullcontext()
+    return threadpool_limits(limits=threads, user_api="blas")
+
+
+def write_table(path, ids, metadatas, top_idx, top_score, min_score):
+    rows = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            "chunk_id", "source", "timestamp", "rank",
+            "neighbour_id", "neighbour_source", "neighbour_timestamp", "score"
+        ])
+        for i in range(len(ids)):
+            for rank, (j, score) in enumerate(zip(top_idx[i], top_score[i]), start=1):
+                if j < 0 or score < min_score:
+                    break
+                writer.writerow([
+                    ids[i], metadatas[i].get("source"), metadatas[i].get("timestamp"), rank,
+                    ids[j], metadatas[j].get("source"), metadatas[j].get("timestamp"),
+                    f"{score:.4f}"
+                ])
+                rows += 1
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Top-k cosine neighbours of every chunk")
+    parser.add_argument("--backend", choices=["chroma", "memmap"], default=os.getenv("VECTOR_BACKEND", "chroma"))
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    parser.add_argument("--min-score", type=float, default=0.0)
+    parser.add_argument("--other-sources", action="store_true", help="ignore neighbours from the same file")
+    parser.add_argument("--output", default="neighbours.csv")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ids, vectors, metadatas = export_chroma() if args.backend == "chroma" else export_memmap()
+    if not ids:
+        print("No chunks stored")
+        return
+    # in place: the matrix is the biggest thing in memory
+    vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    print(f"Exported {len(ids)} x {vectors.shape[1]} embeddings in {time.perf_counter() - start:.1f}s")
+
+    groups = None
+    if args.other_sources:
+        sources = [m.get("source") or f"?{i}" for i, m in enumerate(metadatas)]
+        groups = np.unique(sources, return_inverse=True)[1]
+
+    start = time.perf_counter()
+    with limit_threads(args.threads):
+        top_idx, top_score = blocked_topk(vectors, args.k, args.block_size, groups)
+    elapsed = time.perf_counter() - start
+    print(f"Top-{args.k} for {len(ids)} chunks in {elapsed:.1f}s ({len(ids) / elapsed:.0f} chunks/s)")
+
+    rows = write_table(args.output, ids, metadatas, top_idx, top_score, args.min_score)
+    print(f"{rows} neighbour rows written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
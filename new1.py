@@ -1,10 +1,13 @@
 import os
 import re
-import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from youtube_transcript_api import YouTubeTranscriptApi
 from langchain_community.document_loaders import PyPDFLoader
-import whisper
 from urllib.parse import urlparse, parse_qs
+import metrics
+import profiler
+import transcode
+from transcriber import load_transcriber, transcribe_file, write_transcript
 
 
 BASE_FOLDER = r"C:\Users\Administrator\Desktop\Coach TK\Documents"
@@ -16,22 +19,19 @@ YOUTUBE_LINKS = [
     "3OBREA0u_W4",
 ]
 
-model = whisper.load_model("base")
+profiler.start_if_requested(BASE_FOLDER)
+
+transcriber = load_transcriber()
 
 def convert_video_to_audio(video_path):
     audio_path = os.path.splitext(video_path)[0] + ".m4a"
 
     if os.path.exists(audio_path):
+        metrics.incr("cache_hits", stage="audio")
         return audio_path
 
-    subprocess.run(
-        [
-            "ffmpeg", "-i", video_path,
-            "-vn", "-c:a", "aac", "-b:a", "128k",
-            audio_path
-        ],
-        check=True
-    )
+    with metrics.span("ffmpeg", file=os.path.basename(video_path)):
+        transcode.transcode_to_m4a(video_path, audio_path)
 
     print(f"Converted: {os.path.basename(video_path)}")
     return audio_path
@@ -41,36 +41,47 @@ def transcribe_audio(audio_path):
 
     if os.path.exists(txt_path):
         print(f"Already transcribed: {os.path.basename(audio_path)}")
+        metrics.incr("cache_hits", stage="transcribe")
         return
 
     print(f"Transcribing: {os.path.basename(audio_path)}")
-    result = model.transcribe(audio_path)
+    with metrics.span("whisper", file=os.path.basename(audio_path)):
+        segments = transcribe_file(transcriber, audio_path)
+    write_transcript(segments, txt_path)
 
-    with open(txt_path, "w", encoding="utf-8") as f:
-        for seg in result["segments"]:
-            start = int(seg["start"])
-            end = int(seg["end"])
-            sm, ss = divmod(start, 60)
-            em, es = divmod(end, 60)
+# videos convert in a pool (transcode.py) while earlier ones transcribe
+def process_local_files():
+    conversions = {}
+    pool = ThreadPoolExecutor(max_workers=transcode.TRANSCODE_WORKERS)
 
-            f.write(
-                f"[{sm:02d}:{ss:02d} - {em:02d}:{es:02d}] "
-                f"{seg['text'].strip()}\n"
-            )
+    try:
+        for file in os.listdir(BASE_FOLDER):
+            path = os.path.join(BASE_FOLDER, file)
 
-def process_local_files():
-    for file in os.listdir(BASE_FOLDER):
-        path = os.path.join(BASE_FOLDER, file)
+            if not os.path.isfile(path):
+                continue
 
-        if not os.path.isfile(path):
-            continue
+            profiler.attribute(file)
 
-        if file.lower().endswith(VIDEO_EXTENSIONS):
-            audio_path = convert_video_to_audio(path)
-            transcribe_audio(audio_path)
+            if file.lower().endswith(VIDEO_EXTENSIONS):
+                conversions[pool.submit(convert_video_to_audio, path)] = file
+
+            elif file.lower().endswith(AUDIO_EXTENSIONS):
+                transcribe_audio(path)
+
+        for future in as_completed(conversions):
+            profiler.attribute(conversions[future])
 
-        elif file.lower().endswith(AUDIO_EXTENSIONS):
-            transcribe_audio(path)
+            try:
+                audio_path = future.result()
+            except Exception as e:
+                print(f"Conversion failed, will retry next run: {e}")
+                metrics.incr("ffmpeg_failures")
+                continue
+
+            transcribe_audio(audio_path)
+    finally:
+        pool.shutdown(cancel_futures=True)
 
 def extract_video_id(input_value):
     if len(input_value) == 11 and "http" not in input_value:
@@ -96,14 +107,17 @@ def transcribe_youtube(input_value):
 
     if os.path.exists(output_file):
         print(f"YouTube already transcribed: {video_id}")
+        metrics.incr("skips", stage="youtube")
         return
 
     print(f"Fetching YouTube transcript: {video_id}")
 
     try:
-        transcript = YouTubeTranscriptApi().fetch(video_id)
+        with metrics.span("youtube_fetch", video_id=video_id):
+            transcript = YouTubeTranscriptApi().fetch(video_id)
     except Exception as e:
         print(f"Failed to fetch transcript: {e}")
+        metrics.incr("youtube_failures")
         return
 
     with open(output_file, "w", encoding="utf-8") as f:
@@ -149,15 +163,19 @@ def process_pdfs():
         if not file.lower().endswith(".pdf"):
             continue
 
+        profiler.attribute(file)
+
         pdf_path = os.path.join(BASE_FOLDER, file)
         output_txt = os.path.splitext(pdf_path)[0] + ".txt"
 
         if os.path.exists(output_txt):
             print(f"PDF already cleaned: {file}")
+            metrics.incr("skips", stage="pdf")
             continue
 
         loader = PyPDFLoader(pdf_path)
-        docs = loader.load()
+        with metrics.span("pdf_load", file=file):
+            docs = loader.load()
 
         cleaned_pages = [
             clean_pdf_text(doc.page_content)
@@ -169,9 +187,12 @@ def process_pdfs():
 
         print(f"PDF cleaned & saved: {file}")
 
-process_local_files()
+if __name__ == "__main__":
+    process_local_files()
 
-for link in YOUTUBE_LINKS:
-    transcribe_youtube(link)
+    for link in YOUTUBE_LINKS:
+        profiler.attribute(link)
+        transcribe_youtube(link)
 
-process_pdfs()
+    process_pdfs()
+    profiler.attribute(None)
@@ -2,6 +2,7 @@ import os
 import json
 import re
 from dotenv import load_dotenv
+import metrics
 from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from langchain_community.document_loaders import TextLoader
@@ -34,7 +35,7 @@ def combine_timestamps(first_ts, last_ts):
 
 def remove_timestamps(text: str) -> str:
     return re.sub(
-        r"\[\d{2}:\d{2}\s*-\s*\d{2}:\d{2}\]",
+        r"\[\d{2,}:\d{2}\s*-\s*\d{2,}:\d{2}\]",
         "",
         text
     ).strip()
@@ -95,6 +96,7 @@ json_path = TXT_FILE_PATH.replace(".txt", ".json")
 
 if os.path.exists(json_path):
     print("Skipped (JSON already created)")
+    metrics.incr("skips", stage="annotate")
     exit()
 
 print(f"Processing TXT → JSON: {os.path.basename(TXT_FILE_PATH)}")
@@ -118,10 +120,12 @@ processed_chunks = []
 
 for i, chunk in enumerate(chunks, start=1):
     try:
-        raw = chain.invoke({"text": chunk})
+        with metrics.span("llm_call", chunk=i):
+            raw = chain.invoke({"text": chunk})
         metadata = safe_json_load(raw)
     except Exception:
         print(f"Chunk {i} skipped (LLM error)")
+        metrics.incr("llm_failures")
         continue
 
     metadata["timestamp"] = combine_timestamps(
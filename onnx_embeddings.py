@@ -0,0 +1,129 @@
+"""
+ONNX Runtime embedding backend for CPU-only ingestion (EMBEDDING_BACKEND=onnx).
+
+    python onnx_embeddings.py     # export all-MiniLM-L6-v2 and quantize to int8
+
+Produces the same normalized mean-pooled vectors as the sentence-transformers
+model, so existing Chroma collections keep working without re-embedding.
+"""
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from embedding_backend import EMBEDDING_MODEL
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ONNX_DIR = os.getenv(
+    "EMBEDDING_ONNX_DIR",
+    os.path.join(BASE_DIR, "onnx_models", EMBEDDING_MODEL.split("/")[-1])
+)
+FP32_MODEL = "model.onnx"
+INT8_MODEL = "model_int8.onnx"
+MAX_SEQ_LENGTH = 256  # same truncation as the sentence-transformers model
+BATCH_SIZE = 64
+
+
+def export_onnx(output_dir=ONNX_DIR):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL)
+    model = AutoModel.from_pretrained(EMBEDDING_MODEL).eval()
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    axes = {0: "batch", 1: "sequence"}
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        os.path.join(output_dir, FP32_MODEL),
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": axes,
+            "attention_mask": axes,
+            "token_type_ids": axes,
+            "last_hidden_state": axes
+        },
+        opset_version=17
+    )
+    tokenizer.save_pretrained(output_dir)
+    print(f"Exported {EMBEDDING_MODEL} to {output_dir}")
+
+
+def quantize_int8(output_dir=ONNX_DIR):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        os.path.join(output_dir, FP32_MODEL),
+        os.path.join(output_dir, INT8_MODEL),
+        weight_type=QuantType.QInt8
+    )
+    print(f"Quantized model saved: {INT8_MODEL}")
+
+
+class OnnxEmbeddings(Embeddings):
+    """all-MiniLM-L6-v2 through ONNX Runtime, int8 dynamic quantization by default."""
+
+    def __init__(self, quantized=True, threads=0, model_dir=ONNX_DIR):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_file = INT8_MODEL if quantized else FP32_MODEL
+        if not os.path.exists(os.path.join(model_dir, FP32_MODEL)):
+            export_onnx(model_dir)
+        if quantized and not os.path.exists(os.path.join(model_dir, INT8_MODEL)):
+            quantize_int8(model_dir)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    def _embed_batch(self, texts):
+        encoded = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feeds = {
+            "input_ids": input_ids,
+            "attention_mask": mask,
+            "token_type_ids": np.zeros_like(input_ids)
+        }
+        hidden = self.session.run(
+            None, {k: v for k, v in feeds.items() if k in self.input_names}
+        )[0]
+
+        # mean pooling over real tokens, then L2 normalize (sentence-transformers Normalize)
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+
+        # sort by length so each batch pads to a similar size
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), BATCH_SIZE):
+            idx = order[start:start + BATCH_SIZE]
+            for i, vec in zip(idx, self._embed_batch([texts[i] for i in idx])):
+                vectors[i] = vec.tolist()
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+if __name__ == "__main__":
+    export_onnx()
+    quantize_int8()
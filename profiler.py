@@ -0,0 +1,210 @@
+"""
+Sampling profiler for the pipeline scripts (--profile).
+
+    python main.py --profile
+
+A background thread samples every thread's Python stack every
+PROFILE_INTERVAL seconds until the process exits, then writes
+<script>_<time>.collapsed (Brendan Gregg's collapsed-stack format) and
+<script>_<time>.svg (flamegraph) into the script's output folder and
+prints the hottest functions.
+
+After attribute(name) a thread's samples are filed under a
+"file:<name>" root frame, so the flamegraph and the per-file table show
+where each input's wall time went.
+"""
+import os
+import sys
+import time
+import atexit
+import hashlib
+import threading
+from collections import Counter, defaultdict
+from html import escape
+
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.01"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "25"))
+
+_profiler = None
+
+
+class SamplingProfiler:
+    def __init__(self, output_dir, name, interval=PROFILE_INTERVAL):
+        self.output_dir = output_dir
+        self.name = name
+        self.interval = interval
+        self.samples = Counter()  # (file label, stack tuple) -> count
+        self.current = {}  # thread id -> file label
+        self.since = {}  # thread id -> when the current label was set
+        self.file_seconds = defaultdict(float)
+        self.started = time.perf_counter()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while self.running:
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                self.samples[(self.current.get(tid, "-"), tuple(reversed(stack)))] += 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        now = time.perf_counter()
+        self.wall = now - self.started
+        for tid, label in self.current.items():
+            self.file_seconds[label] += now - self.since[tid]
+
+    # ---------------- reports ----------------
+    def collapsed_lines(self):
+        for (label, stack), count in sorted(self.samples.items()):
+            yield ";".join((f"file:{label}",) + stack) + f" {count}"
+
+    def top_functions(self, n=PROFILE_TOP_N):
+        own = Counter()
+        total = Counter()
+        for (_, stack), count in self.samples.items():
+            if not stack:
+                continue
+            own[stack[-1]] += count
+            for func in set(stack):
+                total[func] += count
+        return [(func, own[func], total[func]) for func, _ in own.most_common(n)]
+
+    def per_file(self):
+        samples = Counter()
+        for (label, _), count in self.samples.items():
+            samples[label] += count
+        return samples
+
+    def report(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self.output_dir, f"{self.name}_{stamp}")
+
+        lines = list(self.collapsed_lines())
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        with open(base + ".svg", "w", encoding="utf-8") as f:
+            f.write(render_flamegraph(lines, f"{self.name} ({self.wall:.1f}s wall)"))
+
+        n_samples = sum(self.samples.values()) or 1
+        print(f"\nProfile: {self.wall:.1f}s wall, {n_samples} samples every {self.interval * 1000:.0f}ms")
+        print(f"{'self %':>7} {'total %':>8}  function")
+        for func, own, total in self.top_functions():
+            print(f"{100 * own / n_samples:>7.1f} {100 * total / n_samples:>8.1f}  {func}")
+
+        file_samples = self.per_file()
+        print(f"\n{'wall s':>9} {'samples':>8}  file")
+        for label in sorted(self.file_seconds, key=self.file_seconds.get, reverse=True):
+            print(f"{self.file_seconds[label]:>9.2f} {file_samples.get(label, 0):>8}  {label}")
+        print(f"\nProfile written: {base}.collapsed / {base}.svg")
+
+
+# ---------------- flamegraph ----------------
+def _color(name):
+    h = int(hashlib.md5(name.encode("utf-8")).hexdigest()[:6], 16)
+    return f"rgb({205 + h % 50},{(h >> 8) % 180 + 50},{(h >> 16) % 55})"
+
+
+def render_flamegraph(collapsed_lines, title, width=1200, row=16):
+    root = {"children": {}, "count": 0}
+    for line in collapsed_lines:
+        stack, _, count = line.rpartition(" ")
+        count = int(count)
+        node = root
+        node["count"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"children": {}, "count": 0})
+            node["count"] += count
+
+    def depth(node):
+        return 1 + max((depth(c) for c in node["children"].values()), default=0)
+
+    levels = depth(root)
+    height = (levels + 2) * row
+    total = root["count"] or 1
+    rects = []
+
+    def draw(node, name, x, level):
+        w = width * node["count"] / total
+        if w < 0.5:
+            return
+        y = height - (level + 1) * row
+        label = escape(name)
+        rects.append(
+            f'<g><title>{label} ({node["count"]} samples, {100 * node["count"] / total:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" fill="{_color(name)}"/>'
+            + (f'<text x="{x + 3:.1f}" y="{y + row - 4}">{escape(name[:int(w / 7)])}</text>' if w > 35 else "")
+            + "</g>"
+        )
+        for child_name, child in sorted(node["children"].items()):
+            draw(child, child_name, x, level + 1)
+            x += width * child["count"] / total
+
+    x = 0.0
+    for name, child in sorted(root["children"].items()):
+        draw(child, name, x, 0)
+        x += width * child["count"] / total
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<rect width="100%" height="100%" fill="#fafafa"/>'
+        f'<text x="{width / 2}" y="{row}" text-anchor="middle" font-size="14">{escape(title)}</text>'
+        + "".join(rects)
+        + "</svg>\n"
+    )
+
+
+# ---------------- entry-point hooks ----------------
+def start_if_requested(output_dir):
+    """Start profiling when the script was run with --profile."""
+    global _profiler
+
+    if "--profile" not in sys.argv or _profiler is not None:
+        return False
+
+    name = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+    _profiler = SamplingProfiler(output_dir, name)
+    _profiler.start()
+    atexit.register(_finish)
+    print(f"Profiling {name} (every {PROFILE_INTERVAL * 1000:.0f}ms)")
+    return True
+
+
+def _finish():
+    _profiler.stop()
+    _profiler.report()
+
+
+def attribute(label):
+    """
+    File this thread's samples and wall time under label (e.g. the input
+    file) until the next attribute() call; None stops attributing.
+    """
+    if _profiler is None:
+        return
+
+    tid = threading.get_ident()
+    now = time.perf_counter()
+    previous = _profiler.current.pop(tid, None)
+    if previous is not None:
+        _profiler.file_seconds[previous] += now - _profiler.since[tid]
+
+    if label is not None:
+        _profiler.current[tid] = label
+        _profiler.since[tid] = now
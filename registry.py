@@ -0,0 +1,568 @@
+"""
+Shared access to the coachtk file_registry database.
+
+Every call borrows a connection from a mysql.connector pool for the
+duration of one statement/transaction, pings it (reconnecting if the
+server dropped it during a long transcription) and hands it back, so
+threads and workers never share a cursor.
+
+REGISTRY_BACKEND=sqlite swaps MySQL for a local SQLite file
+(REGISTRY_SQLITE_PATH), used by tests and benchmarks.
+
+Besides the file_registry hashes, every ingested source (video, audio,
+YouTube id, PDF) has a row in sources and one row per finished stage in
+source_stages, so pending(stage) answers "what is left to do" with one
+indexed query. A near-duplicate copy of another source (dedup.py) points
+at it through sources.duplicate_of and has its later stages closed with
+status "duplicate"; the MinHash signatures and LSH band keys it matches
+against live in dedup_signatures / dedup_bands, so every worker host
+sees the same index. The schema lives in migrations.py.
+
+The jobs table is a work queue shared by worker.py processes on any
+host. claim_job() locks one claimable row with SELECT ... FOR UPDATE
+SKIP LOCKED (BEGIN IMMEDIATE on SQLite) and leases it; the worker's
+heartbeat_job() extends the lease, and a job whose lease ran out is
+claimable again. Lease times come from the database clock, so hosts
+need not agree on the time.
+"""
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import migrations
+
+load_dotenv()
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", "newpassword"),
+    "database": os.getenv("DB_NAME", "coachtk")
+}
+
+REGISTRY_BACKEND = os.getenv("REGISTRY_BACKEND", "mysql")
+REGISTRY_SQLITE_PATH = os.getenv("REGISTRY_SQLITE_PATH", "registry.sqlite3")
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+POOL_WAIT = 30  # seconds to wait for a free pooled connection
+RETRIES = 3
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# pipeline stages in order; each one works on the previous stage's output
+STAGES = ("transcribed", "annotated", "embedded")
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def is_sqlite():
+    return REGISTRY_BACKEND == "sqlite"
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        # a forked worker process (worker.py --processes) opens its own connections
+        if _pool is None or _pool_pid != os.getpid():
+            from mysql.connector import pooling
+
+            pool = pooling.MySQLConnectionPool(
+                pool_name="coachtk",
+                pool_size=POOL_SIZE,
+                pool_reset_session=True,
+                **DB_CONFIG
+            )
+            # same as the SQLite stand-in: bring the schema up to date before first use;
+            # GET_LOCK in migrations.apply() lets one process migrate while the rest wait
+            conn = pool.get_connection()
+            try:
+                migrations.apply(conn, "mysql")
+            finally:
+                conn.close()
+            _pool, _pool_pid = pool, os.getpid()
+    return _pool
+
+
+def _mysql_connection():
+    from mysql.connector import errors
+
+    deadline = time.monotonic() + POOL_WAIT
+    while True:
+        try:
+            conn = _get_pool().get_connection()
+            break
+        except errors.PoolError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+    conn.ping(reconnect=True, attempts=RETRIES, delay=2)
+    return conn
+
+
+def _sqlite_connection():
+    # one connection per thread; sqlite serializes writers itself
+    conn = getattr(_local, "sqlite", None)
+    if conn is None or _local.sqlite_pid != os.getpid():
+        conn = sqlite3.connect(REGISTRY_SQLITE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        migrations.apply(conn, "sqlite")
+        _local.sqlite = conn
+        _local.sqlite_pid = os.getpid()
+    return conn
+
+
+@contextmanager
+def connection():
+    """Borrow a connection for one unit of work; commits on success."""
+    if is_sqlite():
+        conn = _sqlite_connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return
+
+    conn = _mysql_connection()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()  # back to the pool
+
+
+def _sql(sql):
+    return sql.replace("%s", "?") if is_sqlite() else sql
+
+
+def _is_disconnect(e):
+    if is_sqlite():
+        return False
+    from mysql.connector import errors
+    return isinstance(e, (errors.OperationalError, errors.InterfaceError))
+
+
+def execute(sql, params=(), fetch=None):
+    """
+    Run one statement in its own transaction. fetch="one"/"all" returns
+    rows. A dropped MySQL connection is retried on a fresh one.
+    """
+    for attempt in range(1, RETRIES + 1):
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(_sql(sql), params)
+                    if fetch == "one":
+                        return cursor.fetchone()
+                    if fetch == "all":
+                        return cursor.fetchall()
+                    return cursor.rowcount
+                finally:
+                    cursor.close()
+        except Exception as e:
+            if attempt == RETRIES or not _is_disconnect(e):
+                raise
+            print(f"DB connection lost ({e}), retrying")
+            time.sleep(attempt)
+
+
+# it is check hash is exists in DB or not if yes then give True else false
+def is_hash_exists(hash_id):
+    return execute(
+        "SELECT id FROM file_registry WHERE hash_id=%s",
+        (hash_id,),
+        fetch="one"
+    ) is not None
+
+
+# save hash id in db; saving an existing hash again is a no-op
+def save_hash(hash_id, file_name, file_path, file_type):
+    if is_sqlite():
+        conflict = "ON CONFLICT (hash_id) DO NOTHING"
+    else:
+        conflict = "ON DUPLICATE KEY UPDATE hash_id = hash_id"
+
+    execute(
+        f"""
+        INSERT INTO file_registry (hash_id, file_name, file_path, file_type)
+        VALUES (%s, %s, %s, %s)
+        {conflict}
+        """,
+        (hash_id, file_name, file_path, file_type)
+    )
+
+
+# ---------------- sources / stages ----------------
+def register_source(source_key, source_type, file_name, file_path):
+    """Upsert a source by its content key and return its id."""
+    if is_sqlite():
+        conflict = "ON CONFLICT (source_key) DO UPDATE SET file_name = excluded.file_name, file_path = excluded.file_path"
+    else:
+        conflict = "ON DUPLICATE KEY UPDATE file_name = VALUES(file_name), file_path = VALUES(file_path)"
+
+    execute(
+        f"""
+        INSERT INTO sources (source_key, source_type, file_name, file_path)
+        VALUES (%s, %s, %s, %s)
+        {conflict}
+        """,
+        (source_key, source_type, file_name, file_path)
+    )
+    return execute(
+        "SELECT id FROM sources WHERE source_key=%s",
+        (source_key,),
+        fetch="one"
+    )[0]
+
+
+def mark_stage(source_id, stage, output_path=None, status="done"):
+    if stage not in STAGES:
+        raise ValueError(f"Unknown stage: {stage}")
+
+    if is_sqlite():
+        conflict = (
+            "ON CONFLICT (source_id, stage) DO UPDATE SET status = excluded.status, "
+            "output_path = excluded.output_path, updated_at = CURRENT_TIMESTAMP"
+        )
+    else:
+        conflict = "ON DUPLICATE KEY UPDATE status = VALUES(status), output_path = VALUES(output_path)"
+
+    execute(
+        f"""
+        INSERT INTO source_stages (source_id, stage, status, output_path)
+        VALUES (%s, %s, %s, %s)
+        {conflict}
+        """,
+        (source_id, stage, status, output_path)
+    )
+
+
+def source_for_output(stage, output_path):
+    """
+    Id of the source whose `stage` produced output_path, or None. Several
+    sources can share one output (a video and its .m4a both write
+    <stem>_time.txt); the oldest canonical one wins over duplicates.
+    """
+    row = execute(
+        """
+        SELECT st.source_id FROM source_stages st
+        JOIN sources s ON s.id = st.source_id
+        WHERE st.stage=%s AND st.output_path=%s
+        ORDER BY s.duplicate_of IS NOT NULL, st.source_id
+        LIMIT 1
+        """,
+        (stage, output_path),
+        fetch="one"
+    )
+    return row[0] if row else None
+
+
+def get_source(source_id):
+    """(source_type, file_name, file_path) of a source, or None."""
+    return execute(
+        "SELECT source_type, file_name, file_path FROM sources WHERE id=%s",
+        (source_id,),
+        fetch="one"
+    )
+
+
+def link_duplicate(source_id, canonical_id):
+    """Point a source at its canonical copy and close its remaining stages."""
+    execute(
+        "UPDATE sources SET duplicate_of=%s WHERE id=%s",
+        (canonical_id, source_id)
+    )
+    for stage in STAGES[1:]:
+        mark_stage(source_id, stage, status="duplicate")
+
+
+def canonical_of(source_id):
+    """Id of the source this one duplicates, or None."""
+    row = execute(
+        "SELECT duplicate_of FROM sources WHERE id=%s",
+        (source_id,),
+        fetch="one"
+    )
+    return row[0] if row else None
+
+
+# ---------------- near-duplicate index ----------------
+def dedup_candidates(band_keys, exclude=None):
+    """
+    (entry_id, source_id, signature bytes, output_path) of every indexed
+    source sharing an LSH band key, oldest entry first.
+    """
+    placeholders = ", ".join(["%s"] * len(band_keys))
+    return execute(
+        f"""
+        SELECT DISTINCT s.id, s.source_id, s.signature, s.output_path
+        FROM dedup_bands b
+        JOIN dedup_signatures s ON s.source_id = b.source_id
+        WHERE b.band_key IN ({placeholders}) AND s.source_id <> %s
+        ORDER BY s.id
+        """,
+        (*band_keys, -1 if exclude is None else exclude),
+        fetch="all"
+    )
+
+
+def dedup_add(source_id, band_keys, signature, output_path):
+    """Index a source's signature under its band keys; returns its entry id."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        try:
+            # a re-transcribed source replaces its old signature
+            cursor.execute(_sql("DELETE FROM dedup_bands WHERE source_id=%s"), (source_id,))
+            cursor.execute(_sql("DELETE FROM dedup_signatures WHERE source_id=%s"), (source_id,))
+            cursor.execute(
+                _sql("INSERT INTO dedup_signatures (source_id, signature, output_path) VALUES (%s, %s, %s)"),
+                (source_id, signature, output_path)
+            )
+            entry_id = cursor.lastrowid
+            cursor.executemany(
+                _sql("INSERT INTO dedup_bands (band_key, source_id) VALUES (%s, %s)"),
+                [(key, source_id) for key in set(band_keys)]
+            )
+        finally:
+            cursor.close()
+    return entry_id
+
+
+def dedup_remove(source_id):
+    with connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_sql("DELETE FROM dedup_bands WHERE source_id=%s"), (source_id,))
+            cursor.execute(_sql("DELETE FROM dedup_signatures WHERE source_id=%s"), (source_id,))
+        finally:
+            cursor.close()
+
+
+def dedup_count():
+    return execute("SELECT COUNT(*) FROM dedup_signatures", fetch="one")[0]
+
+
+# ---------------- PDF pages ----------------
+def pdf_page_hashes(pdf_name):
+    """{content_hash: (page_no, output_path)} of the last ingested edition."""
+    rows = execute(
+        "SELECT content_hash, page_no, output_path FROM pdf_pages WHERE pdf_name=%s",
+        (pdf_name,),
+        fetch="all"
+    )
+    return {content_hash: (page_no, output_path) for content_hash, page_no, output_path in rows}
+
+
+def save_pdf_pages(pdf_name, pages):
+    """Replace the page index of pdf_name with (page_no, content_hash, output_path) rows."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_sql("DELETE FROM pdf_pages WHERE pdf_name=%s"), (pdf_name,))
+            # a page repeated verbatim (e.g. blank) is indexed once
+            unique = {content_hash: (page_no, output_path) for page_no, content_hash, output_path in reversed(pages)}
+            cursor.executemany(
+                _sql(
+                    "INSERT INTO pdf_pages (pdf_name, content_hash, page_no, output_path) "
+                    "VALUES (%s, %s, %s, %s)"
+                ),
+                [(pdf_name, h, page_no, path) for h, (page_no, path) in unique.items()]
+            )
+        finally:
+            cursor.close()
+
+
+# ---------------- job queue ----------------
+def _now_sql():
+    # epoch seconds on the database server's clock
+    if is_sqlite():
+        return "((julianday('now') - 2440587.5) * 86400.0)"
+    return "UNIX_TIMESTAMP(NOW(6))"
+
+
+def enqueue_job(kind, target, key=None, requeue_done=False):
+    """
+    Queue `target` for `kind` workers; True if a job was queued. Jobs are
+    unique per (kind, key), key defaulting to the target. A job already
+    queued, running or failed is left alone; a done one too, unless
+    requeue_done says its work is known to be unfinished (the source is
+    still pending).
+    """
+    target_key = hashlib.sha256((key or target).encode("utf-8")).hexdigest()
+    if not requeue_done:
+        conflict = "ON CONFLICT (kind, target_key) DO NOTHING" if is_sqlite() else "ON DUPLICATE KEY UPDATE id = id"
+    elif is_sqlite():
+        conflict = (
+            "ON CONFLICT (kind, target_key) DO UPDATE SET status = 'queued', attempts = 0, error = NULL "
+            "WHERE jobs.status = 'done'"
+        )
+    else:
+        # assignments run left to right, so status changes last
+        conflict = (
+            "ON DUPLICATE KEY UPDATE attempts = IF(status = 'done', 0, attempts), "
+            "error = IF(status = 'done', NULL, error), status = IF(status = 'done', 'queued', status)"
+        )
+
+    return execute(
+        f"""
+        INSERT INTO jobs (kind, target, target_key)
+        VALUES (%s, %s, %s)
+        {conflict}
+        """,
+        (kind, target, target_key)
+    ) > 0
+
+
+def claim_job(worker, kinds, lease):
+    """
+    Lease the oldest claimable job of `kinds` to `worker` for `lease`
+    seconds and return (job_id, kind, target, attempts), or None. A job
+    whose lease expired JOB_MAX_ATTEMPTS times (its worker kept dying) is
+    marked failed instead of handed out again.
+    """
+    kind_list = ", ".join(["%s"] * len(kinds))
+    lock = "" if is_sqlite() else "FOR UPDATE SKIP LOCKED"
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        try:
+            if is_sqlite():
+                conn.commit()
+                cursor.execute("BEGIN IMMEDIATE")  # one claimer at a time
+
+            while True:
+                cursor.execute(
+                    _sql(f"""
+                    SELECT id, kind, target, attempts FROM jobs
+                    WHERE kind IN ({kind_list})
+                        AND (status = 'queued' OR (status = 'running' AND lease_until < {_now_sql()}))
+                    ORDER BY id
+                    LIMIT 1
+                    {lock}
+                    """),
+                    tuple(kinds)
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+
+                job_id, kind, target, attempts = row
+                if attempts >= JOB_MAX_ATTEMPTS:
+                    cursor.execute(
+                        _sql(
+                            "UPDATE jobs SET status = 'failed', worker = NULL, lease_until = NULL, "
+                            "error = %s WHERE id = %s"
+                        ),
+                        (f"lease expired {attempts} times", job_id)
+                    )
+                    continue
+
+                cursor.execute(
+                    _sql(f"""
+                    UPDATE jobs SET status = 'running', worker = %s,
+                        lease_until = {_now_sql()} + %s, attempts = attempts + 1
+                    WHERE id = %s
+                    """),
+                    (worker, lease, job_id)
+                )
+                return job_id, kind, target, attempts + 1
+        finally:
+            cursor.close()
+
+
+def heartbeat_job(job_id, worker, lease):
+    """Extend the lease; False if the job is no longer this worker's."""
+    return execute(
+        f"""
+        UPDATE jobs SET lease_until = {_now_sql()} + %s
+        WHERE id = %s AND worker = %s AND status = 'running'
+        """,
+        (lease, job_id, worker)
+    ) == 1
+
+
+def finish_job(job_id, worker, error=None):
+    """
+    Close a claimed job: done, or back to the queue with its error until
+    JOB_MAX_ATTEMPTS, then failed. False if the lease was lost meanwhile.
+    """
+    if error is None:
+        return execute(
+            """
+            UPDATE jobs SET status = 'done', worker = NULL, lease_until = NULL, error = NULL
+            WHERE id = %s AND worker = %s AND status = 'running'
+            """,
+            (job_id, worker)
+        ) == 1
+
+    return execute(
+        """
+        UPDATE jobs SET
+            status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+            worker = NULL, lease_until = NULL, error = %s
+        WHERE id = %s AND worker = %s AND status = 'running'
+        """,
+        (JOB_MAX_ATTEMPTS, str(error)[:2000], job_id, worker)
+    ) == 1
+
+
+def requeue_failed_jobs(kinds):
+    kind_list = ", ".join(["%s"] * len(kinds))
+    return execute(
+        f"UPDATE jobs SET status = 'queued', attempts = 0 WHERE status = 'failed' AND kind IN ({kind_list})",
+        tuple(kinds)
+    )
+
+
+def job_counts():
+    """{(kind, status): count} over the whole queue."""
+    rows = execute(
+        "SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status",
+        fetch="all"
+    )
+    return {(kind, status): count for kind, status, count in rows}
+
+
+def pending(stage):
+    """
+    Sources whose previous stage is done but `stage` is not, as
+    (source_id, source_type, file_name, input_path) rows, where input_path
+    is the previous stage's output.
+    """
+    previous = STAGES[STAGES.index(stage) - 1] if STAGES.index(stage) else None
+    if previous is None:
+        raise ValueError(f"{stage} is the first stage; scan the inputs instead")
+
+    return execute(
+        """
+        SELECT s.id, s.source_type, s.file_name, prev.output_path
+        FROM source_stages prev
+        JOIN sources s ON s.id = prev.source_id
+        LEFT JOIN source_stages cur
+            ON cur.source_id = prev.source_id AND cur.stage = %s
+            AND cur.status IN ('done', 'duplicate')
+        WHERE prev.stage = %s AND prev.status = 'done' AND cur.source_id IS NULL
+        ORDER BY s.id
+        """,
+        (stage, previous),
+        fetch="all"
+    )
+
+
+if __name__ == "__main__":
+    for stage in STAGES[1:]:
+        rows = pending(stage)
+        print(f"{stage}: {len(rows)} pending")
+        for source_id, source_type, file_name, input_path in rows:
+            print(f"  [{source_type}] {file_name} -> {input_path}")
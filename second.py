@@ -1,34 +1,38 @@
 import os
+import sys
 import json
 import re
+import difflib
 import hashlib
-import mysql.connector
+from collections import Counter
+from typing import Literal, Optional
+import chunker
+import classifier
+import metrics
+import profiler
+from registry import (
+    canonical_of, get_source, is_hash_exists, mark_stage, pending, save_hash,
+    source_for_output
+)
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from langchain_community.document_loaders import TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.output_parsers import StrOutputParser
+from pydantic import BaseModel, ValidationError
+from embedding_backend import load_embeddings
 
 TXT_FILE_PATH = r"C:\Users\Administrator\Desktop\Coach TK\Documents\audio2_time.txt"
-SOURCE_TYPE = "Youtube"
-REFERENCE_LINK = "https://www.youtube.com/watch?v=k-JJm2iIh98"
-
-DB_CONFIG = {
-    "host": "localhost",
-    "user": "root",
-    "password": "newpassword",
-    "database": "coachtk"
-}
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v="
+ANNOTATE_RETRIES = int(os.getenv("ANNOTATE_RETRIES", "2"))  # extra calls for chunks whose reply was unusable
+TOPIC_BATCH = int(os.getenv("TOPIC_BATCH", "8"))  # classifier-labelled chunks per topic-only call
 
 
 load_dotenv()
-db = mysql.connector.connect(**DB_CONFIG)
-cursor = db.cursor()
+profiler.start_if_requested(os.path.dirname(TXT_FILE_PATH))
 
 def generate_file_hash(file_path):
     sha = hashlib.sha256()
-    with open(file_path, "rb") as f:
+    with metrics.span("hash", stage="annotate"), open(file_path, "rb") as f:
         for chunk in iter(lambda: f.read(8192), b""):
             sha.update(chunk)
     return sha.hexdigest()
@@ -39,25 +43,6 @@ def generate_json_stage_hash(txt_hash):
         (txt_hash + "_to_json").encode("utf-8")
     ).hexdigest()
 
-
-def is_hash_exists(hash_id):
-    cursor.execute(
-        "SELECT id FROM file_registry WHERE hash_id=%s",
-        (hash_id,)
-    )
-    return cursor.fetchone() is not None
-
-
-def save_hash(hash_id, file_name, file_path, file_type):
-    cursor.execute(
-        """
-        INSERT INTO file_registry (hash_id, file_name, file_path, file_type)
-        VALUES (%s, %s, %s, %s)
-        """,
-        (hash_id, file_name, file_path, file_type)
-    )
-    db.commit()
-
 def safe_json_load(text: str):
     match = re.search(r"\{[\s\S]*\}", text)
     if not match:
@@ -75,7 +60,7 @@ def combine_timestamps(first_ts, last_ts):
 
 def remove_timestamps(text: str) -> str:
     return re.sub(
-        r"\[\d{2}:\d{2}\s*-\s*\d{2}:\d{2}\]",
+        r"\[\d{2,}:\d{2}\s*-\s*\d{2,}:\d{2}\]",  # minutes go past 99 on long recordings
         "",
         text
     ).strip()
@@ -122,82 +107,349 @@ TEXT:
     input_variables=["text"]
 )
 
-chain = prompt | model | StrOutputParser()
+# Groq JSON mode guarantees a JSON object; ChunkAnnotation enforces the fields and enum values.
+json_model = model.bind(response_format={"type": "json_object"})
+chain = prompt | json_model
+
+retry_prompt = PromptTemplate(
+    template=prompt.template.replace(
+        "TEXT:",
+        "Your previous reply for this text was rejected: {error}\n"
+        "Return ONLY a JSON object with exactly the FIELDS above and allowed values.\n\n"
+        "TEXT:"
+    ),
+    input_variables=["text", "error"]
+)
+retry_chain = retry_prompt | json_model
+
+# chunks the local classifier labelled confidently only need a topic; several share one call
+topic_prompt = PromptTemplate(
+    template="""
+You are an expert content analyst.
+
+Give each numbered excerpt a topic of 1–3 short words.
+Return ONLY a JSON object of the form {{"topics": ["...", "..."]}}
+with exactly {count} topics, in excerpt order.
+
+EXCERPTS:
+{excerpts}
+""",
+    input_variables=["count", "excerpts"]
+)
+topic_chain = topic_prompt | json_model
+
 
-if not os.path.exists(TXT_FILE_PATH):
-    print("File not found")
-    exit()
+class ChunkAnnotation(BaseModel):
+    domain: Literal["Leadership", "Mindset", "IT", "Strategy"]
+    topic: str
+    content_type: Literal["Framework", "Example", "Story", "Advice"]
+    first_timestamp: Optional[str] = None
+    last_timestamp: Optional[str] = None
+    cleaned_text: str
 
-file_name = os.path.basename(TXT_FILE_PATH)
-json_path = TXT_FILE_PATH.replace("_time.txt", ".json")
 
-txt_hash = generate_file_hash(TXT_FILE_PATH)
-json_stage_hash = generate_json_stage_hash(txt_hash)
+annotation_stats = Counter()
 
-if is_hash_exists(json_stage_hash):
-    print("Skipped (JSON already created)")
-    exit()
+# neighbouring-window similarity marks topic shifts; CHUNK_TOPIC_SHIFT=0 uses the token budget only
+chunk_embeddings = load_embeddings() if chunker.CHUNK_TOPIC_SHIFT else None
 
-print(f"Processing TXT → JSON: {file_name}")
+# CLASSIFIER_BACKEND=embedding|llamacpp labels domain/content_type locally (see classifier.py)
+chunk_classifier = classifier.load_classifier(embeddings=chunk_embeddings)
 
-loader = TextLoader(TXT_FILE_PATH, encoding="utf-8")
-docs = loader.load()
 
-if not docs:
-    print("Empty file")
-    exit()
+# it is call the LLM once and return the reply text and the tokens it cost.
+def call_llm(text, error=None):
+    with metrics.span("llm_call", retry=error is not None):
+        if error is None:
+            reply = chain.invoke({"text": text})
+        else:
+            reply = retry_chain.invoke({"text": text, "error": error})
+    return count_reply(reply, text)
 
-full_text = docs[0].page_content
 
-splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200
-)
+def count_reply(reply, text):
+    content = getattr(reply, "content", reply)
+    usage = getattr(reply, "usage_metadata", None) or {}
+    tokens = usage.get("total_tokens") or (len(text) + len(content)) // 4
+    annotation_stats["calls"] += 1
+    annotation_stats["tokens"] += tokens
+    return content, tokens
+
+
+def loosen_json(raw):
+    # code fences, smart quotes and trailing commas are the usual near-misses
+    raw = re.sub(r"```(?:json)?", "", raw)
+    raw = raw.replace("\u201c", '"').replace("\u201d", '"')
+    return re.sub(r",\s*([}\]])", r"\1", raw)
 
-chunks = splitter.split_text(full_text)
-processed_chunks = []
 
-for i, chunk in enumerate(chunks, start=1):
+# it is fix small mistakes locally instead of paying for another call.
+def repair_annotation(data, text):
+    data = dict(data)
+    for field, allowed in classifier.FIELDS.items():
+        value = str(data.get(field) or "").strip()
+        exact = {a.lower(): a for a in allowed}.get(value.lower())
+        close = difflib.get_close_matches(value.title(), allowed, n=1, cutoff=0.6)
+        data[field] = exact or (close[0] if close else value)
+
+    if isinstance(data.get("topic"), str):
+        data["topic"] = " ".join(data["topic"].split()[:3])
+    if not isinstance(data.get("cleaned_text"), str) or not data["cleaned_text"].strip():
+        data["cleaned_text"] = text
+    for key in ("first_timestamp", "last_timestamp"):
+        if not isinstance(data.get(key), str):
+            data[key] = None
+    return data
+
+
+def parse_annotation(raw, text):
+    """Validated annotation and whether it needed repair; ValueError if unusable."""
     try:
-        raw = chain.invoke({"text": chunk})
-        metadata = safe_json_load(raw)
-    except Exception:
-        print(f"Chunk {i} skipped (LLM error)")
-        continue
-
-    metadata["timestamp"] = combine_timestamps(
-        metadata.get("first_timestamp"),
-        metadata.get("last_timestamp")
-    )
+        data = safe_json_load(raw)
+    except ValueError:
+        data = safe_json_load(loosen_json(raw))
+    if not isinstance(data, dict):
+        raise ValueError("reply is not a JSON object")
 
-    metadata.pop("first_timestamp", None)
-    metadata.pop("last_timestamp", None)
+    try:
+        return ChunkAnnotation(**data).model_dump(), False
+    except ValidationError:
+        return ChunkAnnotation(**repair_annotation(data, text)).model_dump(), True
 
-    metadata["reference_link"] = REFERENCE_LINK
-    metadata["source_type"] = SOURCE_TYPE
 
-    cleaned_text = remove_timestamps(
-        metadata.pop("cleaned_text", chunk)
+# it is annotate one chunk; a rejected reply's tokens are counted as wasted.
+def annotate_one(text, error=None):
+    try:
+        raw, tokens = call_llm(text, error)
+    except Exception as e:
+        return None, f"LLM error: {e}"
+
+    try:
+        annotation, repaired = parse_annotation(raw, text)
+    except ValueError as e:
+        annotation_stats["wasted_tokens"] += tokens
+        metrics.incr("llm_wasted_tokens", tokens)
+        return None, str(e)[:300]
+
+    annotation_stats["repaired"] += repaired
+    return annotation, None
+
+
+# it is ask for the topics of several chunks in one call; a batch whose reply is
+# unusable is split up, and a single chunk that still fails keeps topic None.
+def topics_for(texts):
+    excerpts = "\n\n".join(f"### {n}\n{text}" for n, text in enumerate(texts, start=1))
+    try:
+        with metrics.span("llm_call", stage="topic"):
+            reply = topic_chain.invoke({"count": len(texts), "excerpts": excerpts})
+        raw, tokens = count_reply(reply, excerpts)
+    except Exception as e:
+        print(f"Topic call failed: {e}")
+        return [None] * len(texts)
+
+    try:
+        topics = safe_json_load(loosen_json(raw)).get("topics")
+    except (ValueError, AttributeError):
+        topics = None
+    if isinstance(topics, list) and len(topics) == len(texts) and all(isinstance(t, str) and t.strip() for t in topics):
+        return [" ".join(t.split()[:3]) for t in topics]
+
+    annotation_stats["wasted_tokens"] += tokens
+    metrics.incr("llm_wasted_tokens", tokens)
+    if len(texts) == 1:
+        return [None]
+    return [topic for text in texts for topic in topics_for([text])]
+
+
+# it is send every chunk to the LLM and collect its metadata.
+# with a local classifier confident chunks only get a batched topic-only call (full
+# annotation with CLASSIFIER_LLM_TOPIC=1); chunks whose reply could not be used are
+# retried on their own with the reason.
+def annotate_chunks(chunks, source_type="unknown", reference_link=""):
+    annotation_stats["chunks"] += len(chunks)
+
+    predictions = [None] * len(chunks)
+    if chunk_classifier is not None:
+        with metrics.span("classify", chunks=len(chunks)):
+            predictions = chunk_classifier.predict(
+                [remove_timestamps(chunk["text"]) for chunk in chunks]
+            )
+
+    annotations = {}
+    confident = {}
+    failed = {}
+    need_topic = []
+    for i, (chunk, prediction) in enumerate(zip(chunks, predictions), start=1):
+        confident[i] = [
+            field for field in classifier.FIELDS
+            if prediction and prediction[f"{field}_confidence"] >= classifier.CLASSIFIER_CONFIDENCE
+        ]
+
+        if len(confident[i]) == len(classifier.FIELDS) and not classifier.CLASSIFIER_LLM_TOPIC:
+            annotations[i] = {
+                "domain": prediction["domain"],
+                "topic": None,
+                "content_type": prediction["content_type"]
+            }
+            need_topic.append(i)
+            metrics.incr("llm_skipped")
+            continue
+
+        annotation_stats["first_pass"] += 1
+        annotations[i], error = annotate_one(chunk["text"])
+        if error:
+            annotation_stats["failures"] += 1
+            failed[i] = error
+
+    for start in range(0, len(need_topic), TOPIC_BATCH):
+        batch = need_topic[start:start + TOPIC_BATCH]
+        topics = topics_for([remove_timestamps(chunks[i - 1]["text"]) for i in batch])
+        for i, topic in zip(batch, topics):
+            annotations[i]["topic"] = topic
+            annotation_stats["no_topic"] += topic is None
+
+    for _ in range(ANNOTATE_RETRIES):
+        if not failed:
+            break
+        for i, error in list(failed.items()):
+            annotation_stats["retries"] += 1
+            metrics.incr("llm_retries")
+            annotations[i], failed[i] = annotate_one(chunks[i - 1]["text"], error)
+            if failed[i] is None:
+                del failed[i]
+
+    processed_chunks = []
+    for i, chunk in enumerate(chunks, start=1):
+        metadata = annotations.get(i)
+        if metadata is None:
+            print(f"Chunk {i} skipped after {ANNOTATE_RETRIES} retries: {failed.get(i)}")
+            annotation_stats["failed"] += 1
+            metrics.incr("llm_failures")
+            continue
+
+        for field in confident[i]:
+            metadata[field] = predictions[i - 1][field]
+
+        # the chunker knows the exact span; the LLM's copy is only a fallback
+        metadata["timestamp"] = chunk["timestamp"] or combine_timestamps(
+            metadata.get("first_timestamp"),
+            metadata.get("last_timestamp")
+        )
+
+        metadata.pop("first_timestamp", None)
+        metadata.pop("last_timestamp", None)
+
+        metadata["reference_link"] = reference_link
+        metadata["source_type"] = source_type
+
+        cleaned_text = remove_timestamps(
+            metadata.pop("cleaned_text", None) or chunk["text"]
+        )
+
+        processed_chunks.append({
+            "chunk_id": f"chunk_{i}",
+            "text": cleaned_text,
+            "metadata": metadata
+        })
+
+    return processed_chunks
+
+
+# it is give the type and link stored for the transcript's source in the registry.
+# youtube sources keep the URL or bare video id main.py was given.
+def source_metadata(source_id):
+    row = get_source(source_id) if source_id else None
+    if not row:
+        return "unknown", ""
+
+    source_type, file_name, file_path = row
+    if source_type == "youtube" and file_path and "http" not in file_path:
+        return source_type, YOUTUBE_WATCH_URL + file_path
+    return source_type, file_path or file_name or ""
+
+
+def report_annotation():
+    stats = annotation_stats
+    if not stats["chunks"]:
+        return
+    failure_rate = stats["failures"] / stats["first_pass"] if stats["first_pass"] else 0.0
+    print(
+        f"Annotation: {stats['chunks']} chunks, {stats['calls']} LLM calls, "
+        f"first-pass failure rate {failure_rate:.1%}, {stats['repaired']} repaired locally, "
+        f"{stats['retries']} retries, {stats['failed']} still failed, "
+        f"{stats['no_topic']} without topic, "
+        f"{stats['wasted_tokens']} of {stats['tokens']} tokens wasted"
     )
 
-    processed_chunks.append({
-        "chunk_id": f"chunk_{i}",
-        "text": cleaned_text,
-        "metadata": metadata
-    })
 
-if not processed_chunks:
-    print("No valid chunks created")
-    exit()
+def process_txt(txt_path):
+    profiler.attribute(os.path.basename(txt_path))
 
-with open(json_path, "w", encoding="utf-8") as f:
-    json.dump(processed_chunks, f, indent=2, ensure_ascii=False)
+    if not os.path.exists(txt_path):
+        print("File not found")
+        return
+
+    file_name = os.path.basename(txt_path)
+    json_path = re.sub(r"(_time|_clean)?\.txt$", ".json", txt_path)
+
+    txt_hash = generate_file_hash(txt_path)
+    json_stage_hash = generate_json_stage_hash(txt_hash)
+
+    source_id = source_for_output("transcribed", txt_path)
+
+    if is_hash_exists(json_stage_hash):
+        print("Skipped (JSON already created)")
+        metrics.incr("skips", stage="annotate")
+        # same transcript as an earlier run: close the stage so pending() stops listing it
+        if source_id and os.path.exists(json_path) and not canonical_of(source_id):
+            mark_stage(source_id, "annotated", json_path)
+        return
+
+    if source_id and canonical_of(source_id):
+        print("Skipped (near-duplicate of another source)")
+        metrics.incr("skips", stage="duplicate")
+        return
+
+    print(f"Processing TXT → JSON: {file_name}")
+
+    loader = TextLoader(txt_path, encoding="utf-8")
+    docs = loader.load()
+
+    if not docs:
+        print("Empty file")
+        return
+
+    full_text = docs[0].page_content
+
+    # whole transcript lines, grouped by token budget and topic; third.py embeds these as-is
+    chunks = chunker.chunk_text(full_text, chunk_embeddings)
+    processed_chunks = annotate_chunks(chunks, *source_metadata(source_id))
+
+    if not processed_chunks:
+        print("No valid chunks created")
+        return
+
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(processed_chunks, f, indent=2, ensure_ascii=False)
+
+    save_hash(
+        json_stage_hash,
+        os.path.basename(json_path),
+        json_path,
+        "json"
+    )
+
+    if source_id:
+        mark_stage(source_id, "annotated", json_path)
+
+    print(f"JSON created successfully: {os.path.basename(json_path)}")
 
-save_hash(
-    json_stage_hash,
-    os.path.basename(json_path),
-    json_path,
-    "json"
-)
 
-print(f"JSON created successfully: {os.path.basename(json_path)}")
\ No newline at end of file
+if __name__ == "__main__":
+    # --pending: annotate every transcribed source that has no JSON yet
+    if "--pending" in sys.argv:
+        for _, _, _, txt_path in pending("annotated"):
+            process_txt(txt_path)
+    else:
+        process_txt(TXT_FILE_PATH)
+    report_annotation()
@@ -1,35 +1,30 @@
 import os
+import sys
 import json
 import hashlib
-import mysql.connector
+import metrics
+import profiler
+from registry import (
+    is_hash_exists, mark_stage, pending, save_hash, source_for_output
+)
 from dotenv import load_dotenv
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores.utils import filter_complex_metadata
+from embedding_backend import load_embeddings
+from chroma_tools import CHROMA_DIR, COLLECTION_NAME, open_store, shard_name
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 JSON_FOLDER = r"C:\Users\Administrator\Desktop\Coach TK\Documents"
-CHROMA_DIR = os.path.join(BASE_DIR, "chroma_db")
-COLLECTION_NAME = "podcast_chunks"
+REEMBED = os.getenv("REEMBED", "0") == "1"  # re-embed stored chunks with the current backend
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")  # chroma | memmap (vector_store.py)
 
 os.makedirs(CHROMA_DIR, exist_ok=True)
 
-DB_CONFIG = {
-    "host": "localhost",
-    "user": "root",
-    "password": "newpassword",
-    "database": "coachtk"
-}
-
 load_dotenv()
-db = mysql.connector.connect(**DB_CONFIG)
-cursor = db.cursor()
+profiler.start_if_requested(JSON_FOLDER)
 
 def file_hash(path):
     h = hashlib.sha256()
-    with open(path, "rb") as f:
+    with metrics.span("hash", stage="embed"), open(path, "rb") as f:
         for chunk in iter(lambda: f.read(8192), b""):
             h.update(chunk)
     return h.hexdigest()
@@ -37,58 +32,82 @@ def file_hash(path):
 def text_hash(text):
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-def is_hash_exists(hash_id):
-    cursor.execute("SELECT id FROM file_registry WHERE hash_id=%s", (hash_id,))
-    return cursor.fetchone() is not None
-
-def save_hash(hash_id, name, path):
-    cursor.execute(
-        "INSERT INTO file_registry (hash_id, file_name, file_path, file_type) VALUES (%s,%s,%s,%s)",
-        (hash_id, name, path, "embedding_done")
-    )
-    db.commit()
-
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
-
-vectorstore = Chroma(
-    collection_name=COLLECTION_NAME,
-    persist_directory=CHROMA_DIR,
-    embedding_function=embeddings
-)
-
-print("Using Chroma (DuckDB/Parquet) at:", CHROMA_DIR)
-
-for file in os.listdir(JSON_FOLDER):
-    if not file.endswith(".json"):
-        continue
-
-    path = os.path.join(JSON_FOLDER, file)
+# EMBEDDING_BACKEND=server shares one model with other processes via embedding_server.py
+embeddings = load_embeddings()
+
+if VECTOR_BACKEND == "memmap":
+    from vector_store import MemmapVectorStore
+
+    vectorstore = MemmapVectorStore(embeddings)
+    print("Using memory-mapped vector store at:", vectorstore.directory)
+else:
+    # CHROMA_SHARD_BY=source_type|domain spreads chunks over podcast_chunks__<value> (see chroma_tools.py)
+    vectorstore = open_store(COLLECTION_NAME, embeddings)
+    print("Using Chroma (DuckDB/Parquet) at:", CHROMA_DIR)
+
+
+def store_for(metadata):
+    if VECTOR_BACKEND == "memmap":
+        return vectorstore
+    return open_store(shard_name(metadata), embeddings)
+
+# only on request: every backend shares one vector space, so stored vectors stay valid
+def reembed_collection(batch_size=256):
+    from chroma_tools import collection_names
+
+    if VECTOR_BACKEND == "memmap":
+        print("REEMBED only applies to Chroma; rebuild VECTOR_DIR instead")
+        return
+
+    for name in collection_names(vectorstore._client):
+        collection = open_store(name, embeddings)._collection
+        total = collection.count()
+
+        for offset in range(0, total, batch_size):
+            batch = collection.get(
+                include=["documents"],
+                limit=batch_size,
+                offset=offset
+            )
+            collection.update(
+                ids=batch["ids"],
+                embeddings=embeddings.embed_documents(batch["documents"])
+            )
+            print(f"Re-embedded {name} {min(offset + batch_size, total)}/{total}")
+
+def process_json_file(path):
+    file = os.path.basename(path)
+    profiler.attribute(file)
     f_hash = file_hash(path)
 
     if is_hash_exists(f_hash):
         print(f"Skipped: {file}")
-        continue
+        metrics.incr("skips", stage="embed")
+        # already embedded under another run: close the stage so pending() stops listing it
+        source_id = source_for_output("annotated", path)
+        if source_id:
+            mark_stage(source_id, "embedded")
+        return
 
     print(f"Processing: {file}")
 
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
+    # second.py already chunked on segment boundaries; each item is one vector
     docs = []
     for item in data:
         text = item.get("text", "").strip()
         if text:
-            docs.append(Document(page_content=text))
+            metadata = dict(item.get("metadata") or {})
+            metadata["chunk_id"] = item.get("chunk_id")
+            metadata["source"] = file
+            # lets chroma_tools.py compact spot chunks of a regenerated or deleted JSON
+            metadata["source_path"] = path
+            metadata["source_hash"] = f_hash
+            docs.append(Document(page_content=text, metadata=metadata))
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=100
-    )
-
-    chunks = splitter.split_documents(docs)
-    chunks = filter_complex_metadata(chunks)
+    chunks = filter_complex_metadata(docs)
 
     new_docs = []
     for c in chunks:
@@ -96,11 +115,44 @@ for file in os.listdir(JSON_FOLDER):
         if not is_hash_exists(c_hash):
             c.metadata["chunk_hash"] = c_hash
             new_docs.append(c)
+        else:
+            metrics.incr("cache_hits", stage="chunk")
+
+    shards = {}
+    for doc in new_docs:
+        store = store_for(doc.metadata)
+        shards.setdefault(id(store), (store, []))[1].append(doc)
+
+    for store, shard_docs in shards.values():
+        with metrics.span("vector_write", file=file, chunks=len(shard_docs)):
+            store.add_documents(shard_docs)
+            store.persist()
+
+    save_hash(f_hash, file, path, "embedding_done")
+
+    source_id = source_for_output("annotated", path)
+    if source_id:
+        mark_stage(source_id, "embedded")
+
+
+def process_json_folder():
+    for file in os.listdir(JSON_FOLDER):
+        if not file.endswith(".json"):
+            continue
+
+        process_json_file(os.path.join(JSON_FOLDER, file))
+
 
-    if new_docs:
-        vectorstore.add_documents(new_docs)
-        vectorstore.persist()
+if __name__ == "__main__":
+    if REEMBED:
+        reembed_collection()
 
-    save_hash(f_hash, file, path)
+    # --pending: embed only annotated sources not embedded yet, no folder hashing
+    if "--pending" in sys.argv:
+        for _, _, _, json_path in pending("embedded"):
+            process_json_file(json_path)
+    else:
+        process_json_folder()
+    profiler.attribute(None)
 
-print("ALL FILES PROCESSED SAFELY")
+    print("ALL FILES PROCESSED SAFELY")
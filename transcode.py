@@ -0,0 +1,111 @@
+"""
+ffmpeg video -> .m4a transcoding for main.py.
+
+main.py runs transcode_to_m4a() for several videos at once in a thread
+pool of TRANSCODE_WORKERS and transcribes each audio file as soon as it
+is ready, so ffmpeg and whisper overlap instead of taking turns.
+
+Each ffmpeg runs with -threads TRANSCODE_THREADS, quiet logging and
+-progress on stdout, which is parsed into a few progress lines instead
+of ffmpeg's console stream. Output goes to a temporary name and is
+renamed only on success; a failure or TRANSCODE_TIMEOUT kills ffmpeg and
+removes the partial file, so a half-written .m4a is never mistaken for
+a finished one.
+"""
+import os
+import threading
+import subprocess
+import tempfile
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        return os.cpu_count() or 1
+
+
+# half the cores by default: whisper needs the rest while conversions run
+TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", "0")) or max(1, available_cores() // 2)
+TRANSCODE_THREADS = int(os.getenv("TRANSCODE_THREADS", "1"))  # aac encoding barely scales past one thread
+TRANSCODE_TIMEOUT = float(os.getenv("TRANSCODE_TIMEOUT", "3600"))
+PROGRESS_STEP = 25  # percent between progress lines
+
+
+def probe_duration(path):
+    """Media duration in seconds, or None if ffprobe cannot tell."""
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            capture_output=True, text=True, timeout=60
+        ).stdout.strip()
+        return float(out)
+    except (ValueError, OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def transcode_to_m4a(video_path, audio_path, threads=TRANSCODE_THREADS, timeout=TRANSCODE_TIMEOUT):
+    name = os.path.basename(video_path)
+    duration = probe_duration(video_path)
+    tmp_path = audio_path + ".part"
+
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8", errors="replace") as stderr:
+        proc = subprocess.Popen(
+            [
+                "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+                "-i", video_path,
+                "-vn", "-c:a", "aac", "-b:a", "128k",
+                "-threads", str(threads),
+                "-progress", "pipe:1", "-nostats",
+                "-f", "ipod", tmp_path
+            ],
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            text=True
+        )
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            proc.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+
+        try:
+            next_step = PROGRESS_STEP
+            for line in proc.stdout:
+                key, _, value = line.strip().partition("=")
+                if key != "out_time_us" or not duration or not value.isdigit():
+                    continue
+                percent = 100 * int(value) / 1e6 / duration
+                if percent >= next_step and next_step < 100:
+                    print(f"  {name}: {next_step}%")
+                    next_step += PROGRESS_STEP
+
+            returncode = proc.wait()
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            _remove(tmp_path)
+            raise
+        finally:
+            timer.cancel()
+
+        if returncode != 0:
+            _remove(tmp_path)
+            if timed_out.is_set():
+                raise TimeoutError(f"ffmpeg timed out after {timeout:.0f}s on {name}")
+            stderr.seek(0)
+            detail = stderr.read().strip().splitlines()[-3:]
+            raise RuntimeError(f"ffmpeg failed on {name} (exit {returncode}): {' | '.join(detail)}")
+
+    os.replace(tmp_path, audio_path)
+    return audio_path
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,125 @@
+import os
+
+
+# backend is picked per run from the environment, e.g.
+#   TRANSCRIBE_BACKEND=faster-whisper WHISPER_MODEL=small python main.py
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "whisper")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_BEAM_SIZE = int(os.getenv("WHISPER_BEAM_SIZE", "0"))  # 0 = greedy
+WHISPER_THREADS = int(os.getenv("WHISPER_THREADS", "0"))  # 0 = library default
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+TRANSCRIBE_VAD = os.getenv("TRANSCRIBE_VAD", "0") == "1"
+TRANSCRIBE_BATCH_SIZE = int(os.getenv("TRANSCRIBE_BATCH_SIZE", "0"))  # 0 = one file at a time
+# only clips up to this long are batched; longer audio keeps whisper's cross-window context
+TRANSCRIBE_BATCH_MAX_SECONDS = float(os.getenv("TRANSCRIBE_BATCH_MAX_SECONDS", "180"))
+
+
+class WhisperBackend:
+    """Reference openai-whisper (PyTorch) implementation."""
+
+    name = "whisper"
+
+    def __init__(self, model_size, beam_size=0, threads=0):
+        import torch
+        import whisper
+
+        if threads:
+            torch.set_num_threads(threads)
+
+        self.model = whisper.load_model(model_size)
+        self.beam_size = beam_size
+
+    def transcribe(self, audio):
+        options = {}
+        if self.beam_size:
+            options["beam_size"] = self.beam_size
+
+        result = self.model.transcribe(audio, **options)
+        return [
+            {"start": seg["start"], "end": seg["end"], "text": seg["text"]}
+            for seg in result["segments"]
+        ]
+
+
+class FasterWhisperBackend:
+    """CTranslate2 (faster-whisper) implementation, int8 on CPU by default."""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size, beam_size=0, threads=0,
+                 compute_type=WHISPER_COMPUTE_TYPE):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            model_size,
+            device="cpu",
+            compute_type=compute_type,
+            cpu_threads=threads
+        )
+        self.beam_size = beam_size or 1
+
+    def transcribe(self, audio):
+        segments, _ = self.model.transcribe(audio, beam_size=self.beam_size)
+        return [
+            {"start": seg.start, "end": seg.end, "text": seg.text}
+            for seg in segments
+        ]
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def load_transcriber(backend=None, model_size=None, beam_size=None,
+                     threads=None):
+    backend = backend or TRANSCRIBE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown transcription backend: {backend} "
+            f"(expected one of: {', '.join(BACKENDS)})"
+        )
+
+    print(f"Loading {backend} model: {model_size or WHISPER_MODEL}")
+    return BACKENDS[backend](
+        model_size or WHISPER_MODEL,
+        beam_size=WHISPER_BEAM_SIZE if beam_size is None else beam_size,
+        threads=WHISPER_THREADS if threads is None else threads
+    )
+
+
+# with TRANSCRIBE_VAD=1 silences are cut out before whisper sees the audio
+def transcribe_file(transcriber, audio_path, vad=None):
+    if not (TRANSCRIBE_VAD if vad is None else vad):
+        return transcriber.transcribe(audio_path)
+
+    from vad import transcribe_with_vad
+
+    segments, stats = transcribe_with_vad(transcriber, audio_path)
+    print(
+        f"VAD {os.path.basename(audio_path)}: "
+        f"skipped {stats['skipped_fraction']:.0%} of {stats['duration']:.0f}s "
+        f"in {stats['regions']} regions, "
+        f"took {stats['seconds']:.1f}s (VAD {stats['vad_seconds']:.1f}s, RTF {stats['rtf']:.3f})"
+    )
+    return segments
+
+
+def format_segment(seg):
+    start = int(seg["start"])
+    end = int(seg["end"])
+    sm, ss = divmod(start, 60)
+    em, es = divmod(end, 60)
+    return f"[{sm:02d}:{ss:02d} - {em:02d}:{es:02d}] {seg['text'].strip()}"
+
+
+# write segments in the same [MM:SS - MM:SS] format the rest of the pipeline reads,
+# plus a millisecond, time-indexed copy for clip lookups (transcript_store.py)
+def write_transcript(segments, txt_path):
+    from transcript_store import store_path, write_store
+
+    with open(txt_path, "w", encoding="utf-8") as f:
+        for seg in segments:
+            f.write(format_segment(seg) + "\n")
+    write_store(segments, store_path(txt_path))
@@ -0,0 +1,198 @@
+"""
+Compact, time-indexed transcript files (.tsb) next to the _time.txt ones.
+
+    python transcript_store.py convert FOLDER      # .tsb for existing _time.txt files
+    python transcript_store.py export FILE.tsb     # [MM:SS - MM:SS] text to stdout
+    python transcript_store.py slice FILE.tsb START END   # seconds or [H:]MM:SS
+
+The text format only keeps whole seconds and is searched by scanning and
+regex-parsing every line. A .tsb file keeps millisecond times in arrays:
+
+    header   magic, version, segment count, text size (32 bytes)
+    int32    start_ms[n]
+    int32    end_ms[n]
+    int32    end_max_ms[n]    running max of end_ms
+    uint32   offsets[n + 1]   byte offsets of each segment's text
+    bytes    UTF-8 text of all segments, back to back
+
+16 bytes per segment, about what a "[MM:SS - MM:SS] " prefix costs in
+the text file; int32 milliseconds cover ~596 hours.
+
+TranscriptStore maps the file and reads nothing up front: segments(t0,
+t1) binary-searches start_ms and end_max_ms for the segments overlapping
+[t0, t1) and decodes only their text, so cutting a clip out of a
+three-hour transcript touches a few pages. transcriber.write_transcript
+writes both files; the pipeline still reads the text, which stays the
+export format.
+"""
+import os
+import sys
+import mmap
+import struct
+import argparse
+import numpy as np
+
+MAGIC = b"TSB1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQ")
+HEADER_SIZE = 32  # keeps the arrays aligned
+STORE_EXT = ".tsb"
+MAX_MS = 2 ** 31 - 1
+
+
+def store_path(txt_path):
+    return os.path.splitext(txt_path)[0] + STORE_EXT
+
+
+def format_ms(ms):
+    # same MM:SS as the text transcripts; minutes simply grow past 99
+    m, s = divmod(int(ms) // 1000, 60)
+    return f"{m:02d}:{s:02d}"
+
+
+def to_ms(seconds):
+    # clamped to the int32 range; inf means "to the end"
+    ms = MAX_MS if seconds == float("inf") else min(max(round(seconds * 1000), 0), MAX_MS)
+    return np.int32(ms)
+
+
+def parse_time(value):
+    """Seconds from "123.4", "MM:SS" or "H:MM:SS"."""
+    seconds = 0.0
+    for part in value.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def write_store(segments, path):
+    """Write [{"start", "end", "text"}] (seconds) as a .tsb file."""
+    segments = sorted(segments, key=lambda seg: seg["start"])
+    texts = [seg["text"].strip().encode("utf-8") for seg in segments]
+    start = np.array([round(seg["start"] * 1000) for seg in segments], dtype=np.int32)
+    end = np.array([round(seg["end"] * 1000) for seg in segments], dtype=np.int32)
+    end_max = np.maximum.accumulate(end) if len(end) else end
+    offsets = np.zeros(len(texts) + 1, dtype=np.uint32)
+    np.cumsum([len(t) for t in texts], out=offsets[1:])
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(texts), int(offsets[-1])).ljust(HEADER_SIZE, b"\0"))
+        for array in (start, end, end_max, offsets):
+            f.write(array.tobytes())
+        f.write(b"".join(texts))
+    os.replace(tmp_path, path)
+
+
+class TranscriptStore:
+    """Read-only, memory-mapped view of one .tsb file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, n, text_size = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} transcript store")
+
+        def array(index, dtype, count):
+            return np.frombuffer(self._map, dtype=dtype, count=count, offset=HEADER_SIZE + index * n * 4)
+
+        self.start_ms = array(0, np.int32, n)
+        self.end_ms = array(1, np.int32, n)
+        self.end_max_ms = array(2, np.int32, n)
+        self.offsets = array(3, np.uint32, n + 1)
+        self._text_start = HEADER_SIZE + (4 * n + 1) * 4
+        self.text_size = text_size
+
+    def __len__(self):
+        return len(self.start_ms)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # drop the array views first; mmap refuses to close while they export its buffer
+        self.start_ms = self.end_ms = self.end_max_ms = self.offsets = None
+        self._map.close()
+        self._file.close()
+
+    def text(self, i):
+        lo = self._text_start + int(self.offsets[i])
+        hi = self._text_start + int(self.offsets[i + 1])
+        return self._map[lo:hi].decode("utf-8")
+
+    def segment(self, i):
+        return {
+            "start": int(self.start_ms[i]) / 1000,
+            "end": int(self.end_ms[i]) / 1000,
+            "text": self.text(i)
+        }
+
+    def find(self, start, end):
+        """Index range [lo, hi) of segments overlapping [start, end) seconds."""
+        # int32 keys: a Python int would make searchsorted copy the whole array to int64
+        lo = int(np.searchsorted(self.end_max_ms, to_ms(start), side="right"))
+        hi = int(np.searchsorted(self.start_ms, to_ms(end), side="left"))
+        return lo, max(lo, hi)
+
+    def segments(self, start=0.0, end=float("inf")):
+        lo, hi = self.find(start, end)
+        return [
+            self.segment(i) for i in range(lo, hi)
+            if self.end_ms[i] > start * 1000  # end_max only bounds the search
+        ]
+
+    def export_lines(self):
+        for i in range(len(self)):
+            yield f"[{format_ms(self.start_ms[i])} - {format_ms(self.end_ms[i])}] {self.text(i)}"
+
+
+def convert_text(txt_path):
+    """Build a .tsb from an existing text transcript (whole-second times)."""
+    from chunker import parse_transcript
+
+    with open(txt_path, "r", encoding="utf-8") as f:
+        segments = [seg for seg in parse_transcript(f.read()) if seg["start"] is not None]
+    if segments:
+        write_store(segments, store_path(txt_path))
+    return len(segments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary time-indexed transcripts")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("convert", help="write a .tsb for every _time.txt in a folder")
+    p.add_argument("folder")
+
+    p = sub.add_parser("export", help="print a .tsb as [MM:SS - MM:SS] lines")
+    p.add_argument("path")
+
+    p = sub.add_parser("slice", help="print the segments overlapping a time range")
+    p.add_argument("path")
+    p.add_argument("start")
+    p.add_argument("end")
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        for file in sorted(os.listdir(args.folder)):
+            path = os.path.join(args.folder, file)
+            if file.endswith("_time.txt") and not os.path.exists(store_path(path)):
+                print(f"{file}: {convert_text(path)} segments")
+    elif args.command == "export":
+        with TranscriptStore(args.path) as store:
+            for line in store.export_lines():
+                sys.stdout.write(line + "\n")
+    else:
+        with TranscriptStore(args.path) as store:
+            for seg in store.segments(parse_time(args.start), parse_time(args.end)):
+                print(f"[{seg['start']:.3f} - {seg['end']:.3f}] {seg['text']}")
+
+
+if __name__ == "__main__":
+    main()
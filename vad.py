@@ -0,0 +1,110 @@
+import os
+import time
+import subprocess
+import numpy as np
+
+
+SAMPLE_RATE = 16000  # what both whisper backends expect for raw arrays
+
+VAD_FRAME_MS = 30
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))  # above noise floor
+VAD_MIN_LEVEL_DB = -50.0  # anything quieter than this is never speech
+VAD_MIN_SPEECH = 0.25  # seconds
+VAD_MIN_SILENCE = float(os.getenv("VAD_MIN_SILENCE", "1.5"))  # shorter gaps are kept
+VAD_PADDING = 0.3  # seconds kept around every region
+# below this much detected speech the floor estimate is not trusted and the whole file is kept
+VAD_MIN_COVERAGE = float(os.getenv("VAD_MIN_COVERAGE", "0.05"))
+
+
+# decode any audio/video file to 16 kHz mono float32, same as whisper.audio.load_audio
+def decode_audio(path, sr=SAMPLE_RATE):
+    out = subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-v", "error",
+            "-i", path,
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr),
+            "-"
+        ],
+        check=True,
+        capture_output=True
+    )
+    return np.frombuffer(out.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+# returns [(start_sec, end_sec), ...] of regions that contain speech
+def detect_speech(audio, sr=SAMPLE_RATE):
+    frame = int(sr * VAD_FRAME_MS / 1000)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return []
+
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    level = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+
+    frame_sec = frame / sr
+    duration = len(audio) / sr
+
+    # speech filling ~90% of a file with little dynamic range (compressed podcasts,
+    # speech over music) puts the 10th percentile inside the speech itself
+    noise_floor, loud = np.percentile(level, [10, 90])
+    if loud - noise_floor < VAD_MARGIN_DB:
+        return [(0.0, duration)]
+
+    threshold = max(float(noise_floor) + VAD_MARGIN_DB, VAD_MIN_LEVEL_DB)
+    voiced = level > threshold
+
+    # rising/falling edges of the voiced mask -> frame index runs
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    regions = []
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        start = max(s * frame_sec - VAD_PADDING, 0.0)
+        end = min(e * frame_sec + VAD_PADDING, duration)
+
+        if regions and start - regions[-1][1] < VAD_MIN_SILENCE:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    regions = [
+        (start, end) for start, end in regions
+        if end - start >= VAD_MIN_SPEECH
+    ]
+    if sum(end - start for start, end in regions) < VAD_MIN_COVERAGE * duration:
+        return [(0.0, duration)]
+    return regions
+
+
+# transcribe only the speech regions and shift segment times back onto the original timeline
+def transcribe_with_vad(transcriber, audio_path):
+    started = time.perf_counter()
+    audio = decode_audio(audio_path)
+    duration = len(audio) / SAMPLE_RATE
+    regions = detect_speech(audio)
+    vad_seconds = time.perf_counter() - started
+
+    segments = []
+    for start, end in regions:
+        clip = audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+        for seg in transcriber.transcribe(clip):
+            segments.append({
+                "start": start + seg["start"],
+                "end": min(start + seg["end"], end),
+                "text": seg["text"]
+            })
+
+    speech = sum(end - start for start, end in regions)
+    seconds = time.perf_counter() - started
+    stats = {
+        "duration": duration,
+        "speech": speech,
+        "skipped_fraction": 1 - speech / duration if duration else 0.0,
+        "regions": len(regions),
+        "vad_seconds": vad_seconds,
+        "seconds": seconds,
+        # measured, same definition as bench_transcribe.py; compare against a run without VAD
+        "rtf": seconds / duration if duration else 0.0
+    }
+    return segments, stats
@@ -0,0 +1,301 @@
+"""
+Memory-mapped local vector store (VECTOR_BACKEND=memmap in third.py).
+
+Layout of VECTOR_DIR:
+
+    vectors.f16      normalized embeddings, one row per chunk (float16 or float32)
+    info.json        {"dim", "dtype", "count"}
+    chunks.sqlite3   row -> chunk_hash, text, metadata (JSON)
+    index.hnsw       hnswlib graph over the rows      (VECTOR_INDEX=hnswlib)
+    index.faiss      faiss HNSW over the rows         (VECTOR_INDEX=faiss)
+
+Opening the store only maps the vector file, so it loads in milliseconds
+and every query process shares the same page-cache pages. The ANN index
+is optional: VECTOR_INDEX=auto picks hnswlib, then faiss, and without
+either falls back to exact blocked search straight over the memmap.
+"""
+import os
+import json
+import sqlite3
+import hashlib
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VECTOR_DIR = os.getenv("VECTOR_DIR", os.path.join(BASE_DIR, "vector_store"))
+VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float16")  # float16 halves disk and page cache
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "auto")  # auto | hnswlib | faiss | numpy
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+SEARCH_BLOCK = 65536  # rows per matmul in the exact fallback
+
+
+def _pick_index(requested):
+    if requested != "auto":
+        return requested
+    for name in ("hnswlib", "faiss"):
+        try:
+            __import__(name)
+            return name
+        except ImportError:
+            continue
+    return "numpy"
+
+
+class MemmapVectorStore(VectorStore):
+    def __init__(self, embedding_function, directory=VECTOR_DIR, dtype=VECTOR_DTYPE,
+                 index=VECTOR_INDEX):
+        self._embedding = embedding_function
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.info_path = os.path.join(directory, "info.json")
+        self.info = {"dim": None, "dtype": dtype, "count": 0}
+        if os.path.exists(self.info_path):
+            with open(self.info_path, "r", encoding="utf-8") as f:
+                self.info = json.load(f)
+
+        suffix = "f16" if self.info["dtype"] == "float16" else "f32"
+        self.vectors_path = os.path.join(directory, f"vectors.{suffix}")
+        self.db = sqlite3.connect(os.path.join(directory, "chunks.sqlite3"))
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY,
+                chunk_hash TEXT NOT NULL UNIQUE,
+                text TEXT NOT NULL,
+                metadata TEXT
+            )
+            """
+        )
+
+        # chunks.sqlite3 is the record of what is stored; info.json's count may lag a crash
+        self.info["count"] = self._next_row()
+
+        self.index_kind = _pick_index(index)
+        self.index_path = os.path.join(directory, f"index.{'faiss' if self.index_kind == 'faiss' else 'hnsw'}")
+        self._vectors = None
+        self._ann = None
+        self._ann_count = 0
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    @property
+    def count(self):
+        return self.info["count"]
+
+    # ---------------- storage ----------------
+    def vectors(self):
+        """Read-only memmap of every stored vector."""
+        if self._vectors is None or len(self._vectors) != self.count:
+            if not self.count:
+                return np.zeros((0, self.info["dim"] or 0), dtype=self.info["dtype"])
+            self._vectors = np.memmap(
+                self.vectors_path, dtype=self.info["dtype"], mode="r",
+                shape=(self.count, self.info["dim"])
+            )
+        return self._vectors
+
+    def _next_row(self):
+        return self.db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+
+    def add_embeddings(self, texts, vectors, metadatas=None):
+        """
+        Append pre-computed embeddings; chunks already stored are skipped.
+
+        Crash-safe order: rows are inserted uncommitted, the vector file is
+        cut back to the committed rows and the new vectors written and
+        synced, then the rows are committed and info.json updated. A crash
+        anywhere leaves stray vector bytes at most, cut off by the next add.
+        """
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError(f"expected {len(texts)} vectors, got an array of shape {vectors.shape}")
+        if self.info["dim"] is not None and vectors.shape[1] != self.info["dim"]:
+            raise ValueError(f"vectors have dimension {vectors.shape[1]}, the store holds {self.info['dim']}")
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+        if self.info["dim"] is None:
+            self.info["dim"] = int(vectors.shape[1])
+            self._write_info()
+
+        ids = []
+        keep = []
+        first_row = row = self._next_row()
+        try:
+            for i, (text, metadata) in enumerate(zip(texts, metadatas)):
+                chunk_hash = (metadata or {}).get("chunk_hash") or hashlib.sha256(text.encode("utf-8")).hexdigest()
+                ids.append(chunk_hash)
+                inserted = self.db.execute(
+                    "INSERT OR IGNORE INTO chunks (row, chunk_hash, text, metadata) VALUES (?, ?, ?, ?)",
+                    (row, chunk_hash, text, json.dumps(metadata or {}, ensure_ascii=False))
+                ).rowcount
+                if inserted:
+                    keep.append(i)
+                    row += 1
+
+            if keep:
+                row_bytes = self.info["dim"] * np.dtype(self.info["dtype"]).itemsize
+                with open(self.vectors_path, "r+b" if os.path.exists(self.vectors_path) else "wb") as f:
+                    f.truncate(first_row * row_bytes)  # drop vectors of an add that never committed
+                    f.seek(first_row * row_bytes)
+                    f.write(vectors[keep].astype(self.info["dtype"]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.db.commit()
+        except BaseException:
+            self.db.rollback()
+            raise
+
+        self.info["count"] = row
+        self._write_info()
+        return ids
+
+    def _write_info(self):
+        tmp_path = self.info_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.info, f)
+        os.replace(tmp_path, self.info_path)
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas)
+
+    # ---------------- ANN index ----------------
+    def _load_or_build_index(self):
+        if self.index_kind == "numpy" or not self.count:
+            return None
+        if self._ann is not None and self._ann_count == self.count:
+            return self._ann
+
+        if self._ann is None and os.path.exists(self.index_path):
+            self._ann, self._ann_count = self._read_index()
+
+        if self._ann is None or self._ann_count != self.count:
+            self._extend_index()
+        return self._ann
+
+    def _read_index(self):
+        dim = self.info["dim"]
+        if self.index_kind == "hnswlib":
+            import hnswlib
+
+            ann = hnswlib.Index(space="ip", dim=dim)
+            ann.load_index(self.index_path, max_elements=self.count)
+            ann.set_ef(HNSW_EF_SEARCH)
+            return ann, ann.get_current_count()
+
+        import faiss
+
+        ann = faiss.read_index(self.index_path)
+        ann.hnsw.efSearch = HNSW_EF_SEARCH
+        return ann, ann.ntotal
+
+    def _extend_index(self):
+        # add only the rows the saved index has not seen yet
+        new_rows = np.asarray(self.vectors()[self._ann_count:], dtype=np.float32)
+
+        if self.index_kind == "hnswlib":
+            import hnswlib
+
+            if self._ann is None:
+                self._ann = hnswlib.Index(space="ip", dim=self.info["dim"])
+                self._ann.init_index(
+                    max_elements=self.count, ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M
+                )
+            else:
+                self._ann.resize_index(self.count)
+            self._ann.add_items(new_rows, np.arange(self._ann_count, self.count))
+            self._ann.set_ef(HNSW_EF_SEARCH)
+        else:
+            import faiss
+
+            if self._ann is None:
+                self._ann = faiss.IndexHNSWFlat(self.info["dim"], HNSW_M * 2, faiss.METRIC_INNER_PRODUCT)
+                self._ann.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            self._ann.add(new_rows)
+            self._ann.hnsw.efSearch = HNSW_EF_SEARCH
+
+        self._ann_count = self.count
+
+    def persist(self):
+        ann = self._load_or_build_index()
+        if ann is None:
+            return
+        if self.index_kind == "hnswlib":
+            ann.save_index(self.index_path)
+        else:
+            import faiss
+            faiss.write_index(ann, self.index_path)
+
+    # ---------------- search ----------------
+    def _exact_search(self, query, k):
+        vectors = self.vectors()
+        scores = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), SEARCH_BLOCK):
+            block = np.asarray(vectors[start:start + SEARCH_BLOCK], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def search_rows(self, query_vector, k=4):
+        """(rows, cosine scores) of the k nearest stored chunks."""
+        if not self.count:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        k = min(k, self.count)
+
+        ann = self._load_or_build_index()
+        if ann is None:
+            return self._exact_search(query, k)
+        if self.index_kind == "hnswlib":
+            labels, distances = ann.knn_query(query[None, :], k=k)
+            return labels[0].astype(np.int64), 1.0 - distances[0]
+        scores, labels = ann.search(query[None, :], k)
+        return labels[0], scores[0]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        rows, scores = self.search_rows(embedding, k)
+        if not len(rows):
+            return []
+
+        placeholders = ",".join("?" * len(rows))
+        found = {
+            row: (text, json.loads(metadata or "{}"))
+            for row, text, metadata in self.db.execute(
+                f"SELECT row, text, metadata FROM chunks WHERE row IN ({placeholders})",
+                [int(r) for r in rows]
+            )
+        }
+        return [
+            (Document(page_content=found[int(r)][0], metadata=found[int(r)][1]), float(s))
+            for r, s in zip(rows, scores) if int(r) in found
+        ]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas)
+        store.persist()
+        return store
@@ -0,0 +1,257 @@
+"""
+Distributed workers over the registry's jobs table.
+
+    python worker.py enqueue FOLDER [--retry-failed]
+    python worker.py run [--kinds transcribe,annotate,embed] [--processes N] [--drain]
+    python worker.py status
+
+enqueue queues a transcribe job per media file in FOLDER, plus annotate /
+embed jobs for every source registry.pending() reports. run claims jobs
+from the shared coachtk database (registry.claim_job) and runs them with
+the same functions main.py, second.py and third.py use:
+
+    transcribe  convert (videos) and transcribe one media file
+    annotate    second.process_txt on one transcript
+    embed       third.process_json_file on one annotated JSON
+
+Each finished job queues the next stage for whatever registry.pending()
+now lists, so sources flow through the pipeline across hosts. Paths in
+jobs are used as-is: every host needs the media folder at the same path
+(a shared mount).
+
+While a job runs, a heartbeat thread extends its lease every LEASE/3
+seconds. A worker that dies stops heartbeating, its lease expires and
+another worker picks the job up. The stages skip work whose hash is
+already registered, so a job that runs twice is harmless.
+
+Several workers on one machine (--processes N) against MySQL or the
+SQLite stand-in (REGISTRY_BACKEND=sqlite) behave like several hosts;
+benchmarks/bench_queue.py does exactly that.
+
+embed is the exception: third.py writes to CHROMA_DIR (or VECTOR_DIR),
+a store on the local disk whose persistent client does not support
+several writers at once. Run embed jobs in exactly one worker process in
+the whole deployment, on the host that owns the vector store; other
+hosts run --kinds transcribe,annotate. run_processes() gives embed to its
+first process only.
+"""
+import os
+import time
+import socket
+import argparse
+import threading
+import multiprocessing
+import metrics
+import registry
+
+JOB_LEASE = float(os.getenv("JOB_LEASE", "300"))  # seconds without a heartbeat before a job is reclaimed
+JOB_POLL = float(os.getenv("JOB_POLL", "5"))  # seconds between claims when the queue is empty
+
+# main.py's VIDEO_EXTENSIONS + AUDIO_EXTENSIONS; importing main would load whisper
+MEDIA_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov", ".mp3", ".wav", ".m4a")
+
+
+def run_transcribe(path):
+    import main
+
+    file = os.path.basename(path)
+    is_video = file.lower().endswith(main.VIDEO_EXTENSIONS)
+    source_type = "video" if is_video else "audio"
+    file_hash = main.generate_file_hash(path)
+
+    if main.is_hash_exists(file_hash):
+        print(f"Skipped ({source_type} already processed): {file}")
+        metrics.incr("skips", stage=source_type)
+        return
+
+    audio_path = main.convert_video_to_audio(path) if is_video else path
+    txt_path = main.transcribe_audio(audio_path)
+    main.record_transcribed(file_hash, source_type, file, path, txt_path)
+    main.save_hash(file_hash, file, path, source_type)
+
+
+def run_annotate(txt_path):
+    import second
+    second.process_txt(txt_path)
+
+
+def run_embed(json_path):
+    import third
+    third.process_json_file(json_path)
+
+
+HANDLERS = {
+    "transcribe": run_transcribe,
+    "annotate": run_annotate,
+    "embed": run_embed,
+}
+
+# job kind -> registry stage whose pending() sources it works on
+STAGE_OF = {"annotate": "annotated", "embed": "embedded"}
+NEXT_KIND = {"transcribe": "annotate", "annotate": "embed"}
+SINGLE_PROCESS_KINDS = ("embed",)  # the vector store takes one writer
+
+
+# a pending source whose job already ran (e.g. re-transcribed at the same path) is queued again
+def enqueue_pending(kind):
+    return sum(
+        registry.enqueue_job(kind, path, requeue_done=True)
+        for _, _, _, path in registry.pending(STAGE_OF[kind])
+    )
+
+
+# size and mtime in the key: a file replaced at the same path is a new job
+def media_key(path):
+    stat = os.stat(path)
+    return f"{path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def enqueue(folder=None, retry_failed=False):
+    if retry_failed:
+        print(f"Requeued {registry.requeue_failed_jobs(list(HANDLERS))} failed jobs")
+
+    if folder:
+        added = 0
+        for file in sorted(os.listdir(folder)):
+            path = os.path.join(folder, file)
+            if os.path.isfile(path) and file.lower().endswith(MEDIA_EXTENSIONS):
+                added += registry.enqueue_job("transcribe", path, key=media_key(path))
+        print(f"Queued {added} transcribe jobs")
+
+    for kind in STAGE_OF:
+        print(f"Queued {enqueue_pending(kind)} {kind} jobs")
+
+
+class Heartbeat(threading.Thread):
+    """Keeps one job's lease alive until stopped."""
+
+    def __init__(self, job_id, worker, lease):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.worker = worker
+        self.lease = lease
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.lease / 3):
+            try:
+                if not registry.heartbeat_job(self.job_id, self.worker, self.lease):
+                    return  # another worker reclaimed it; finish_job reports that
+            except Exception as e:
+                print(f"Heartbeat failed for job {self.job_id}: {e}")
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(worker, job_id, kind, target, lease):
+    heartbeat = Heartbeat(job_id, worker, lease)
+    heartbeat.start()
+    error = None
+    try:
+        with metrics.span("job", stage=kind):
+            HANDLERS[kind](target)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        metrics.incr("job_failures", stage=kind)
+    finally:
+        heartbeat.stop()
+
+    if not registry.finish_job(job_id, worker, error):
+        print(f"[{worker}] lost the lease on job {job_id} ({kind}); another worker owns it now")
+        return
+
+    if error:
+        print(f"[{worker}] {kind} failed: {target} ({error})")
+    elif kind in NEXT_KIND:
+        enqueue_pending(NEXT_KIND[kind])
+
+
+def run_worker(kinds, lease=JOB_LEASE, drain=False, name=None):
+    worker = name or f"{socket.gethostname()}:{os.getpid()}"
+    print(f"[{worker}] waiting for {', '.join(kinds)} jobs")
+    done = 0
+
+    while True:
+        job = registry.claim_job(worker, kinds, lease)
+        if job is None:
+            # a job still running elsewhere may yet come back if its worker dies
+            counts = registry.job_counts()
+            if drain and not any(counts.get((kind, "running")) for kind in kinds):
+                break
+            time.sleep(JOB_POLL)
+            continue
+
+        job_id, kind, target, attempts = job
+        retry = f" (attempt {attempts})" if attempts > 1 else ""
+        print(f"[{worker}] {kind}: {os.path.basename(target)}{retry}")
+        metrics.incr("jobs", stage=kind)
+        run_job(worker, job_id, kind, target, lease)
+        done += 1
+
+    print(f"[{worker}] queue drained after {done} jobs")
+    return done
+
+
+def run_processes(processes, kinds, lease=JOB_LEASE, drain=False):
+    single = [kind for kind in kinds if kind in SINGLE_PROCESS_KINDS]
+    shared = [kind for kind in kinds if kind not in SINGLE_PROCESS_KINDS]
+    if single:
+        print(f"{', '.join(single)} jobs run in the first process only (single-writer vector store)")
+    if not shared:
+        processes = 1
+
+    worker_kinds = [kinds] + [shared] * (processes - 1)
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(k, lease, drain))
+        for k in worker_kinds
+    ]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+
+def status():
+    counts = registry.job_counts()
+    if not counts:
+        print("No jobs")
+    for (kind, state), count in sorted(counts.items()):
+        print(f"{kind:>10} {state:<8} {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed pipeline workers")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enqueue", help="queue media files and pending stages")
+    p.add_argument("folder", nargs="?")
+    p.add_argument("--retry-failed", action="store_true")
+
+    p = sub.add_parser("run", help="claim and run jobs")
+    p.add_argument("--kinds", default=",".join(HANDLERS))
+    p.add_argument("--processes", type=int, default=1)
+    p.add_argument("--lease", type=float, default=JOB_LEASE)
+    p.add_argument("--drain", action="store_true", help="exit once no job is queued or running")
+
+    sub.add_parser("status", help="job counts by kind and status")
+
+    args = parser.parse_args()
+    if args.command == "enqueue":
+        enqueue(args.folder, args.retry_failed)
+    elif args.command == "run":
+        kinds = [k for k in args.kinds.split(",") if k]
+        unknown = set(kinds) - set(HANDLERS)
+        if unknown:
+            parser.error(f"unknown job kinds: {', '.join(sorted(unknown))}")
+        if args.processes > 1:
+            run_processes(args.processes, kinds, args.lease, args.drain)
+        else:
+            run_worker(kinds, args.lease, args.drain)
+    else:
+        status()
+
+
+if __name__ == "__main__":
+    main()